@@ -5,3 +5,11 @@
 """
 API v1 para GovNext Core
 """
+
+from .transparencia import (
+    get_transparency_data,
+    get_budget_summary,
+    get_municipal_data,
+    batch_transparency_query,
+    search_transparency_data
+)
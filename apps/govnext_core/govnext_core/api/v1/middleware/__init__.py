@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Middleware da API v1
+"""
+
+from .rate_limiter import rate_limit
+
+__all__ = ["rate_limit"]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Limite de requisições por endpoint da API v1
+
+Janela fixa por endpoint e cliente (usuário autenticado ou IP do
+visitante), contada no Redis com INCR + EXPIRE.
+"""
+
+import frappe
+from frappe import _
+from functools import wraps
+from ....utils.cache import cache_system
+
+
+def _client():
+    return cache_system.redis_client or frappe.cache()
+
+
+def rate_limit(limit: int, seconds: int):
+    """
+    Limita o endpoint a `limit` requisições por janela de `seconds` segundos
+
+    Requisições acima do limite recebem 429; falhas do Redis não bloqueiam
+    a requisição.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            user = frappe.session.user if frappe.session else "Guest"
+            identifier = frappe.local.request_ip if user == "Guest" else user
+            key = f"{cache_system.cache_prefix}api_v1:rate:{func.__name__}:{identifier}"
+
+            try:
+                client = _client()
+                count = client.incr(key)
+                if count == 1:
+                    client.expire(key, seconds)
+            except Exception as e:
+                frappe.log_error(f"Erro no limite de requisições: {str(e)}", "Rate Limiter Error")
+                count = 0
+
+            if count > limit:
+                frappe.throw(_("Limite de requisições excedido. Tente novamente mais tarde."), frappe.TooManyRequestsError)
+
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
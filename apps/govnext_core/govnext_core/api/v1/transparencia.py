@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Endpoints de transparência da API v1
+
+Camada HTTP (limite de requisições, requisições condicionais, formato da
+resposta) sobre as consultas de transparencia/data.py. Reexportados em
+api/v1/__init__.py, de modo que respondem em
+/api/method/govnext_core.api.v1.<endpoint>.
+"""
+
+import frappe
+from frappe import _
+import json
+from datetime import datetime
+from .utils.response_formatter import format_api_response, api_error_handler, API_VERSION
+from .middleware.rate_limiter import rate_limit
+from ..v2.utils.response_formatter import response_formatter
+from ...transparencia.data import (
+    TRANSPARENCY_DATA_CATEGORIES, GENERAL_DATA_CATEGORIES,
+    fetch_transparency_data, fetch_budget_summary, fetch_municipal_data,
+    search_revenue_data, search_expense_data, search_contract_data, search_tender_data,
+    search_employee_data
+)
+from ...utils.search_index import search_index
+from ...utils.parallel import run_concurrently, TASK_OK, TASK_TIMEOUT
+
+# Consultas aceitas em lote (método -> parâmetros permitidos) e limite por lote
+BATCH_METHODS = {
+    "transparency_data": ["category", "year", "month", "limit", "offset", "cursor", "fields"],
+    "budget_summary": ["year"],
+    "municipal_data": ["category"],
+}
+BATCH_MAX_QUERIES = 10
+
+# ========== ENDPOINTS DE TRANSPARÊNCIA ==========
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(100, 3600)  # 100 requests per hour
+@api_error_handler
+def get_transparency_data(category=None, year=None, month=None, limit=100, offset=0, cursor=None,
+                          fields=None):
+    """
+    Endpoint principal para dados de transparência
+    
+    Listagens aceitam `cursor` (valor de `next_cursor` da resposta anterior)
+    para paginação por chave; `offset` continua disponível por compatibilidade.
+    `fields` restringe as colunas retornadas (ver TRANSPARENCY_FIELDS).
+    """
+    try:
+        # Cliente já possui a versão atual dos dados: 304 sem consultar o banco
+        not_modified = response_formatter.not_modified(
+            TRANSPARENCY_DATA_CATEGORIES.get(category, GENERAL_DATA_CATEGORIES),
+            {
+                "category": category, "year": year, "month": month,
+                "limit": limit, "offset": offset, "cursor": cursor, "fields": fields
+            }
+        )
+        if not_modified:
+            return not_modified
+        
+        data, meta = fetch_transparency_data(category, year, month, limit, offset, cursor, fields)
+        meta["api_version"] = API_VERSION
+        
+        # Listagens grandes: corpo codificado uma vez (e comprimido) aqui
+        return response_formatter.render(format_api_response(
+            data=data,
+            message="Dados de transparência obtidos com sucesso",
+            meta=meta
+        ))
+        
+    except Exception as e:
+        return format_api_response(
+            success=False,
+            message=str(e),
+            error_code="TRANSPARENCY_ERROR"
+        )
+
+# ========== ENDPOINTS DE ORÇAMENTO ==========
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(50, 3600)
+@api_error_handler
+def get_budget_summary(year=None):
+    """Resumo da execução orçamentária"""
+    year = year or datetime.now().year
+    
+    not_modified = response_formatter.not_modified(["orcamento"], {"year": year})
+    if not_modified:
+        return not_modified
+    
+    return format_api_response(data=fetch_budget_summary(year), message="Resumo orçamentário obtido com sucesso")
+
+# ========== ENDPOINTS MUNICIPAIS ==========
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(100, 3600)
+@api_error_handler
+def get_municipal_data(category=None):
+    """Dados específicos municipais"""
+    return format_api_response(data=fetch_municipal_data(category), message="Dados municipais obtidos com sucesso")
+
+# ========== CONSULTAS EM LOTE ==========
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(100, 3600)
+@api_error_handler
+def batch_transparency_query(queries):
+    """
+    Executa várias consultas de transparência em uma única requisição
+    
+    Recebe uma lista (JSON) de itens {"id", "method", "params"}, com
+    `method` em BATCH_METHODS. Autenticação e limite de requisições são
+    avaliados uma única vez para o lote; as consultas rodam em paralelo
+    e cada item da resposta traz seu próprio status (200, 400, 500 ou 504).
+    """
+    if isinstance(queries, str):
+        queries = json.loads(queries)
+    
+    if not isinstance(queries, list) or not queries:
+        frappe.throw(_("Informe uma lista de consultas"))
+    
+    max_queries = frappe.conf.get("api_batch_max_queries", BATCH_MAX_QUERIES)
+    if len(queries) > max_queries:
+        frappe.throw(_("Máximo de {0} consultas por lote").format(max_queries))
+    
+    fetchers = {
+        "transparency_data": fetch_transparency_data,
+        "budget_summary": fetch_budget_summary,
+        "municipal_data": fetch_municipal_data,
+    }
+    
+    results = []
+    tasks = {}
+    
+    for index, query in enumerate(queries):
+        query = query if isinstance(query, dict) else {}
+        query_id = str(query.get("id", index))
+        method = query.get("method")
+        params = query.get("params") or {}
+        
+        item = {"id": query_id, "status": 200, "data": None, "meta": None, "error": None}
+        results.append(item)
+        
+        if method not in BATCH_METHODS:
+            item.update(status=400, error=_("Consulta não suportada: {0}").format(method))
+            continue
+        
+        if not isinstance(params, dict):
+            item.update(status=400, error=_("Parâmetros devem ser um objeto"))
+            continue
+        
+        invalid = [name for name in params if name not in BATCH_METHODS[method]]
+        if invalid:
+            item.update(status=400, error=_("Parâmetros inválidos: {0}").format(", ".join(invalid)))
+            continue
+        
+        tasks[index] = (fetchers[method], (), params)
+    
+    outcomes = run_concurrently(tasks, timeout=frappe.conf.get("api_batch_timeout", 30))
+    
+    for index, outcome in outcomes.items():
+        item = results[index]
+        
+        if outcome["status"] == TASK_OK:
+            if isinstance(outcome["result"], tuple):
+                item["data"], item["meta"] = outcome["result"]
+            else:
+                item["data"] = outcome["result"]
+        elif outcome["status"] == TASK_TIMEOUT:
+            item.update(status=504, error=outcome["error"])
+        else:
+            item.update(status=500, error=outcome["error"])
+    
+    return format_api_response(
+        data=results,
+        message="Consultas em lote processadas",
+        meta={
+            "total_queries": len(results),
+            "failed_queries": len([item for item in results if item["status"] != 200]),
+            "api_version": API_VERSION
+        }
+    )
+
+# ========== ENDPOINTS DE BUSCA ==========
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(200, 3600)
+@api_error_handler
+def search_transparency_data(query, category=None, limit=50):
+    """Busca unificada nos dados de transparência"""
+    if not query or len(query) < 3:
+        frappe.throw(_("Query deve ter pelo menos 3 caracteres"))
+    
+    categories = ["receitas", "despesas", "contratos", "licitacoes", "servidores"]
+    
+    if search_index.is_ready():
+        # Índice invertido com ranqueamento BM25 (servidores agregados por lotação)
+        engine = "index"
+        results = search_index.search_grouped(query, [category] if category else categories, limit)
+        results = {key: results.get(key, []) for key in categories}
+    else:
+        # Índice ainda não construído: varredura com LIKE
+        engine = "like"
+        results = {
+            "receitas": search_revenue_data(query, limit) if not category or category == "receitas" else [],
+            "despesas": search_expense_data(query, limit) if not category or category == "despesas" else [],
+            "contratos": search_contract_data(query, limit) if not category or category == "contratos" else [],
+            "licitacoes": search_tender_data(query, limit) if not category or category == "licitacoes" else [],
+            "servidores": search_employee_data(query, limit) if not category or category == "servidores" else []
+        }
+    
+    # Calcular total de resultados
+    total_results = sum(len(results[key]) for key in results)
+    
+    return format_api_response(
+        data=results,
+        message=f"Busca concluída: {total_results} resultados encontrados",
+        meta={
+            "query": query,
+            "category": category,
+            "total_results": total_results,
+            "engine": engine
+        }
+    )
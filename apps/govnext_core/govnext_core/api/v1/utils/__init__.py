@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Utilitários da API v1
+"""
+
+from .response_formatter import format_api_response, api_error_handler
+
+__all__ = ["format_api_response", "api_error_handler"]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Formato das respostas da API v1
+"""
+
+import frappe
+from functools import wraps
+from frappe.utils import now_datetime
+
+API_VERSION = "1.0"
+
+
+def format_api_response(data=None, message=None, meta=None, success=True, error_code=None,
+                        status_code=None):
+    """
+    Resposta padrão da API v1
+
+    Args:
+        data: Dados da resposta
+        message: Mensagem para o cliente
+        meta: Metadados (paginação, totais, cursor)
+        success: False para respostas de erro
+        error_code: Código do erro (apenas em erros)
+        status_code: Status HTTP (padrão: 200, ou 400 em erros)
+
+    Returns:
+        Dict com a resposta
+    """
+    status_code = status_code or (200 if success else 400)
+    response = {
+        "success": success,
+        "status_code": status_code,
+        "message": message,
+        "data": data,
+        "meta": meta or {},
+        "timestamp": now_datetime().isoformat(),
+        "api_version": API_VERSION
+    }
+
+    if error_code:
+        response["error_code"] = error_code
+
+    if status_code != 200:
+        frappe.local.response["http_status_code"] = status_code
+
+    return response
+
+
+def api_error_handler(func):
+    """Converte exceções do endpoint em resposta de erro da API v1"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+
+        except frappe.PermissionError as e:
+            return format_api_response(success=False, message=str(e), error_code="FORBIDDEN", status_code=403)
+
+        except frappe.ValidationError as e:
+            return format_api_response(success=False, message=str(e), error_code="VALIDATION_ERROR")
+
+        except Exception as e:
+            frappe.log_error(frappe.get_traceback(), f"API v1 Error: {func.__name__}")
+            return format_api_response(
+                success=False,
+                message=str(e),
+                error_code="INTERNAL_ERROR",
+                status_code=500
+            )
+
+    return wrapper
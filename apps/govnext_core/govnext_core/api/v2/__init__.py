@@ -23,14 +23,10 @@ __author__ = "GovNext Team"
 
 from .auth.jwt_handler import JWTHandler
 from .middleware.rate_limiter import RateLimiter
-from .middleware.request_validator import RequestValidator
 from .utils.response_formatter import ResponseFormatter
-from .utils.cache_manager import CacheManager
 
 __all__ = [
     "JWTHandler",
     "RateLimiter", 
-    "RequestValidator",
-    "ResponseFormatter",
-    "CacheManager"
+    "ResponseFormatter"
 ]
\ No newline at end of file
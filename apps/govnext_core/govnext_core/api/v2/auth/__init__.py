@@ -14,7 +14,5 @@ Implementa autenticação JWT robusta com:
 """
 
 from .jwt_handler import JWTHandler
-from .permissions import PermissionChecker
-from .token_manager import TokenManager
 
-__all__ = ["JWTHandler", "PermissionChecker", "TokenManager"]
\ No newline at end of file
+__all__ = ["JWTHandler"]
\ No newline at end of file
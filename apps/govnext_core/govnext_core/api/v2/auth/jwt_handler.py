@@ -10,6 +10,8 @@ import json
 import hashlib
 from frappe import _
 from frappe.utils import cint, get_datetime
+from .refresh_token_store import refresh_token_store
+from .token_cache import verified_token_cache
 
 
 class JWTHandler:
@@ -21,7 +23,7 @@ class JWTHandler:
     - Validação e decodificação de tokens
     - Controle de expiração
     - Blacklist de tokens revogados
-    - Refresh automático de tokens
+    - Refresh automático de tokens com rotação
     """
     
     def __init__(self):
@@ -76,22 +78,17 @@ class JWTHandler:
                 "jti": frappe.generate_hash(length=16)  # JWT ID único
             }
             
-            # Payload do token de refresh
-            refresh_payload = {
-                "user": user,
-                "user_id": user_doc.name,
-                "iat": now,
-                "exp": now + self.refresh_token_expiry,
-                "type": "refresh",
-                "jti": frappe.generate_hash(length=16)
-            }
+            # Payload do token de refresh (inicia uma nova família de rotação)
+            refresh_payload = self._build_refresh_payload(user, user_doc.name, now)
             
             # Gerar tokens
             access_token = jwt.encode(access_payload, self.secret_key, algorithm=self.algorithm)
             refresh_token = jwt.encode(refresh_payload, self.secret_key, algorithm=self.algorithm)
             
-            # Salvar refresh token no banco
-            self._store_refresh_token(user, refresh_payload["jti"], refresh_payload["exp"])
+            # Registrar refresh token no Redis (expira sozinho via TTL)
+            refresh_token_store.store(
+                user, refresh_payload["jti"], refresh_payload["fam"], refresh_payload["exp"]
+            )
             
             return {
                 "access_token": access_token,
@@ -118,6 +115,31 @@ class JWTHandler:
         Returns:
             Payload decodificado ou None se inválido
         """
+        if token.startswith("Bearer "):
+            token = token[7:]
+        
+        # Tokens de acesso já verificados neste worker dispensam nova decodificação
+        if token_type == "access":
+            generation = verified_token_cache.get_generation()
+            payload = verified_token_cache.get(token, generation)
+            if payload:
+                return payload
+        
+        payload = self._decode_token(token, token_type)
+        
+        if payload and token_type == "access":
+            verified_token_cache.set(token, payload, generation)
+        
+        # Verificar se refresh token ainda está ativo no armazenamento
+        if payload and token_type == "refresh":
+            if not refresh_token_store.is_valid(payload.get("jti"), self._get_family(payload)):
+                frappe.log_error(f"Refresh token inativo ou revogado: {payload.get('jti')}")
+                return None
+        
+        return payload
+    
+    def _decode_token(self, token: str, token_type: str) -> Optional[Dict[str, Any]]:
+        """Verifica assinatura, tipo e blacklist de um token JWT"""
         try:
             # Remover prefixo Bearer se presente
             if token.startswith("Bearer "):
@@ -136,12 +158,6 @@ class JWTHandler:
                 frappe.log_error(f"Token na blacklist: {payload.get('jti')}")
                 return None
             
-            # Verificar se refresh token ainda existe no banco
-            if token_type == "refresh":
-                if not self._is_refresh_token_valid(payload.get("user"), payload.get("jti")):
-                    frappe.log_error(f"Refresh token não encontrado no banco: {payload.get('jti')}")
-                    return None
-            
             return payload
             
         except jwt.ExpiredSignatureError:
@@ -158,24 +174,43 @@ class JWTHandler:
         """
         Gera novo token de acesso usando refresh token
         
+        O refresh token apresentado é consumido e substituído por um novo
+        da mesma família. Reapresentar um token já rotacionado revoga a
+        família inteira.
+        
         Args:
             refresh_token: Token de refresh válido
             
         Returns:
-            Novo token de acesso ou None se inválido
+            Novos tokens de acesso e refresh ou None se inválido
         """
         try:
-            # Validar refresh token
-            payload = self.validate_token(refresh_token, "refresh")
+            # Validar assinatura do refresh token; o estado é verificado na rotação
+            payload = self._decode_token(refresh_token, "refresh")
             if not payload:
                 return None
             
             user = payload.get("user")
+            now = datetime.utcnow()
+            
+            # Rotacionar refresh token atomicamente
+            new_refresh_payload = self._build_refresh_payload(
+                user, payload.get("user_id"), now, family=self._get_family(payload)
+            )
+            rotated = refresh_token_store.rotate(
+                user,
+                payload.get("jti"),
+                new_refresh_payload["jti"],
+                new_refresh_payload["fam"],
+                new_refresh_payload["exp"]
+            )
+            if not rotated:
+                return None
+            
             roles = frappe.get_roles(user)
             permissions = self._get_user_permissions(user)
             
-            # Gerar apenas novo access token
-            now = datetime.utcnow()
+            # Gerar novo access token
             access_payload = {
                 "user": user,
                 "user_id": payload.get("user_id"),
@@ -189,9 +224,11 @@ class JWTHandler:
             }
             
             access_token = jwt.encode(access_payload, self.secret_key, algorithm=self.algorithm)
+            new_refresh_token = jwt.encode(new_refresh_payload, self.secret_key, algorithm=self.algorithm)
             
             return {
                 "access_token": access_token,
+                "refresh_token": new_refresh_token,
                 "token_type": "Bearer",
                 "expires_in": int(self.access_token_expiry.total_seconds()),
                 "expires_at": (now + self.access_token_expiry).isoformat(),
@@ -221,9 +258,9 @@ class JWTHandler:
             if jti:
                 self._add_to_blacklist(jti, exp)
                 
-                # Se for refresh token, remover do banco
+                # Se for refresh token, revogar a família (logout da sessão)
                 if payload.get("type") == "refresh":
-                    self._remove_refresh_token(payload.get("user"), jti)
+                    refresh_token_store.revoke(jti, self._get_family(payload))
                 
                 return True
                 
@@ -260,44 +297,23 @@ class JWTHandler:
         except Exception:
             return {}
     
-    def _store_refresh_token(self, user: str, jti: str, exp: datetime):
-        """Armazena refresh token no banco"""
-        try:
-            # Remover tokens expirados do usuário
-            frappe.db.delete("JWT Refresh Token", {"user": user, "expires_at": ["<", get_datetime()]})
-            
-            # Inserir novo refresh token
-            frappe.get_doc({
-                "doctype": "JWT Refresh Token",
-                "user": user,
-                "jti": jti,
-                "expires_at": exp,
-                "created_at": datetime.utcnow()
-            }).insert(ignore_permissions=True)
-            
-            frappe.db.commit()
-            
-        except Exception as e:
-            frappe.log_error(f"Erro ao armazenar refresh token: {str(e)}")
-    
-    def _is_refresh_token_valid(self, user: str, jti: str) -> bool:
-        """Verifica se refresh token existe e é válido"""
-        try:
-            return frappe.db.exists("JWT Refresh Token", {
-                "user": user,
-                "jti": jti,
-                "expires_at": [">", get_datetime()]
-            })
-        except Exception:
-            return False
+    def _build_refresh_payload(self, user: str, user_id: str, now: datetime,
+                               family: str = None) -> Dict[str, Any]:
+        """Monta o payload de um refresh token; sem família, inicia uma nova"""
+        jti = frappe.generate_hash(length=16)
+        return {
+            "user": user,
+            "user_id": user_id,
+            "iat": now,
+            "exp": now + self.refresh_token_expiry,
+            "type": "refresh",
+            "jti": jti,
+            "fam": family or jti
+        }
     
-    def _remove_refresh_token(self, user: str, jti: str):
-        """Remove refresh token do banco"""
-        try:
-            frappe.db.delete("JWT Refresh Token", {"user": user, "jti": jti})
-            frappe.db.commit()
-        except Exception as e:
-            frappe.log_error(f"Erro ao remover refresh token: {str(e)}")
+    def _get_family(self, payload: Dict[str, Any]) -> str:
+        """Família de rotação do refresh token (tokens antigos usam o próprio jti)"""
+        return payload.get("fam") or payload.get("jti")
     
     def _add_to_blacklist(self, jti: str, exp: int):
         """Adiciona token à blacklist"""
@@ -313,6 +329,9 @@ class JWTHandler:
             
             frappe.db.commit()
             
+            # Invalidar tokens verificados em cache em todos os workers
+            verified_token_cache.bump_generation()
+            
         except Exception as e:
             frappe.log_error(f"Erro ao adicionar à blacklist: {str(e)}")
     
@@ -327,13 +346,14 @@ class JWTHandler:
             return False
     
     def cleanup_expired_tokens(self):
-        """Remove tokens expirados do banco"""
+        """
+        Remove entradas expiradas da blacklist
+        
+        Refresh tokens expiram sozinhos no Redis via TTL.
+        """
         try:
             now = get_datetime()
             
-            # Remover refresh tokens expirados
-            frappe.db.delete("JWT Refresh Token", {"expires_at": ["<", now]})
-            
             # Remover tokens da blacklist expirados
             frappe.db.delete("JWT Blacklist", {"expires_at": ["<", now]})
             
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+import frappe
+from datetime import datetime
+from typing import Optional
+from frappe.utils import get_datetime
+from ....utils.cache import cache_system
+
+
+# Consome o token atual e grava o sucessor em uma única operação atômica.
+# Retorno: 1 = rotacionado, 0 = reuso detectado (família revogada), -1 = inválido
+ROTATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return -1
+end
+if redis.call('DEL', KEYS[1]) == 1 then
+    redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[3])
+    redis.call('SET', KEYS[4], ARGV[1], 'EX', ARGV[2])
+    redis.call('EXPIRE', KEYS[3], ARGV[2])
+    return 1
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('DEL', KEYS[3])
+    return 0
+end
+return -1
+"""
+
+
+class RefreshTokenStore:
+    """
+    Armazenamento de refresh tokens em Redis com TTL
+
+    Cada token é uma chave que expira junto com o próprio token, portanto
+    não há limpeza periódica. Tokens emitidos a partir do mesmo login
+    formam uma família; apresentar um token já rotacionado revoga a
+    família inteira (detecção de reuso).
+
+    Chaves:
+    - jwt:rt:<jti>        -> família do token ativo
+    - jwt:rtu:<jti>       -> marcador de token já rotacionado
+    - jwt:rtf:<família>   -> usuário dono da família
+    """
+
+    def __init__(self):
+        self.redis_client = cache_system.redis_client or frappe.cache()
+        self.key_prefix = f"{cache_system.cache_prefix}jwt:"
+        self._rotate_script = None
+
+    def _key(self, kind: str, value: str) -> str:
+        return f"{self.key_prefix}{kind}:{value}"
+
+    def _ttl(self, exp) -> int:
+        """Segundos restantes até a expiração (mínimo de 1s)"""
+        if isinstance(exp, (int, float)):
+            exp = datetime.utcfromtimestamp(exp)
+        return max(1, int((get_datetime(exp) - datetime.utcnow()).total_seconds()))
+
+    def store(self, user: str, jti: str, family: str, exp) -> bool:
+        """Registra o primeiro token de uma nova família"""
+        try:
+            ttl = self._ttl(exp)
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.set(self._key("rtf", family), user, ex=ttl)
+            pipe.set(self._key("rt", jti), family, ex=ttl)
+            pipe.execute()
+
+            self._audit(user, jti, exp)
+            return True
+
+        except Exception as e:
+            frappe.log_error(f"Erro ao armazenar refresh token: {str(e)}", "JWT Refresh Token Store")
+            return False
+
+    def is_valid(self, jti: str, family: str) -> bool:
+        """Verifica se o token está ativo e sua família não foi revogada"""
+        try:
+            current_family, owner = self.redis_client.mget(
+                self._key("rt", jti), self._key("rtf", family)
+            )
+            return bool(owner) and _as_str(current_family) == family
+        except Exception:
+            return False
+
+    def rotate(self, user: str, old_jti: str, new_jti: str, family: str, exp) -> Optional[bool]:
+        """
+        Substitui atomicamente o token atual pelo sucessor
+
+        Returns:
+            True se rotacionado, False se reuso foi detectado
+            (família revogada) e None se o token não é válido
+        """
+        try:
+            if self._rotate_script is None:
+                self._rotate_script = self.redis_client.register_script(ROTATE_SCRIPT)
+
+            result = self._rotate_script(
+                keys=[
+                    self._key("rt", old_jti),
+                    self._key("rtu", old_jti),
+                    self._key("rtf", family),
+                    self._key("rt", new_jti),
+                ],
+                args=[family, self._ttl(exp), self._ttl(exp)],
+            )
+            result = int(result)
+
+            if result == 1:
+                self._audit(user, new_jti, exp)
+                return True
+
+            if result == 0:
+                frappe.log_error(
+                    f"Reuso de refresh token detectado para {user}; família {family} revogada",
+                    "JWT Refresh Token Reuse",
+                )
+                return False
+
+            return None
+
+        except Exception as e:
+            frappe.log_error(f"Erro ao rotacionar refresh token: {str(e)}", "JWT Refresh Token Store")
+            return None
+
+    def revoke(self, jti: str, family: Optional[str] = None):
+        """Revoga o token e, se informada, toda a sua família"""
+        try:
+            keys = [self._key("rt", jti)]
+            if family:
+                keys.append(self._key("rtf", family))
+            self.redis_client.delete(*keys)
+        except Exception as e:
+            frappe.log_error(f"Erro ao revogar refresh token: {str(e)}", "JWT Refresh Token Store")
+
+    def _audit(self, user: str, jti: str, exp):
+        """Registro opcional no banco apenas para auditoria (sem commit)"""
+        if not frappe.conf.get("jwt_refresh_token_audit"):
+            return
+
+        try:
+            frappe.get_doc({
+                "doctype": "JWT Refresh Token",
+                "user": user,
+                "jti": jti,
+                "expires_at": exp,
+                "created_at": datetime.utcnow()
+            }).insert(ignore_permissions=True)
+        except Exception:
+            pass
+
+
+def _as_str(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+# Instância global do armazenamento de refresh tokens
+refresh_token_store = RefreshTokenStore()
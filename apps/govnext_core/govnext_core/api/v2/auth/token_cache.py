@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+import frappe
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from ....utils.cache import cache_system
+
+
+class VerifiedTokenCache:
+    """
+    Cache LRU por worker de tokens de acesso já verificados
+
+    Evita repetir jwt.decode e a consulta à blacklist para clientes que
+    reutilizam o mesmo token. Uma entrada vale até o menor entre o `exp`
+    do token e a próxima mudança da geração de revogação, um contador no
+    Redis incrementado a cada revogação.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or frappe.conf.get("jwt_token_cache_size", 1024)
+        self.redis_client = cache_system.redis_client or frappe.cache()
+        self.generation_key = f"{cache_system.cache_prefix}jwt:revocation_generation"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_generation(self) -> int:
+        """Geração de revogação atual (0 se indisponível)"""
+        try:
+            return int(self.redis_client.get(self.generation_key) or 0)
+        except Exception:
+            return 0
+
+    def bump_generation(self):
+        """Invalida todas as entradas de todos os workers"""
+        try:
+            self.redis_client.incr(self.generation_key)
+        except Exception as e:
+            frappe.log_error(f"Erro ao incrementar geração de revogação: {str(e)}", "JWT Token Cache")
+
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, token: str, generation: int) -> Optional[Dict[str, Any]]:
+        """Retorna o payload verificado ou None se ausente/expirado"""
+        key = self._digest(token)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+
+            payload, exp, entry_generation = entry
+            if exp <= time.time() or entry_generation != generation:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return dict(payload)
+
+    def set(self, token: str, payload: Dict[str, Any], generation: int):
+        """Armazena um payload verificado até o seu `exp`"""
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+
+        key = self._digest(token)
+
+        with self._lock:
+            self._entries[key] = (dict(payload), exp, generation)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+# Instância global (por worker) do cache de tokens verificados
+verified_token_cache = VerifiedTokenCache()
@@ -15,8 +15,5 @@ Camada de middleware para processamento de requisições:
 """
 
 from .rate_limiter import RateLimiter
-from .request_validator import RequestValidator
-from .cors_handler import CORSHandler
-from .audit_logger import AuditLogger
 
-__all__ = ["RateLimiter", "RequestValidator", "CORSHandler", "AuditLogger"]
\ No newline at end of file
+__all__ = ["RateLimiter"]
\ No newline at end of file
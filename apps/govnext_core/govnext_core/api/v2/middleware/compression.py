@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+import frappe
+import zlib
+from typing import Iterable, Iterator, Optional, Union
+from urllib.parse import quote
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class ResponseCompressor:
+    """
+    Compressão negociada de respostas grandes e downloads de arquivos
+
+    - Escolhe brotli ou gzip conforme o Accept-Encoding do cliente
+    - Aplica apenas acima de um tamanho mínimo e a tipos compressíveis
+    - Comprime em fluxo (chunk a chunk), mantendo a memória constante
+    - Entrega exportações como download de arquivo, sem base64 em JSON
+    """
+
+    # Tipos já comprimidos (xlsx, pdf, zip, imagens) não são recomprimidos
+    compressible_types = (
+        "text/",
+        "application/json",
+        "application/xml",
+        "application/geo+json",
+        "application/x-ndjson",
+        "application/vnd.google-earth.kml+xml",
+    )
+
+    def __init__(self):
+        self.min_size = frappe.conf.get("api_compression_min_size", 1024)
+        self.gzip_level = 6
+        self.brotli_quality = 5
+
+    def negotiate(self, accept_encoding: Optional[str] = None) -> Optional[str]:
+        """Retorna 'br', 'gzip' ou None conforme o Accept-Encoding"""
+        if accept_encoding is None:
+            accept_encoding = frappe.request.headers.get("Accept-Encoding", "") if frappe.request else ""
+
+        accepted = {}
+        for item in accept_encoding.split(","):
+            parts = item.strip().split(";")
+            coding = parts[0].strip().lower()
+            quality = 1.0
+            for param in parts[1:]:
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if coding:
+                accepted[coding] = quality
+
+        # Em empate de qualidade, brotli tem preferência
+        candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+        best, best_quality = None, 0.0
+        for coding in candidates:
+            quality = accepted.get(coding, accepted.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+
+        return best
+
+    def is_compressible(self, content_type: str) -> bool:
+        return content_type.startswith(self.compressible_types)
+
+    def compress_stream(self, chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+        """Comprime um iterável de blocos sem materializar o conteúdo"""
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            for chunk in chunks:
+                data = compressor.process(_as_bytes(chunk))
+                if data:
+                    yield data
+            yield compressor.finish()
+            return
+
+        # wbits=31 produz cabeçalho e trailer gzip
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(_as_bytes(chunk))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def file_response(self, content: Union[bytes, str, Iterable], filename: str,
+                      content_type: str, size: Optional[int] = None) -> Response:
+        """
+        Monta a resposta de download, comprimida quando vantajoso
+
+        Args:
+            content: Conteúdo completo (bytes/str) ou iterável de blocos
+            filename: Nome do arquivo para Content-Disposition
+            content_type: Tipo MIME do conteúdo
+            size: Tamanho conhecido de um conteúdo em fluxo (opcional)
+        """
+        if isinstance(content, (bytes, str)):
+            content = _as_bytes(content)
+            size = len(content)
+            chunks = [content]
+        else:
+            chunks = content
+
+        headers = {
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+            "Vary": "Accept-Encoding"
+        }
+
+        encoding = None
+        if self.is_compressible(content_type) and (size is None or size >= self.min_size):
+            encoding = self.negotiate()
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            body = self.compress_stream(chunks, encoding)
+        else:
+            body = chunks
+            if size is not None:
+                headers["Content-Length"] = str(size)
+
+        if "charset" not in content_type and content_type.startswith("text/"):
+            content_type = f"{content_type}; charset=utf-8"
+
+        return Response(body, headers=headers, content_type=content_type, direct_passthrough=True)
+
+
+def _as_bytes(chunk: Union[bytes, str]) -> bytes:
+    return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+# Instância global do compressor
+response_compressor = ResponseCompressor()
@@ -15,8 +15,6 @@ Ferramentas auxiliares para:
 """
 
 from .response_formatter import ResponseFormatter
-from .cache_manager import CacheManager
-from .data_validator import DataValidator
 from .json_encoder import JSONEncoder
 
-__all__ = ["ResponseFormatter", "CacheManager", "DataValidator", "JSONEncoder"]
\ No newline at end of file
+__all__ = ["ResponseFormatter", "JSONEncoder"]
\ No newline at end of file
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Projeção de campos (sparse fieldsets)
+
+Clientes informam `fields=a,b,c` e apenas essas colunas são selecionadas
+no SQL. Os nomes são validados contra a lista de campos publicáveis de
+cada categoria, que mapeia o nome público para a expressão SQL. Campos
+sujeitos à LGPD aparecem na lista somente pela sua expressão mascarada
+(ex.: hash em vez de CPF), de modo que nenhuma projeção expõe o valor
+original.
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional
+
+import frappe
+from frappe import _
+
+
+def parse_fields(fields) -> Optional[List[str]]:
+    """Aceita lista, JSON ou texto separado por vírgulas; None = todos"""
+    if not fields:
+        return None
+
+    if isinstance(fields, str):
+        fields = fields.strip()
+        if fields.startswith("["):
+            fields = json.loads(fields)
+        else:
+            fields = fields.split(",")
+
+    parsed = []
+    for field in fields:
+        field = str(field).strip()
+        if field and field not in parsed:
+            parsed.append(field)
+
+    return parsed or None
+
+
+def validate_fields(requested: Optional[List[str]], allowed: Iterable[str]) -> List[str]:
+    """Valida os campos pedidos contra a lista permitida"""
+    allowed = list(allowed)
+    if not requested:
+        return allowed
+
+    invalid = [field for field in requested if field not in allowed]
+    if invalid:
+        frappe.throw(
+            _("Campos não disponíveis: {0}. Permitidos: {1}").format(", ".join(invalid), ", ".join(allowed)),
+            frappe.ValidationError
+        )
+
+    return requested
+
+
+def select_clause(field_map: Dict[str, str], fields=None, required: Iterable[str] = ()) -> str:
+    """
+    Monta a lista do SELECT com os campos pedidos
+
+    Args:
+        field_map: Nome público -> expressão SQL (ordem define o padrão)
+        fields: Campos pedidos pelo cliente (lista, JSON ou CSV)
+        required: Campos sempre incluídos (ex.: chave do cursor)
+    """
+    selected = validate_fields(parse_fields(fields), field_map.keys())
+
+    for field in required:
+        if field not in selected:
+            selected.append(field)
+
+    return ",\n            ".join(f"{field_map[field]} as {field}" for field in selected)
+
+
+def project_rows(rows: List[dict], fields=None) -> List[dict]:
+    """Projeção sobre linhas já montadas (dados sem consulta SQL)"""
+    requested = parse_fields(fields)
+    if not requested or not rows:
+        return rows
+
+    requested = validate_fields(requested, rows[0].keys())
+    return [{field: row.get(field) for field in requested} for row in rows]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+import frappe
+import json
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """
+    Converte tipos não nativos do JSON em uma única passada de codificação
+
+    Dicionários do Frappe (`frappe._dict`) são subclasses de dict e já são
+    tratados nativamente pelos dois backends.
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+
+    if isinstance(obj, timedelta):
+        return str(obj)
+
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+class JSONEncoder(json.JSONEncoder):
+    """Encoder JSON da API v2.0 com suporte a tipos do Frappe"""
+
+    def default(self, obj):
+        return json_default(obj)
+
+
+def use_fast_backend() -> bool:
+    """Backend orjson habilitado via `api_fast_json` no site_config"""
+    return orjson is not None and bool(frappe.conf.get("api_fast_json"))
+
+
+def dumps(data: Any) -> bytes:
+    """Codifica `data` em JSON (UTF-8) com o backend configurado"""
+    if use_fast_backend():
+        return orjson.dumps(data, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
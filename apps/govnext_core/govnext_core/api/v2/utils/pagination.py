@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Paginação por cursor (keyset)
+
+O cursor é um token opaco com os valores da chave de ordenação da última
+linha entregue. A página seguinte é obtida com um predicado sobre essa
+chave, que usa o índice e tem custo constante em qualquer profundidade,
+ao contrário de LIMIT/OFFSET.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+import frappe
+from frappe import _
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Gera o token opaco a partir dos valores da chave de ordenação"""
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values],
+        default=str,
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decodifica um cursor, validando o número de colunas da chave"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        frappe.throw(_("Cursor de paginação inválido"))
+
+    return values
+
+
+def keyset_condition(columns: List[str], cursor: Optional[str],
+                     descending: bool = True,
+                     nullable: Optional[List[str]] = None) -> Tuple[str, List[Any]]:
+    """
+    Monta o predicado que seleciona as linhas após o cursor
+
+    Para colunas (a, b, c) em ordem decrescente gera:
+    a < %s OR (a = %s AND (b < %s OR (b = %s AND c < %s)))
+
+    As colunas continuam nuas (sem IFNULL), para que o índice atenda ao
+    predicado e ao ORDER BY. Em `nullable`, NULL segue a ordem do banco
+    (menor que qualquer valor: por último em ordem decrescente, primeiro
+    em crescente) e entra como trecho próprio do predicado:
+    a < %s OR a IS NULL OR (a = %s AND ...), ou a IS NULL AND (...) quando
+    o cursor já está no trecho nulo.
+
+    Returns:
+        Tupla (condição SQL, valores) ou ("", []) sem cursor
+    """
+    if not cursor:
+        return "", []
+
+    values = decode_cursor(cursor, len(columns))
+    operator = "<" if descending else ">"
+    nullable = set(nullable or [])
+
+    def after(column, value):
+        """Predicado "depois do valor" na coluna (None = nenhuma linha)"""
+        if value is None:
+            # NULL é o menor valor: nada depois dele em ordem decrescente
+            return (None, []) if descending else (f"{column} IS NOT NULL", [])
+        if column in nullable and descending:
+            return f"({column} {operator} %s OR {column} IS NULL)", [value]
+        return f"{column} {operator} %s", [value]
+
+    def equal(column, value):
+        if value is None:
+            return f"{column} IS NULL", []
+        return f"{column} = %s", [value]
+
+    condition, params = after(columns[-1], values[-1])
+
+    for column, value in zip(reversed(columns[:-1]), reversed(values[:-1])):
+        same, same_params = equal(column, value)
+        following = f"{same} AND ({condition})" if condition else None
+        following_params = same_params + params
+        ahead, ahead_params = after(column, value)
+
+        if ahead and following:
+            condition, params = f"{ahead} OR ({following})", ahead_params + following_params
+        elif following:
+            condition, params = following, following_params
+        else:
+            condition, params = ahead, ahead_params
+
+    # Cursor na última linha possível: nenhuma linha depois dele
+    return (f"({condition})", params) if condition else ("1 = 0", [])
+
+
+def order_by(columns: List[str], descending: bool = True) -> str:
+    """Cláusula ORDER BY estável sobre a chave do cursor"""
+    direction = "DESC" if descending else "ASC"
+    return ", ".join(f"{column} {direction}" for column in columns)
+
+
+def next_cursor(rows: List[dict], keys: List[str], limit: int) -> Optional[str]:
+    """
+    Cursor da próxima página (None quando a página veio incompleta)
+
+    Valores nulos seguem como null e são tratados por keyset_condition.
+    """
+    if not rows or len(rows) < int(limit):
+        return None
+
+    last = rows[-1]
+    return encode_cursor([last.get(key) for key in keys])
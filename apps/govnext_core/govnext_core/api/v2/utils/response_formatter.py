@@ -5,9 +5,12 @@
 import frappe
 from datetime import datetime
 from typing import Any, Dict, Optional, List
-import json
 from frappe.utils import now_datetime
-from .json_encoder import JSONEncoder
+from werkzeug.http import http_date, parse_date, parse_etags
+from werkzeug.wrappers import Response
+from ....utils.data_version import make_etag
+from ..middleware.compression import response_compressor
+from .json_encoder import dumps
 
 
 class ResponseFormatter:
@@ -20,11 +23,10 @@ class ResponseFormatter:
     - Códigos de status HTTP apropriados
     - Paginação
     - Logs de auditoria
+    - Serialização JSON em passada única
+    - Requisições condicionais (ETag / 304)
     """
     
-    def __init__(self):
-        self.json_encoder = JSONEncoder()
-    
     def success(self, data: Any = None, message: str = None, status_code: int = 200, 
                 metadata: Dict = None, pagination: Dict = None) -> Dict:
         """
@@ -51,7 +53,7 @@ class ResponseFormatter:
             response["message"] = message
         
         if data is not None:
-            response["data"] = self._serialize_data(data)
+            response["data"] = data
         
         if metadata:
             response["metadata"] = metadata
@@ -101,7 +103,7 @@ class ResponseFormatter:
             response["error"]["code"] = error_code
         
         if details:
-            response["error"]["details"] = self._serialize_data(details)
+            response["error"]["details"] = details
         
         if validation_errors:
             response["error"]["validation_errors"] = validation_errors
@@ -219,14 +221,91 @@ class ResponseFormatter:
         
         return response
     
-    def _serialize_data(self, data: Any) -> Any:
-        """Serializa dados usando o encoder personalizado"""
+    def not_modified(self, categories: List[str], params: Dict = None) -> Optional[Response]:
+        """
+        Trata requisições condicionais a partir dos carimbos de versão dos dados
+        
+        Define ETag e Last-Modified na resposta e, se o cliente já possui a
+        versão atual (If-None-Match / If-Modified-Since), retorna um 304
+        sem que os dados precisem ser consultados ou serializados.
+        
+        Args:
+            categories: Categorias de dados das quais a resposta depende
+            params: Parâmetros da consulta que alteram o conteúdo
+            
+        Returns:
+            Response 304 ou None se a resposta completa deve ser gerada
+        """
         try:
-            # Usar o encoder personalizado para lidar com tipos específicos do Frappe
-            return json.loads(json.dumps(data, cls=self.json_encoder))
+            etag, last_modified = make_etag(categories, params)
+            if not etag:
+                return None
+            
+            headers = {
+                "ETag": etag,
+                "Cache-Control": "no-cache"
+            }
+            if last_modified:
+                headers["Last-Modified"] = http_date(last_modified)
+            
+            self.add_headers(headers)
+            
+            request_headers = frappe.request.headers if frappe.request else {}
+            if_none_match = request_headers.get("If-None-Match")
+            if_modified_since = request_headers.get("If-Modified-Since")
+            
+            if if_none_match:
+                fresh = parse_etags(if_none_match).contains(etag.strip('"'))
+            elif if_modified_since and last_modified:
+                since = parse_date(if_modified_since)
+                fresh = bool(since) and last_modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+            else:
+                fresh = False
+            
+            if fresh:
+                return Response(status=304, headers=headers)
+            
         except Exception as e:
-            frappe.log_error(f"Erro na serialização de dados: {str(e)}")
-            return str(data)
+            frappe.log_error(f"Erro na validação condicional: {str(e)}", "API Conditional Request")
+        
+        return None
+    
+    def render(self, response: Dict, envelope: Optional[str] = "message") -> Response:
+        """
+        Codifica a resposta uma única vez com o backend JSON configurado
+        
+        Endpoints podem retornar o objeto gerado diretamente para que o
+        corpo não seja recodificado pelo Frappe (útil em listagens grandes).
+        Corpos acima do tamanho mínimo são comprimidos conforme o
+        Accept-Encoding do cliente.
+        
+        Args:
+            response: Resposta formatada por success/error/paginated_response
+            envelope: Chave sob a qual o Frappe entrega o retorno de métodos
+                whitelisted (`message`), mantendo o formato esperado por
+                frappe.call; None grava a resposta sem envelope
+            
+        Returns:
+            Response HTTP com o corpo JSON
+        """
+        body = dumps({envelope: response} if envelope else response)
+        encoding = response_compressor.negotiate() if len(body) >= response_compressor.min_size else None
+        if encoding:
+            body = b"".join(response_compressor.compress_stream([body], encoding))
+        
+        http_response = Response(
+            body,
+            status=response.get("status_code", 200),
+            mimetype="application/json"
+        )
+        http_response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            http_response.headers["Content-Encoding"] = encoding
+        
+        for header, value in (frappe.response.get("headers") or {}).items():
+            http_response.headers[header] = value
+        
+        return http_response
     
     def _log_error(self, response: Dict):
         """Registra erro no log de auditoria"""
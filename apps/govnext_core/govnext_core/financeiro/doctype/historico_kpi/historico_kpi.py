@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class HistoricoKPI(Document):
+	"""
+	Valor de um KPI do portal no fim de um dia, semana ou mês.
+
+	Os registros são gravados pelo agendador
+	(govnext_core.transparencia.kpi_history) e não são editados.
+	"""
+	pass
+
+def on_doctype_update():
+	"""Índice das leituras por KPI, granularidade e intervalo de datas"""
+	frappe.db.add_index("Historico KPI", ["kpi", "granularidade", "data"])
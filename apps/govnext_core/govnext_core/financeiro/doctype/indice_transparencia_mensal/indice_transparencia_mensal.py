@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class IndiceTransparenciaMensal(Document):
+	"""
+	Publicações de um mês que compõem o índice de transparência e o índice
+	acumulado no exercício até esse mês.
+
+	Os registros são mantidos pelos eventos de publicação
+	(govnext_core.transparencia.transparency_index) e não são editados.
+	"""
+	pass
+
+def on_doctype_update():
+	"""Uma linha por mês"""
+	frappe.db.add_unique("Indice Transparencia Mensal", ["ano", "mes"])
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class SaldoContabilMensal(Document):
+	"""
+	Saldo mensal do razão por empresa, conta, órgão (centro de custo) e
+	fonte de recurso.
+
+	Os registros não são editados pelo usuário: são mantidos pelos eventos
+	de GL Entry e reconstruídos por govnext_core.financeiro.saldo_mensal.
+	"""
+	pass
+
+def on_doctype_update():
+	"""Índices das consultas por período e prefixo de conta"""
+	frappe.db.add_index("Saldo Contabil Mensal", ["ano", "mes", "account"])
+	frappe.db.add_index("Saldo Contabil Mensal", ["account", "ano"])
@@ -218,29 +218,22 @@ class PCASPManager:
         """Gerar Balancete de Verificação conforme PCASP"""
         year = year or self.current_year
         
-        filters = {
-            "posting_date": ["<=", f"{year}-12-31"],
-            "is_cancelled": 0
-        }
-        
-        if month:
-            filters["posting_date"] = ["<=", f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"]
-        
-        # Buscar saldos por conta
+        # Buscar saldos por conta acumulados até o fim do período
         balancete = frappe.db.sql("""
             SELECT 
-                account,
-                account_name,
-                SUM(debit) as total_debit,
-                SUM(credit) as total_credit,
-                (SUM(debit) - SUM(credit)) as saldo
-            FROM `tabGL Entry`
-            WHERE is_cancelled = 0
-            AND posting_date <= %s
-            GROUP BY account
-            HAVING (SUM(debit) != 0 OR SUM(credit) != 0)
-            ORDER BY account
-        """, [f"{year}-12-31" if not month else f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"], as_dict=True)
+                s.account,
+                a.account_name,
+                SUM(s.debito) as total_debit,
+                SUM(s.credito) as total_credit,
+                (SUM(s.debito) - SUM(s.credito)) as saldo
+            FROM `tabSaldo Contabil Mensal` s
+            LEFT JOIN `tabAccount` a ON a.name = s.account
+            WHERE s.ano < %s
+            OR (s.ano = %s AND s.mes <= %s)
+            GROUP BY s.account, a.account_name
+            HAVING (SUM(s.debito) != 0 OR SUM(s.credito) != 0)
+            ORDER BY s.account
+        """, [year, year, month or 12], as_dict=True)
         
         # Classificar por classe PCASP
         classificado = {
@@ -279,11 +272,10 @@ class PCASPManager:
         var_aumentativas = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 5) as grupo,
-                SUM(credit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(credito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '3.%%'
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 5)
             ORDER BY grupo
         """, [year], as_dict=True)
@@ -292,11 +284,10 @@ class PCASPManager:
         var_diminutivas = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 5) as grupo,
-                SUM(debit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(debito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '4.%%'
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 5)
             ORDER BY grupo
         """, [year], as_dict=True)
@@ -327,13 +318,12 @@ class PCASPManager:
         ativo = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 3) as grupo,
-                SUM(debit - credit) as saldo
-            FROM `tabGL Entry`
-            WHERE account LIKE '1.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(debito - credito) as saldo
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '1.%%'
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 3)
-            HAVING SUM(debit - credit) != 0
+            HAVING SUM(debito - credito) != 0
             ORDER BY grupo
         """, [year], as_dict=True)
         
@@ -341,13 +331,12 @@ class PCASPManager:
         passivo = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 3) as grupo,
-                SUM(credit - debit) as saldo
-            FROM `tabGL Entry`
-            WHERE account LIKE '2.1%' OR account LIKE '2.2%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(credito - debito) as saldo
+            FROM `tabSaldo Contabil Mensal`
+            WHERE (account LIKE '2.1%%' OR account LIKE '2.2%%')
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 3)
-            HAVING SUM(credit - debit) != 0
+            HAVING SUM(credito - debito) != 0
             ORDER BY grupo
         """, [year], as_dict=True)
         
@@ -355,13 +344,12 @@ class PCASPManager:
         patrimonio_liquido = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 3) as grupo,
-                SUM(credit - debit) as saldo
-            FROM `tabGL Entry`
-            WHERE account LIKE '2.3%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(credito - debito) as saldo
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '2.3%%'
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 3)
-            HAVING SUM(credit - debit) != 0
+            HAVING SUM(credito - debito) != 0
             ORDER BY grupo
         """, [year], as_dict=True)
         
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Saldos mensais do razão (Saldo Contabil Mensal)
+
+Débitos, créditos e número de lançamentos de GL Entry somados por empresa,
+conta, ano/mês, centro de custo (órgão) e fonte de recurso. Dashboards,
+relatórios e demonstrativos do PCASP consultam esta tabela, indexada por
+período e conta, em vez de agregar o razão com YEAR()/MONTH().
+
+A tabela espelha `SUM(...) WHERE is_cancelled = 0` do razão. Cada GL Entry
+submetido soma seus valores na linha do mês, na mesma transação do
+lançamento (INSERT ... ON DUPLICATE KEY UPDATE, seguro com lançamentos
+concorrentes). No cancelamento, o ERPNext marca os lançamentos originais
+como cancelados e grava estornos com débito e crédito trocados: o estorno
+subtrai o original. rebuild_monthly_balances recalcula a tabela a partir
+do razão (reconciliação semanal e após cargas feitas fora do ORM):
+
+    bench --site <site> execute govnext_core.financeiro.saldo_mensal.rebuild_monthly_balances
+
+A fonte de recurso vem da dimensão contábil indicada em site_config
+(`gl_rollup_fonte_field`, ex.: "fonte_recurso"); sem ela, fica vazia.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, now
+
+# Chave da linha: hash das dimensões, igual na atualização e na reconstrução
+_NAME_SQL = "MD5(CONCAT_WS('|', {company}, {account}, {ano}, {mes}, {centro_custo}, {fonte}))"
+
+UPSERT_QUERY = """
+    INSERT INTO `tabSaldo Contabil Mensal`
+        (name, creation, modified, modified_by, owner, docstatus,
+         company, account, ano, mes, centro_custo, fonte_recurso,
+         debito, credito, lancamentos)
+    VALUES
+        ({name}, %(now)s, %(now)s, %(user)s, %(user)s, 0,
+         %(company)s, %(account)s, %(ano)s, %(mes)s, %(centro_custo)s, %(fonte_recurso)s,
+         %(debito)s, %(credito)s, %(lancamentos)s)
+    ON DUPLICATE KEY UPDATE
+        debito = debito + VALUES(debito),
+        credito = credito + VALUES(credito),
+        lancamentos = lancamentos + VALUES(lancamentos),
+        modified = VALUES(modified)
+""".format(name=_NAME_SQL.format(
+    company="%(company)s",
+    account="%(account)s",
+    ano="%(ano)s",
+    mes="%(mes)s",
+    centro_custo="%(centro_custo)s",
+    fonte="%(fonte_recurso)s"
+))
+
+
+def get_fonte_field():
+    """Coluna de GL Entry usada como fonte de recurso (None se não configurada)"""
+    field = frappe.conf.get("gl_rollup_fonte_field")
+    if field and frappe.db.has_column("GL Entry", field):
+        return field
+    return None
+
+
+def apply_gl_entry(doc, debito, credito, lancamentos):
+    """Soma os valores informados na linha do mês do lançamento"""
+    posting_date = getdate(doc.posting_date)
+    fonte_field = get_fonte_field()
+
+    frappe.db.sql(UPSERT_QUERY, {
+        "now": now(),
+        "user": frappe.session.user,
+        "company": doc.company,
+        "account": doc.account,
+        "ano": posting_date.year,
+        "mes": posting_date.month,
+        "centro_custo": doc.get("cost_center") or "",
+        "fonte_recurso": (doc.get(fonte_field) if fonte_field else None) or "",
+        "debito": debito,
+        "credito": credito,
+        "lancamentos": lancamentos
+    })
+
+
+def update_monthly_balance(doc, method=None):
+    """
+    Hook de GL Entry (on_submit, on_trash)
+
+    Erros não são capturados: o lançamento e o saldo mensal são gravados
+    ou desfeitos juntos.
+    """
+    if method == "on_trash":
+        # Exclusão de um lançamento que ainda compunha o saldo
+        if doc.docstatus == 1 and not doc.is_cancelled:
+            apply_gl_entry(doc, -flt(doc.debit), -flt(doc.credit), -1)
+        return
+
+    if doc.is_cancelled:
+        # Estorno: espelha o lançamento original, agora cancelado
+        apply_gl_entry(doc, -flt(doc.credit), -flt(doc.debit), -1)
+    else:
+        apply_gl_entry(doc, flt(doc.debit), flt(doc.credit), 1)
+
+
+def rebuild_monthly_balances(year=None):
+    """
+    Recalcula os saldos mensais a partir do razão
+
+    Args:
+        year: Reconstrói apenas o exercício informado (padrão: todos)
+    """
+    fonte_field = get_fonte_field()
+    fonte = f"IFNULL(`{fonte_field}`, '')" if fonte_field else "''"
+
+    conditions = ["is_cancelled = 0"]
+    values = {"user": frappe.session.user}
+    if year:
+        # Intervalo de datas em vez de YEAR(): usa o índice de posting_date
+        conditions.append("posting_date BETWEEN %(start)s AND %(end)s")
+        values.update({"year": int(year), "start": f"{int(year)}-01-01", "end": f"{int(year)}-12-31"})
+
+    frappe.db.sql(
+        "DELETE FROM `tabSaldo Contabil Mensal`" + (" WHERE ano = %(year)s" if year else ""),
+        values
+    )
+
+    name = _NAME_SQL.format(
+        company="company",
+        account="account",
+        ano="YEAR(posting_date)",
+        mes="MONTH(posting_date)",
+        centro_custo="IFNULL(cost_center, '')",
+        fonte=fonte
+    )
+    where_clause = " AND ".join(conditions)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabSaldo Contabil Mensal`
+            (name, creation, modified, modified_by, owner, docstatus,
+             company, account, ano, mes, centro_custo, fonte_recurso,
+             debito, credito, lancamentos)
+        SELECT
+            {name},
+            NOW(), NOW(), %(user)s, %(user)s, 0,
+            company, account, YEAR(posting_date), MONTH(posting_date),
+            IFNULL(cost_center, ''), {fonte},
+            SUM(debit), SUM(credit), COUNT(*)
+        FROM `tabGL Entry`
+        WHERE {where_clause}
+        GROUP BY company, account, YEAR(posting_date), MONTH(posting_date),
+            IFNULL(cost_center, ''), {fonte}
+    """, values)
+
+    frappe.db.commit()
+
+
+def rebuild_monthly_balances_job():
+    """Job agendado: reconcilia os saldos mensais com o razão"""
+    try:
+        rebuild_monthly_balances()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Erro ao reconstruir saldos mensais: {str(e)}", "Saldo Contabil Mensal")
+
+
+@frappe.whitelist()
+def rebuild_monthly_balances_api(year=None):
+    """API para reconstruir os saldos mensais (em segundo plano)"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "govnext_core.financeiro.saldo_mensal.rebuild_monthly_balances",
+        queue="long",
+        timeout=3600,
+        year=int(year) if year else None
+    )
+    return {"success": True, "message": _("Reconstrução dos saldos mensais enfileirada")}
@@ -169,7 +169,30 @@ doc_events = {
         "after_cancel": "govnext_core.utils.audit.audit_document_change",
         "before_delete": "govnext_core.utils.audit.audit_document_change",
         "after_delete": "govnext_core.utils.audit.audit_document_change",
-        "on_update": "govnext_core.hooks_functions.invalidate_cache_on_update"
+        "on_update": [
+            "govnext_core.hooks_functions.invalidate_cache_on_update",
+            "govnext_core.utils.data_version.bump_data_version_on_change",
+            "govnext_core.utils.search_index.index_document_on_change",
+            "govnext_core.utils.kpi_counters.update_kpi_counters_on_change",
+            "govnext_core.transparencia.transparency_index.mark_transparency_index_on_change"
+        ],
+        "on_update_after_submit": "govnext_core.utils.kpi_counters.update_kpi_counters_on_change",
+        "on_cancel": [
+            "govnext_core.utils.data_version.bump_data_version_on_change",
+            "govnext_core.utils.search_index.index_document_on_change",
+            "govnext_core.utils.kpi_counters.update_kpi_counters_on_change",
+            "govnext_core.transparencia.transparency_index.mark_transparency_index_on_change"
+        ],
+        "on_trash": [
+            "govnext_core.utils.data_version.bump_data_version_on_change",
+            "govnext_core.utils.search_index.index_document_on_change",
+            "govnext_core.utils.kpi_counters.update_kpi_counters_on_change",
+            "govnext_core.transparencia.transparency_index.mark_transparency_index_on_change"
+        ]
+    },
+    "GL Entry": {
+        "on_submit": "govnext_core.financeiro.saldo_mensal.update_monthly_balance",
+        "on_trash": "govnext_core.financeiro.saldo_mensal.update_monthly_balance"
     },
     "User": {
         "after_insert": "govnext_core.hooks_functions.setup_user_permissions",
@@ -200,20 +223,36 @@ scheduler_events = {
         "govnext_core.tasks.all.ping_external_services",
         "govnext_core.tasks.all.cleanup_expired_sessions"
     ],
+    "cron": {
+        # Pré-renderização do portal (só rotas com dados alterados)
+        "*/15 * * * *": [
+            "govnext_core.transparencia.prerender.prerender_portal_job"
+        ]
+    },
     "daily": [
         "govnext_core.tasks.daily.generate_daily_reports",
         "govnext_core.tasks.daily.backup_audit_logs",
         "govnext_core.tasks.daily.cleanup_old_cache",
-        "govnext_core.tasks.daily.send_transparency_notifications"
+        "govnext_core.tasks.daily.send_transparency_notifications",
+        "govnext_core.utils.kpi_counters.reconcile_kpi_counters_job",
+        "govnext_core.transparencia.kpi_history.record_kpi_snapshot_job",
+        "govnext_core.transparencia.transparency_index.rebuild_transparency_index_job"
+    ],
+    "daily_long": [
+        "govnext_core.transparencia.open_data.export_open_data_job"
     ],
     "hourly": [
         "govnext_core.tasks.hourly.sync_external_data",
         "govnext_core.tasks.hourly.update_tender_statuses",
-        "govnext_core.tasks.hourly.warm_up_cache"
+        "govnext_core.tasks.hourly.warm_up_cache",
+        "govnext_core.utils.search_analytics.update_popular_terms_snapshot",
+        "govnext_core.transparencia.reports_manager.cleanup_report_pdfs_job"
     ],
     "weekly": [
         "govnext_core.tasks.weekly.generate_compliance_reports",
-        "govnext_core.tasks.weekly.audit_system_integrity"
+        "govnext_core.tasks.weekly.audit_system_integrity",
+        "govnext_core.utils.search_index.rebuild_search_index_job",
+        "govnext_core.financeiro.saldo_mensal.rebuild_monthly_balances_job"
     ],
     "monthly": [
         "govnext_core.tasks.monthly.archive_old_data",
@@ -314,6 +353,9 @@ website_route_rules = [
     {"from_route": "/licitacao/<name>", "to_route": "public_tender_detail"}
 ]
 
+# Cache de páginas completas do portal (requisições anônimas)
+page_renderer = ["govnext_core.transparencia.page_cache.CachedPageRenderer"]
+
 website_context = {
     "favicon": "/assets/govnext_core/images/favicon.ico",
     "splash_image": "/assets/govnext_core/images/govnext_logo.png",
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Preenche Saldo Contabil Mensal a partir do razão
+
+Indicadores do dashboard, demonstrativos PCASP e comparativos de relatório
+leem apenas os saldos mensais; sem este patch ficariam zerados até a
+primeira execução do job semanal de reconciliação.
+"""
+
+import frappe
+from govnext_core.financeiro.saldo_mensal import rebuild_monthly_balances
+
+
+def execute():
+    years = frappe.db.sql_list("""
+        SELECT DISTINCT YEAR(posting_date)
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        ORDER BY 1
+    """)
+
+    # Um exercício por vez (cada reconstrução faz seu próprio commit)
+    for year in years:
+        if year:
+            rebuild_monthly_balances(year)
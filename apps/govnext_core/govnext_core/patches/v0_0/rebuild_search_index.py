@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Reconstrói o índice de busca no formato com gerações e postings por categoria
+
+As chaves do formato anterior (search:t:<termo>, search:d:<chave>,
+search:stats) não são lidas pela consulta e são apagadas; a reconstrução
+roda em segundo plano para não alongar a migração.
+"""
+
+import frappe
+from govnext_core.utils.cache import cache_system
+
+
+def execute():
+    client = cache_system.redis_client or frappe.cache()
+    prefix = f"{cache_system.cache_prefix}search:"
+
+    for pattern in ("t:*", "d:*", "stats"):
+        for key in client.scan_iter(match=prefix + pattern, count=1000):
+            client.delete(key)
+
+    frappe.enqueue(
+        "govnext_core.utils.search_index.rebuild_search_index_job",
+        queue="long",
+        timeout=3600,
+        enqueue_after_commit=True
+    )
@@ -145,6 +145,54 @@ govnext = {
 
             return parseInt(value.charAt(13)) === digit;
         };
+    },
+
+    // KPIs em tempo real: quadro inicial + alterações enviadas pelo servidor
+    kpis: {
+        versao: null,
+        dados: {},
+        callbacks: [],
+
+        // Registra uma função chamada com (kpis, alterados) a cada atualização
+        subscribe: function(callback) {
+            this.callbacks.push(callback);
+
+            if (this.versao === null) {
+                this.versao = 0;
+                frappe.realtime.on("govnext_kpis", (mensagem) => this.apply(mensagem));
+                this.refresh();
+            } else {
+                callback(this.dados, this.dados);
+            }
+        },
+
+        refresh: function() {
+            frappe.call({
+                method: "govnext_core.utils.kpi_broadcast.get_kpi_snapshot",
+                callback: (r) => {
+                    if (!r.message) return;
+                    this.versao = r.message.versao;
+                    this.dados = r.message.kpis;
+                    this.notify(this.dados);
+                }
+            });
+        },
+
+        apply: function(mensagem) {
+            // Mensagem perdida: recarrega o quadro completo
+            if (mensagem.versao !== this.versao + 1) {
+                this.refresh();
+                return;
+            }
+
+            this.versao = mensagem.versao;
+            Object.assign(this.dados, mensagem.alterados);
+            this.notify(mensagem.alterados);
+        },
+
+        notify: function(alterados) {
+            this.callbacks.forEach((callback) => callback(this.dados, alterados));
+        }
     }
 };
 
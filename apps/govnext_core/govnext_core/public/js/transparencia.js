@@ -0,0 +1,133 @@
+// GovNext - Portal da Transparência
+
+frappe.provide("govnext_portal");
+
+// KPIs do dashboard em tempo real (telas abertas, painéis de recepção).
+// O quadro inicial vem de get_kpi_snapshot; as alterações chegam pelo evento
+// realtime `govnext_kpis` (ver utils/kpi_broadcast.py). Os valores são
+// levados à mesma estrutura de get_dashboard_data e aplicados aos elementos
+// marcados com data-kpi="<grupo>.<indicador>".
+govnext_portal.kpis = {
+    // Chave do quadro -> [grupo, indicador] na estrutura do portal
+    mapa: {
+        receitas: ["financeiro", "receitas_arrecadadas"],
+        despesas: ["financeiro", "despesas_executadas"],
+        resultado: ["financeiro", "resultado_orcamentario"],
+        licitacoes_ativas: ["operacional", "licitacoes_andamento"],
+        obras_execucao: ["operacional", "obras_execucao"]
+    },
+
+    // Intervalo de leitura do quadro quando não há conexão realtime
+    intervalo_sem_realtime: 60000,
+
+    versao: null,
+    dados: {},
+    estrutura: {},
+
+    // `estrutura`: KPIs já carregados por get_dashboard_data (opcional);
+    // sem ela, só inicia em páginas com elementos data-kpi
+    init: function(estrutura) {
+        if (this.versao !== null || !(estrutura || document.querySelector("[data-kpi]"))) return;
+
+        this.estrutura = estrutura || {};
+        this.versao = 0;
+        if (frappe.realtime && frappe.realtime.on) {
+            frappe.realtime.on("govnext_kpis", (mensagem) => this.apply(mensagem));
+        } else {
+            setInterval(() => this.refresh(), this.intervalo_sem_realtime);
+        }
+        this.refresh();
+    },
+
+    refresh: function() {
+        frappe.call({
+            method: "govnext_core.utils.kpi_broadcast.get_kpi_snapshot",
+            callback: (r) => {
+                if (!r.message) return;
+                this.versao = r.message.versao;
+                this.dados = r.message.kpis || {};
+                this.render(this.dados);
+            }
+        });
+    },
+
+    apply: function(mensagem) {
+        // Mensagem perdida: recarrega o quadro completo
+        if (mensagem.versao !== this.versao + 1) {
+            this.refresh();
+            return;
+        }
+
+        this.versao = mensagem.versao;
+        Object.assign(this.dados, mensagem.alterados);
+        this.render(mensagem.alterados);
+    },
+
+    // Quadro (chaves dos contadores) -> estrutura de KPIs do portal
+    mapear: function(alterados) {
+        Object.keys(alterados).forEach((chave) => {
+            const destino = this.mapa[chave];
+            if (!destino) return;
+
+            const [grupo, indicador] = destino;
+            const kpis = this.estrutura[grupo] = this.estrutura[grupo] || {};
+            const kpi = kpis[indicador] = kpis[indicador] || {};
+            kpi.valor = alterados[chave];
+            if (grupo === "financeiro") {
+                kpi.formatado = this.formatar_moeda(kpi.valor);
+            }
+        });
+
+        const financeiro = this.estrutura.financeiro || {};
+        const resultado = financeiro.resultado_orcamentario;
+        if (resultado) {
+            resultado.tipo = resultado.valor >= 0 ? __("Superávit") : __("Déficit");
+        }
+
+        // Percentuais derivados, sobre o orçamento total da carga inicial
+        const orcamento = (financeiro.orcamento_total || {}).valor;
+        if (orcamento) {
+            if (financeiro.receitas_arrecadadas) {
+                financeiro.receitas_arrecadadas.percentual_meta = this.percentual(financeiro.receitas_arrecadadas.valor, orcamento);
+            }
+            if (financeiro.despesas_executadas) {
+                financeiro.despesas_executadas.percentual_orcamento = this.percentual(financeiro.despesas_executadas.valor, orcamento);
+            }
+        }
+
+        return this.estrutura;
+    },
+
+    render: function(alterados) {
+        const estrutura = this.mapear(alterados);
+
+        document.querySelectorAll("[data-kpi]").forEach((elemento) => {
+            const [grupo, indicador] = elemento.dataset.kpi.split(".");
+            const kpi = (estrutura[grupo] || {})[indicador];
+            if (!kpi) return;
+
+            elemento.textContent = kpi.formatado || this.formatar_numero(kpi.valor);
+            if (kpi.tipo) {
+                elemento.dataset.tipo = kpi.tipo;
+            }
+        });
+
+        $(document).trigger("govnext:kpis", [estrutura, alterados]);
+    },
+
+    percentual: function(valor, total) {
+        return Math.round((valor || 0) / total * 1000) / 10;
+    },
+
+    formatar_moeda: function(valor) {
+        return new Intl.NumberFormat("pt-BR", {style: "currency", currency: "BRL"}).format(valor || 0);
+    },
+
+    formatar_numero: function(valor) {
+        return new Intl.NumberFormat("pt-BR").format(valor || 0);
+    }
+};
+
+$(document).ready(function() {
+    govnext_portal.kpis.init();
+});
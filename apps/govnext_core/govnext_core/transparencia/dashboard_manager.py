@@ -9,7 +9,27 @@ from frappe import _
 from datetime import datetime, date, timedelta
 import json
 import calendar
+import numpy as np
 from ..utils.cache_manager import cached_function, cache_manager
+from ..utils.parallel import run_concurrently, TASK_OK
+from ..utils.kpi_counters import get_kpi_counters, ensure_kpi_counters
+from .forecasting import get_forecasts
+from . import transparency_index
+
+# Limite de meses de uma série temporal (20 anos)
+MAX_SERIES_MONTHS = 240
+
+# Tempo máximo de cada seção dos dashboards, em segundos
+# (padrão: `dashboard_section_timeout` do site_config ou 20)
+DASHBOARD_SECTION_TIMEOUT = 20
+DASHBOARD_SECTION_TIMEOUTS = {
+    "execucao_orcamentaria": 30,
+    "transparencia_metrics": 30,
+}
+
+# Seções calculadas ao mesmo tempo por dashboard
+# (padrão: `dashboard_max_workers` do site_config ou 3)
+DASHBOARD_MAX_WORKERS = 3
 
 class TransparencyDashboardManager:
     """Gerenciador de dashboards de transparência"""
@@ -18,12 +38,139 @@ class TransparencyDashboardManager:
         self.current_year = datetime.now().year
         self.current_month = datetime.now().month
     
+    def parse_period(self, period):
+        """Aceita (ano, mês) ou 'AAAA-MM'; devolve o índice absoluto do mês"""
+        try:
+            if isinstance(period, str):
+                year, month = period.split("-")[:2]
+            else:
+                year, month = period
+            
+            year, month = int(year), int(month)
+        except (TypeError, ValueError):
+            frappe.throw(_("Período inválido: {0} (use AAAA-MM)").format(period), frappe.ValidationError)
+        
+        if not 1 <= month <= 12:
+            frappe.throw(_("Mês inválido: {0}").format(month), frappe.ValidationError)
+        
+        return year * 12 + month - 1
+    
+    def get_monthly_series(self, start, end):
+        """
+        Série mensal de receitas e despesas entre dois meses (inclusive)
+        
+        Uma única consulta agrupada aos saldos mensais, limitada pelos anos
+        do intervalo; meses sem lançamentos são preenchidos com zero.
+        
+        Args:
+            start, end: (ano, mês) ou 'AAAA-MM'
+        
+        Returns:
+            Dict de arrays NumPy alinhados: indices (ano*12 + mês-1),
+            receitas, despesas, saldo, lancamentos_receitas, lancamentos_despesas
+        """
+        start_index = self.parse_period(start)
+        end_index = self.parse_period(end)
+        size = end_index - start_index + 1
+        
+        if size < 1 or size > MAX_SERIES_MONTHS:
+            frappe.throw(
+                _("Intervalo inválido: informe de 1 a {0} meses").format(MAX_SERIES_MONTHS),
+                frappe.ValidationError
+            )
+        
+        rows = frappe.db.sql("""
+            SELECT
+                ano * 12 + mes - 1 as indice,
+                SUM(CASE WHEN account LIKE '3.%%' THEN debito ELSE 0 END) as receitas,
+                SUM(CASE WHEN account LIKE '4.%%' THEN credito ELSE 0 END) as despesas,
+                SUM(CASE WHEN account LIKE '3.%%' THEN lancamentos ELSE 0 END) as lancamentos_receitas,
+                SUM(CASE WHEN account LIKE '4.%%' THEN lancamentos ELSE 0 END) as lancamentos_despesas
+            FROM `tabSaldo Contabil Mensal`
+            WHERE ano BETWEEN %s AND %s
+            AND ano * 12 + mes - 1 BETWEEN %s AND %s
+            AND (account LIKE '3.%%' OR account LIKE '4.%%')
+            GROUP BY ano, mes
+        """, [start_index // 12, end_index // 12, start_index, end_index])
+        
+        series = {
+            "indices": np.arange(start_index, end_index + 1),
+            "receitas": np.zeros(size),
+            "despesas": np.zeros(size),
+            "lancamentos_receitas": np.zeros(size, dtype=np.int64),
+            "lancamentos_despesas": np.zeros(size, dtype=np.int64)
+        }
+        
+        if rows:
+            data = np.array(rows, dtype=float)
+            positions = data[:, 0].astype(np.int64) - start_index
+            series["receitas"][positions] = data[:, 1]
+            series["despesas"][positions] = data[:, 2]
+            series["lancamentos_receitas"][positions] = data[:, 3]
+            series["lancamentos_despesas"][positions] = data[:, 4]
+        
+        series["saldo"] = series["receitas"] - series["despesas"]
+        return series
+    
+    @cached_function('financial_data', ttl=1800)
+    def get_time_series(self, start, end):
+        """Série mensal serializável (listas) para gráficos e API"""
+        series = self.get_monthly_series(start, end)
+        
+        return {
+            "periodos": [f"{index // 12}-{index % 12 + 1:02d}" for index in series["indices"].tolist()],
+            "receitas": series["receitas"].tolist(),
+            "despesas": series["despesas"].tolist(),
+            "saldo": series["saldo"].tolist()
+        }
+    
+    def build_sections(self, sections):
+        """
+        Calcula as seções de um dashboard em paralelo
+        
+        Cada seção roda em uma thread com contexto de site e conexão
+        próprios (utils/parallel), com tempo limite individual. Seções que
+        falham ou estouram o tempo ficam como None e são listadas em
+        `secoes_indisponiveis`, sem derrubar o restante do dashboard.
+        
+        Args:
+            sections: Seção -> (método, args)
+        
+        Returns:
+            Tupla (dados por seção, {seção: "error"|"timeout"})
+        """
+        default_timeout = frappe.conf.get("dashboard_section_timeout", DASHBOARD_SECTION_TIMEOUT)
+        outcomes = run_concurrently(
+            {key: (method, args, {}) for key, (method, args) in sections.items()},
+            max_workers=frappe.conf.get("dashboard_max_workers", DASHBOARD_MAX_WORKERS),
+            timeouts={key: DASHBOARD_SECTION_TIMEOUTS.get(key, default_timeout) for key in sections}
+        )
+        
+        data, unavailable = {}, {}
+        for key, outcome in outcomes.items():
+            if outcome["status"] == TASK_OK:
+                data[key] = outcome["result"]
+            else:
+                data[key] = None
+                unavailable[key] = outcome["status"]
+        
+        return data, unavailable
+    
     def get_executive_dashboard(self, year=None, month=None):
         """Dashboard executivo principal"""
         year = year or self.current_year
         month = month or self.current_month
         
         try:
+            sections, unavailable = self.build_sections({
+                "indicadores_principais": (self.get_main_indicators, (year, month)),
+                "receitas_despesas": (self.get_revenue_expense_summary, (year, month)),
+                "execucao_orcamentaria": (self.get_budget_execution, (year,)),
+                "licitacoes_contratos": (self.get_tenders_contracts_summary, (year,)),
+                "obras_publicas": (self.get_public_works_summary, (year,)),
+                "transparencia_metrics": (self.get_transparency_metrics, (year, month))
+            })
+            
             dashboard = {
                 "periodo": {
                     "ano": year,
@@ -31,12 +178,8 @@ class TransparencyDashboardManager:
                     "mes_nome": calendar.month_name[month],
                     "ultima_atualizacao": frappe.utils.now()
                 },
-                "indicadores_principais": self.get_main_indicators(year, month),
-                "receitas_despesas": self.get_revenue_expense_summary(year, month),
-                "execucao_orcamentaria": self.get_budget_execution(year),
-                "licitacoes_contratos": self.get_tenders_contracts_summary(year),
-                "obras_publicas": self.get_public_works_summary(year),
-                "transparencia_metrics": self.get_transparency_metrics(year, month)
+                **sections,
+                "secoes_indisponiveis": unavailable
             }
             
             return {
@@ -51,52 +194,39 @@ class TransparencyDashboardManager:
                 "error": str(e)
             }
     
-    @cached_function('transparency_data', ttl=1800)
     def get_main_indicators(self, year, month):
-        """Indicadores principais do município"""
-        # Receita total do ano
-        receita_total = frappe.db.sql("""
-            SELECT SUM(debit) as total
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
-        """, [year])[0][0] or 0
-        
-        # Despesa total do ano
-        despesa_total = frappe.db.sql("""
-            SELECT SUM(credit) as total
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
-        """, [year])[0][0] or 0
-        
-        # Receita do mês
-        receita_mes = frappe.db.sql("""
-            SELECT SUM(debit) as total
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND MONTH(posting_date) = %s
-            AND is_cancelled = 0
-        """, [year, month])[0][0] or 0
-        
-        # Despesa do mês
-        despesa_mes = frappe.db.sql("""
-            SELECT SUM(credit) as total
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND MONTH(posting_date) = %s
-            AND is_cancelled = 0
-        """, [year, month])[0][0] or 0
-        
-        # Obras em execução
-        obras_execucao = frappe.db.count("Obra Publica", {"status": "Em Execução"})
-        
-        # Licitações ativas
-        licitacoes_ativas = frappe.db.count("Public Tender", {"status": "Active"})
+        """
+        Indicadores principais do município
+        
+        Lidos dos contadores de KPI (atualizados pelos eventos de documento),
+        sem cache; enquanto os contadores não forem reconciliados, consulta
+        o banco.
+        """
+        contadores = get_kpi_counters(year, month)
+        
+        if contadores:
+            receita_total = contadores["receitas"]
+            despesa_total = contadores["despesas"]
+            receita_mes = contadores["receitas_mes"]
+            despesa_mes = contadores["despesas_mes"]
+            obras_execucao = contadores["obras_execucao"]
+            licitacoes_ativas = contadores["licitacoes_ativas"]
+        else:
+            ensure_kpi_counters()
+            
+            # Receitas e despesas do ano e do mês
+            serie = self.get_monthly_series((year, 1), (year, 12))
+            
+            receita_total = float(serie["receitas"].sum())
+            despesa_total = float(serie["despesas"].sum())
+            receita_mes = float(serie["receitas"][month - 1])
+            despesa_mes = float(serie["despesas"][month - 1])
+            
+            # Obras em execução
+            obras_execucao = frappe.db.count("Obra Publica", {"status": "Em Execução"})
+            
+            # Licitações ativas
+            licitacoes_ativas = frappe.db.count("Public Tender", {"status": "Active"})
         
         # População estimada (valor configurável)
         populacao = frappe.db.get_single_value("Municipality Settings", "population") or 50000
@@ -126,11 +256,10 @@ class TransparencyDashboardManager:
         receitas_categoria = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 3) as categoria,
-                SUM(debit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(debito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '3.%%'
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 3)
             ORDER BY valor DESC
         """, [year], as_dict=True)
@@ -139,43 +268,32 @@ class TransparencyDashboardManager:
         despesas_categoria = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 3) as categoria,
-                SUM(credit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(credito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '4.%%'
+            AND ano = %s
             GROUP BY SUBSTRING(account, 1, 3)
             ORDER BY valor DESC
         """, [year], as_dict=True)
         
         # Evolução mensal
-        evolucao_mensal = []
-        for mes in range(1, 13):
-            receita_mes = frappe.db.sql("""
-                SELECT SUM(debit) as total
-                FROM `tabGL Entry`
-                WHERE account LIKE '3.%'
-                AND YEAR(posting_date) = %s
-                AND MONTH(posting_date) = %s
-                AND is_cancelled = 0
-            """, [year, mes])[0][0] or 0
-            
-            despesa_mes = frappe.db.sql("""
-                SELECT SUM(credit) as total
-                FROM `tabGL Entry`
-                WHERE account LIKE '4.%'
-                AND YEAR(posting_date) = %s
-                AND MONTH(posting_date) = %s
-                AND is_cancelled = 0
-            """, [year, mes])[0][0] or 0
-            
-            evolucao_mensal.append({
+        serie = self.get_monthly_series((year, 1), (year, 12))
+        
+        evolucao_mensal = [
+            {
                 "mes": mes,
                 "mes_nome": calendar.month_abbr[mes],
-                "receitas": receita_mes,
-                "despesas": despesa_mes,
-                "saldo": receita_mes - despesa_mes
-            })
+                "receitas": receitas,
+                "despesas": despesas,
+                "saldo": saldo
+            }
+            for mes, receitas, despesas, saldo in zip(
+                range(1, 13),
+                serie["receitas"].tolist(),
+                serie["despesas"].tolist(),
+                serie["saldo"].tolist()
+            )
+        ]
         
         return {
             "receitas_por_categoria": receitas_categoria,
@@ -354,106 +472,33 @@ class TransparencyDashboardManager:
             "indice_transparencia": indice_transparencia
         }
     
-    def calculate_transparency_index(self, year):
-        """Calcular índice de transparência"""
-        # Critérios para índice de transparência
-        criterios = {
-            "receitas_publicadas": 0,
-            "despesas_publicadas": 0,
-            "licitacoes_publicadas": 0,
-            "contratos_publicados": 0,
-            "orcamento_publicado": 0,
-            "obras_publicadas": 0
-        }
-        
-        # Verificar se dados estão sendo publicados regularmente
-        meses_com_receitas = frappe.db.sql("""
-            SELECT COUNT(DISTINCT MONTH(posting_date))
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
-        """, [year])[0][0] or 0
-        
-        criterios["receitas_publicadas"] = min(meses_com_receitas / 12 * 100, 100)
-        
-        meses_com_despesas = frappe.db.sql("""
-            SELECT COUNT(DISTINCT MONTH(posting_date))
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
-        """, [year])[0][0] or 0
-        
-        criterios["despesas_publicadas"] = min(meses_com_despesas / 12 * 100, 100)
-        
-        # Licitações e contratos
-        licitacoes_ano = frappe.db.count("Public Tender", {"YEAR(opening_date)": year})
-        criterios["licitacoes_publicadas"] = min(licitacoes_ano / 10 * 100, 100)  # Meta: 10 licitações/ano
-        
-        contratos_ano = frappe.db.count("Purchase Order", {"YEAR(transaction_date)": year})
-        criterios["contratos_publicados"] = min(contratos_ano / 20 * 100, 100)  # Meta: 20 contratos/ano
-        
-        # Orçamento
-        orcamento_existe = frappe.db.exists("Budget", {"fiscal_year": year})
-        criterios["orcamento_publicado"] = 100 if orcamento_existe else 0
-        
-        # Obras
-        obras_ano = frappe.db.count("Obra Publica", {"YEAR(data_criacao)": year})
-        criterios["obras_publicadas"] = min(obras_ano / 5 * 100, 100)  # Meta: 5 obras/ano
-        
-        # Calcular média ponderada
-        pesos = {
-            "receitas_publicadas": 0.2,
-            "despesas_publicadas": 0.2,
-            "licitacoes_publicadas": 0.15,
-            "contratos_publicados": 0.15,
-            "orcamento_publicado": 0.15,
-            "obras_publicadas": 0.15
-        }
-        
-        indice = sum(criterios[k] * pesos[k] for k in criterios.keys())
-        
-        return {
-            "indice_geral": round(indice, 1),
-            "criterios": criterios,
-            "classificacao": self.get_transparency_classification(indice)
-        }
+    def calculate_transparency_index(self, year, month=None):
+        """
+        Índice de transparência (materializado por mês, ver
+        transparencia.transparency_index)
+        """
+        return transparency_index.get_transparency_index(year, month)
     
     def get_transparency_classification(self, indice):
         """Classificar nível de transparência"""
-        if indice >= 90:
-            return {"nivel": "Excelente", "cor": "success"}
-        elif indice >= 75:
-            return {"nivel": "Bom", "cor": "primary"}
-        elif indice >= 60:
-            return {"nivel": "Regular", "cor": "warning"}
-        else:
-            return {"nivel": "Insuficiente", "cor": "danger"}
+        return transparency_index.get_transparency_classification(indice)
     
     def get_financial_dashboard(self, year=None):
         """Dashboard financeiro detalhado"""
         year = year or self.current_year
         
         try:
-            # Análise de receitas
-            analise_receitas = self.get_detailed_revenue_analysis(year)
-            
-            # Análise de despesas
-            analise_despesas = self.get_detailed_expense_analysis(year)
-            
-            # Comparativo com anos anteriores
-            comparativo_anos = self.get_year_comparison(year)
-            
-            # Projeções
-            projecoes = self.get_financial_projections(year)
+            sections, unavailable = self.build_sections({
+                "analise_receitas": (self.get_detailed_revenue_analysis, (year,)),
+                "analise_despesas": (self.get_detailed_expense_analysis, (year,)),
+                "comparativo_anos": (self.get_year_comparison, (year,)),
+                "projecoes": (self.get_financial_projections, (year,))
+            })
             
             dashboard = {
                 "ano": year,
-                "analise_receitas": analise_receitas,
-                "analise_despesas": analise_despesas,
-                "comparativo_anos": comparativo_anos,
-                "projecoes": projecoes,
+                **sections,
+                "secoes_indisponiveis": unavailable,
                 "ultima_atualizacao": frappe.utils.now()
             }
             
@@ -475,15 +520,14 @@ class TransparencyDashboardManager:
         receitas_fonte = frappe.db.sql("""
             SELECT 
                 CASE 
-                    WHEN account LIKE '3.1%' THEN 'Receitas Correntes'
-                    WHEN account LIKE '3.2%' THEN 'Receitas de Capital'
+                    WHEN account LIKE '3.1%%' THEN 'Receitas Correntes'
+                    WHEN account LIKE '3.2%%' THEN 'Receitas de Capital'
                     ELSE 'Outras Receitas'
                 END as fonte,
-                SUM(debit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(debito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '3.%%'
+            AND ano = %s
             GROUP BY fonte
         """, [year], as_dict=True)
         
@@ -491,14 +535,13 @@ class TransparencyDashboardManager:
         receitas_tipo = frappe.db.sql("""
             SELECT 
                 CASE 
-                    WHEN account LIKE '3.1.1%' THEN 'Tributárias'
+                    WHEN account LIKE '3.1.1%%' THEN 'Tributárias'
                     ELSE 'Não Tributárias'
                 END as tipo,
-                SUM(debit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.1%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(debito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '3.1%%'
+            AND ano = %s
             GROUP BY tipo
         """, [year], as_dict=True)
         
@@ -506,11 +549,10 @@ class TransparencyDashboardManager:
         top_receitas = frappe.db.sql("""
             SELECT 
                 account as conta,
-                SUM(debit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(debito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '3.%%'
+            AND ano = %s
             GROUP BY account
             ORDER BY valor DESC
             LIMIT 10
@@ -529,11 +571,10 @@ class TransparencyDashboardManager:
         despesas_funcao = frappe.db.sql("""
             SELECT 
                 SUBSTRING(account, 1, 5) as funcao,
-                SUM(credit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(credito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '4.%%'
+            AND ano = %s
             GROUP BY funcao
             ORDER BY valor DESC
             LIMIT 10
@@ -543,32 +584,32 @@ class TransparencyDashboardManager:
         despesas_tipo = frappe.db.sql("""
             SELECT 
                 CASE 
-                    WHEN account LIKE '4.1%' OR account LIKE '4.2%' THEN 'Correntes'
-                    WHEN account LIKE '4.3%' OR account LIKE '4.4%' THEN 'Capital'
+                    WHEN account LIKE '4.1%%' OR account LIKE '4.2%%' THEN 'Correntes'
+                    WHEN account LIKE '4.3%%' OR account LIKE '4.4%%' THEN 'Capital'
                     ELSE 'Outras'
                 END as tipo,
-                SUM(credit) as valor
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND is_cancelled = 0
+                SUM(credito) as valor
+            FROM `tabSaldo Contabil Mensal`
+            WHERE account LIKE '4.%%'
+            AND ano = %s
             GROUP BY tipo
         """, [year], as_dict=True)
         
-        # Maiores fornecedores
+        # Maiores fornecedores (favorecido não é dimensão dos saldos mensais:
+        # consulta o razão, com intervalo de datas para usar o índice)
         maiores_fornecedores = frappe.db.sql("""
             SELECT 
                 party as fornecedor,
                 SUM(credit) as valor_total
             FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
+            WHERE account LIKE '4.%%'
+            AND posting_date BETWEEN %s AND %s
             AND is_cancelled = 0
             AND party IS NOT NULL
             GROUP BY party
             ORDER BY valor_total DESC
             LIMIT 10
-        """, [year], as_dict=True)
+        """, [f"{year}-01-01", f"{year}-12-31"], as_dict=True)
         
         return {
             "despesas_por_funcao": despesas_funcao,
@@ -578,71 +619,60 @@ class TransparencyDashboardManager:
     
     def get_year_comparison(self, year):
         """Comparativo entre anos"""
-        comparativo = []
-        
-        for ano in range(year - 2, year + 1):
-            receita = frappe.db.sql("""
-                SELECT SUM(debit) as total
-                FROM `tabGL Entry`
-                WHERE account LIKE '3.%'
-                AND YEAR(posting_date) = %s
-                AND is_cancelled = 0
-            """, [ano])[0][0] or 0
-            
-            despesa = frappe.db.sql("""
-                SELECT SUM(credit) as total
-                FROM `tabGL Entry`
-                WHERE account LIKE '4.%'
-                AND YEAR(posting_date) = %s
-                AND is_cancelled = 0
-            """, [ano])[0][0] or 0
-            
-            comparativo.append({
+        # Três anos completos: a série mensal vira uma matriz ano x mês
+        serie = self.get_monthly_series((year - 2, 1), (year, 12))
+        receitas = serie["receitas"].reshape(3, 12).sum(axis=1).tolist()
+        despesas = serie["despesas"].reshape(3, 12).sum(axis=1).tolist()
+        
+        return [
+            {
                 "ano": ano,
                 "receita": receita,
                 "despesa": despesa,
                 "saldo": receita - despesa
-            })
-        
-        return comparativo
+            }
+            for ano, receita, despesa in zip(range(year - 2, year + 1), receitas, despesas)
+        ]
     
     def get_financial_projections(self, year):
-        """Projeções financeiras"""
-        # Calcular tendência baseada nos meses já decorridos
-        meses_decorridos = datetime.now().month if year == self.current_year else 12
+        """
+        Projeções financeiras
         
-        receita_acumulada = frappe.db.sql("""
-            SELECT SUM(debit) as total
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND MONTH(posting_date) <= %s
-            AND is_cancelled = 0
-        """, [year, meses_decorridos])[0][0] or 0
+        Tendência e sazonalidade ajustadas sobre o histórico mensal (ver
+        transparencia.forecasting), com intervalo de predição de 95%, para
+        os totais e por fonte de receita e função de despesa.
+        """
+        meses_decorridos = datetime.now().month if year == self.current_year else 12
         
-        despesa_acumulada = frappe.db.sql("""
-            SELECT SUM(credit) as total
-            FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND MONTH(posting_date) <= %s
-            AND is_cancelled = 0
-        """, [year, meses_decorridos])[0][0] or 0
+        serie = self.get_monthly_series((year, 1), (year, meses_decorridos))
+        receita_acumulada = float(serie["receitas"].sum())
+        despesa_acumulada = float(serie["despesas"].sum())
         
-        if meses_decorridos > 0 and year == self.current_year:
-            projecao_receita = (receita_acumulada / meses_decorridos) * 12
-            projecao_despesa = (despesa_acumulada / meses_decorridos) * 12
-        else:
-            projecao_receita = receita_acumulada
-            projecao_despesa = despesa_acumulada
+        previsoes = get_forecasts(year)
+        series = {(item["tipo"], item["grupo"]): item for item in previsoes["series"]}
+        receita = series[("receitas", "total")]
+        despesa = series[("despesas", "total")]
         
         return {
             "receita_acumulada": receita_acumulada,
             "despesa_acumulada": despesa_acumulada,
-            "projecao_receita_anual": projecao_receita,
-            "projecao_despesa_anual": projecao_despesa,
-            "projecao_saldo": projecao_receita - projecao_despesa,
-            "meses_decorridos": meses_decorridos
+            "projecao_receita_anual": receita["projecao_anual"],
+            "projecao_despesa_anual": despesa["projecao_anual"],
+            "projecao_saldo": receita["projecao_anual"] - despesa["projecao_anual"],
+            "intervalo_receita_anual": receita["intervalo_anual"],
+            "intervalo_despesa_anual": despesa["intervalo_anual"],
+            "previsao_mensal_receita": receita["mensal"],
+            "previsao_mensal_despesa": despesa["mensal"],
+            "receitas_por_fonte": [
+                item for item in previsoes["series"]
+                if item["tipo"] == "receitas" and item["grupo"] != "total"
+            ],
+            "despesas_por_funcao": [
+                item for item in previsoes["series"]
+                if item["tipo"] == "despesas" and item["grupo"] != "total"
+            ],
+            "meses_decorridos": meses_decorridos,
+            "meses_fechados": previsoes["meses_fechados"]
         }
 
 # Instância global
@@ -665,13 +695,17 @@ def get_financial_dashboard_api(year=None):
     )
 
 @frappe.whitelist(allow_guest=True)
-def get_transparency_index():
-    """API para índice de transparência"""
-    year = datetime.now().year
-    month = datetime.now().month
-    metrics = dashboard_manager.get_transparency_metrics(year, month)
-    
+def get_time_series_api(start, end):
+    """API da série mensal de receitas e despesas (períodos 'AAAA-MM')"""
+    return {
+        "success": True,
+        "data": dashboard_manager.get_time_series(start, end)
+    }
+
+@frappe.whitelist(allow_guest=True)
+def get_transparency_index(year=None, month=None):
+    """API para índice de transparência, com pontuação por critério e evolução mensal"""
     return {
         "success": True,
-        "data": metrics["indice_transparencia"]
+        "data": dashboard_manager.calculate_transparency_index(year or datetime.now().year, month)
     }
\ No newline at end of file
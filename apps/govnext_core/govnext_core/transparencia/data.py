@@ -0,0 +1,629 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Consultas de dados do Portal da Transparência
+
+Camada de dados, sem HTTP, compartilhada pelos endpoints da API
+(api/v1), pelas consultas em lote e pela pré-renderização do portal
+(PRERENDER_JSON em transparencia/prerender.py). As listagens usam
+paginação por cursor e projeção de campos; os resultados ficam em cache
+sob a versão dos dados de que dependem (utils/data_version).
+"""
+
+import frappe
+from datetime import datetime
+from ..utils.cache_manager import cached_function, cache_manager
+from ..utils.data_version import get_data_version
+from ..api.v2.utils.pagination import keyset_condition, order_by, next_cursor
+from ..api.v2.utils.fieldsets import select_clause
+
+# Categorias de dados (carimbos de versão) das quais cada consulta depende
+TRANSPARENCY_DATA_CATEGORIES = {
+    "receitas": ["receitas"],
+    "despesas": ["despesas"],
+    "contratos": ["contratos"],
+    "licitacoes": ["licitacoes"],
+    "orcamento": ["orcamento"],
+    "servidores": ["servidores"],
+}
+GENERAL_DATA_CATEGORIES = ["receitas", "despesas", "contratos", "licitacoes", "orcamento"]
+
+# Chave de ordenação (colunas SQL, campos da linha, decrescente) das listagens.
+# A última coluna desempata linhas com o mesmo valor, garantindo ordem estável
+# para a paginação por cursor.
+LISTING_KEYS = {
+    "receitas": (["posting_date", "voucher_no", "account"], ["data", "documento", "conta"], True),
+    "despesas": (
+        ["posting_date", "voucher_no", "account", "party"],
+        ["data", "documento", "conta", "favorecido"],
+        True
+    ),
+    "contratos": (["start_date", "name"], ["data_inicio", "numero_contrato"], True),
+    "licitacoes": (["opening_date", "name"], ["data_abertura", "numero_licitacao"], True),
+    "servidores": (["employee_name", "name"], ["nome", "matricula"], False),
+}
+
+# Colunas da chave que aceitam NULL (ordenadas por último; ver keyset_condition)
+LISTING_NULLABLE = {
+    "despesas": ["party"],
+    "contratos": ["start_date"],
+    "licitacoes": ["opening_date"],
+}
+
+# Campos publicáveis de cada listagem (nome público -> expressão SQL).
+# Aceitos no parâmetro `fields`; a ordem define a resposta padrão.
+TRANSPARENCY_FIELDS = {
+    "receitas": {
+        "conta": "account",
+        "valor": "SUM(debit)",
+        "data": "posting_date",
+        "documento": "voucher_no",
+        "observacoes": "remarks",
+    },
+    "despesas": {
+        "conta": "account",
+        "valor": "SUM(credit)",
+        "data": "posting_date",
+        "documento": "voucher_no",
+        "observacoes": "remarks",
+        "favorecido": "party",
+    },
+    "contratos": {
+        "numero_contrato": "name",
+        "objeto": "title",
+        "contratado": "supplier",
+        "valor": "total_amount",
+        "data_inicio": "start_date",
+        "data_fim": "end_date",
+        "status": "status",
+    },
+    "licitacoes": {
+        "numero_licitacao": "name",
+        "objeto": "tender_title",
+        "modalidade": "tender_type",
+        "valor_estimado": "estimated_amount",
+        "data_abertura": "opening_date",
+        "status": "status",
+        "vencedor": "winner",
+    },
+    "servidores": {
+        "nome": "employee_name",
+        "matricula": "name",
+        "cargo": "designation",
+        "lotacao": "department",
+        "data_admissao": "date_of_joining",
+        "tipo_vinculo": "employment_type",
+        "status": "status",
+    },
+}
+
+# ========== DADOS DE TRANSPARÊNCIA ==========
+
+def fetch_transparency_data(category=None, year=None, month=None, limit=100, offset=0, cursor=None,
+                            fields=None):
+    """
+    Consulta de dados de transparência, sem camada HTTP
+    
+    Compartilhada pelos endpoints da API, pelas consultas em lote e pela
+    pré-renderização do portal.
+    
+    Returns:
+        Tupla (dados, meta)
+    """
+    filters = {}
+    
+    if year:
+        filters['year'] = int(year)
+    
+    if month:
+        filters['month'] = int(month)
+    
+    if category == "receitas":
+        data = get_revenue_data(filters, limit, offset, cursor, fields)
+    elif category == "despesas":
+        data = get_expense_data(filters, limit, offset, cursor, fields)
+    elif category == "contratos":
+        data = get_contract_data(filters, limit, offset, cursor, fields)
+    elif category == "licitacoes":
+        data = get_tender_data(filters, limit, offset, cursor, fields)
+    elif category == "orcamento":
+        data = get_budget_data(filters, limit, offset)
+    elif category == "servidores":
+        data = get_employee_data(filters, limit, offset, cursor, fields)
+    else:
+        data = get_general_transparency_data(filters, limit, offset)
+    
+    meta = {
+        "category": category,
+        "total_records": len(data) if isinstance(data, list) else 1
+    }
+    
+    if category in LISTING_KEYS:
+        meta["next_cursor"] = next_cursor(data, LISTING_KEYS[category][1], limit)
+    
+    return data, meta
+
+@cached_function('transparency_data', ttl=1800, data_categories=["receitas"])
+def get_revenue_data(filters, limit, offset, cursor=None, fields=None):
+    """Obter dados de receitas"""
+    columns, keys, descending = LISTING_KEYS["receitas"]
+    conditions = []
+    values = []
+    
+    if filters.get('year'):
+        conditions.append("YEAR(posting_date) = %s")
+        values.append(filters['year'])
+    
+    if filters.get('month'):
+        conditions.append("MONTH(posting_date) = %s")
+        values.append(filters['month'])
+    
+    # Paginação por cursor substitui o OFFSET
+    keyset, keyset_values = keyset_condition(columns, cursor, descending)
+    if keyset:
+        conditions.append(keyset)
+        values.extend(keyset_values)
+        offset = 0
+    
+    where_clause = " AND " + " AND ".join(conditions) if conditions else ""
+    
+    query = f"""
+        SELECT 
+            {select_clause(TRANSPARENCY_FIELDS["receitas"], fields, keys)}
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        AND account LIKE '3.%'  -- Contas de receita
+        {where_clause}
+        GROUP BY account, posting_date, voucher_no
+        ORDER BY {order_by(columns, descending)}
+        LIMIT %s OFFSET %s
+    """
+    
+    values.extend([limit, offset])
+    
+    return frappe.db.sql(query, values, as_dict=True)
+
+@cached_function('transparency_data', ttl=1800, data_categories=["despesas"])
+def get_expense_data(filters, limit, offset, cursor=None, fields=None):
+    """Obter dados de despesas"""
+    columns, keys, descending = LISTING_KEYS["despesas"]
+    conditions = []
+    values = []
+    
+    if filters.get('year'):
+        conditions.append("YEAR(posting_date) = %s")
+        values.append(filters['year'])
+    
+    if filters.get('month'):
+        conditions.append("MONTH(posting_date) = %s")
+        values.append(filters['month'])
+    
+    # Paginação por cursor substitui o OFFSET
+    keyset, keyset_values = keyset_condition(columns, cursor, descending, LISTING_NULLABLE["despesas"])
+    if keyset:
+        conditions.append(keyset)
+        values.extend(keyset_values)
+        offset = 0
+    
+    where_clause = " AND " + " AND ".join(conditions) if conditions else ""
+    
+    query = f"""
+        SELECT 
+            {select_clause(TRANSPARENCY_FIELDS["despesas"], fields, keys)}
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        AND account LIKE '4.%'  -- Contas de despesa
+        {where_clause}
+        GROUP BY account, posting_date, voucher_no, party
+        ORDER BY {order_by(columns, descending)}
+        LIMIT %s OFFSET %s
+    """
+    
+    values.extend([limit, offset])
+    
+    return frappe.db.sql(query, values, as_dict=True)
+
+@cached_function('transparency_data', ttl=3600, data_categories=["contratos"])
+def get_contract_data(filters, limit, offset, cursor=None, fields=None):
+    """Obter dados de contratos"""
+    columns, keys, descending = LISTING_KEYS["contratos"]
+    conditions = []
+    values = []
+    
+    if filters.get('year'):
+        conditions.append("YEAR(start_date) = %s")
+        values.append(filters['year'])
+    
+    # Paginação por cursor substitui o OFFSET
+    keyset, keyset_values = keyset_condition(columns, cursor, descending, LISTING_NULLABLE["contratos"])
+    if keyset:
+        conditions.append(keyset)
+        values.extend(keyset_values)
+        offset = 0
+    
+    where_clause = " AND " + " AND ".join(conditions) if conditions else ""
+    
+    query = f"""
+        SELECT 
+            {select_clause(TRANSPARENCY_FIELDS["contratos"], fields, keys)}
+        FROM `tabPurchase Order`
+        WHERE docstatus = 1
+        {where_clause}
+        ORDER BY {order_by(columns, descending)}
+        LIMIT %s OFFSET %s
+    """
+    
+    values.extend([limit, offset])
+    
+    return frappe.db.sql(query, values, as_dict=True)
+
+@cached_function('transparency_data', ttl=3600, data_categories=["licitacoes"])
+def get_tender_data(filters, limit, offset, cursor=None, fields=None):
+    """Obter dados de licitações"""
+    columns, keys, descending = LISTING_KEYS["licitacoes"]
+    conditions = []
+    values = []
+    
+    if filters.get('year'):
+        conditions.append("YEAR(opening_date) = %s")
+        values.append(filters['year'])
+    
+    # Paginação por cursor substitui o OFFSET
+    keyset, keyset_values = keyset_condition(columns, cursor, descending, LISTING_NULLABLE["licitacoes"])
+    if keyset:
+        conditions.append(keyset)
+        values.extend(keyset_values)
+        offset = 0
+    
+    where_clause = " AND " + " AND ".join(conditions) if conditions else ""
+    
+    query = f"""
+        SELECT 
+            {select_clause(TRANSPARENCY_FIELDS["licitacoes"], fields, keys)}
+        FROM `tabPublic Tender`
+        WHERE docstatus >= 0
+        {where_clause}
+        ORDER BY {order_by(columns, descending)}
+        LIMIT %s OFFSET %s
+    """
+    
+    values.extend([limit, offset])
+    
+    return frappe.db.sql(query, values, as_dict=True)
+
+@cached_function('budget_data', ttl=3600, data_categories=["orcamento"])
+def get_budget_data(filters, limit, offset):
+    """Obter dados orçamentários"""
+    year = filters.get('year', datetime.now().year)
+    
+    query = """
+        SELECT 
+            account as conta,
+            budget_amount as orcado,
+            actual_amount as realizado,
+            (actual_amount / budget_amount * 100) as percentual_execucao
+        FROM `tabBudget Account`
+        WHERE parent IN (
+            SELECT name FROM `tabBudget`
+            WHERE fiscal_year = %s
+        )
+        ORDER BY account
+        LIMIT %s OFFSET %s
+    """
+    
+    return frappe.db.sql(query, [year, limit, offset], as_dict=True)
+
+@cached_function('transparency_data', ttl=7200, data_categories=["servidores"])
+def get_employee_data(filters, limit, offset, cursor=None, fields=None):
+    """Obter dados de servidores (dados públicos apenas)"""
+    columns, keys, descending = LISTING_KEYS["servidores"]
+    conditions = []
+    values = []
+    
+    # Paginação por cursor substitui o OFFSET
+    keyset, keyset_values = keyset_condition(columns, cursor, descending)
+    if keyset:
+        conditions.append(keyset)
+        values.extend(keyset_values)
+        offset = 0
+    
+    where_clause = " AND " + " AND ".join(conditions) if conditions else ""
+    
+    query = f"""
+        SELECT 
+            {select_clause(TRANSPARENCY_FIELDS["servidores"], fields, keys)}
+        FROM `tabEmployee`
+        WHERE status = 'Active'
+        {where_clause}
+        ORDER BY {order_by(columns, descending)}
+        LIMIT %s OFFSET %s
+    """
+    
+    values.extend([limit, offset])
+    
+    return frappe.db.sql(query, values, as_dict=True)
+
+def get_general_transparency_data(filters, limit, offset):
+    """Obter dados gerais de transparência"""
+    return {
+        "resumo_receitas": get_revenue_summary(filters.get('year')),
+        "resumo_despesas": get_expense_summary(filters.get('year')),
+        "licitacoes_ativas": get_active_tenders_count(),
+        "contratos_vigentes": get_active_contracts_count(),
+        "execucao_orcamentaria": get_budget_execution_percentage(filters.get('year'))
+    }
+
+# ========== ORÇAMENTO ==========
+
+def fetch_budget_summary(year=None):
+    """Resumo da execução orçamentária do exercício (sem camada HTTP)"""
+    year = year or datetime.now().year
+    
+    # Versão dos dados orçamentários na chave: alterações geram nova entrada
+    version, _last_modified = get_data_version(["orcamento"])
+    params = {"versao": version}
+    data = cache_manager.get('budget_data', f'summary_{year}', params) if version is not None else None
+    
+    if not data:
+        # Calcular dados orçamentários
+        budget_query = """
+            SELECT 
+                SUM(budget_amount) as total_orcado,
+                SUM(actual_amount) as total_realizado
+            FROM `tabBudget Account`
+            WHERE parent IN (
+                SELECT name FROM `tabBudget`
+                WHERE fiscal_year = %s
+            )
+        """
+        
+        result = frappe.db.sql(budget_query, [year], as_dict=True)
+        
+        if result:
+            total_orcado = result[0].get('total_orcado', 0)
+            total_realizado = result[0].get('total_realizado', 0)
+            
+            data = {
+                "ano": year,
+                "total_orcado": total_orcado,
+                "total_realizado": total_realizado,
+                "percentual_execucao": round((total_realizado / total_orcado * 100), 2) if total_orcado > 0 else 0,
+                "saldo_disponivel": total_orcado - total_realizado
+            }
+        else:
+            data = {
+                "ano": year,
+                "total_orcado": 0,
+                "total_realizado": 0,
+                "percentual_execucao": 0,
+                "saldo_disponivel": 0
+            }
+        
+        if version is not None:
+            cache_manager.set('budget_data', f'summary_{year}', data, ttl=3600, params=params)
+    
+    return data
+
+# ========== DADOS MUNICIPAIS ==========
+
+def fetch_municipal_data(category=None):
+    """Dados municipais por categoria (sem camada HTTP)"""
+    if category == "iptu":
+        data = get_iptu_data()
+    elif category == "iss":
+        data = get_iss_data()
+    elif category == "alvaras":
+        data = get_license_data()
+    elif category == "obras":
+        data = get_public_works_data()
+    else:
+        data = get_municipal_summary()
+    
+    return data
+
+@cached_function('municipal_data', ttl=3600)
+def get_iptu_data():
+    """Dados de IPTU"""
+    current_year = datetime.now().year
+    
+    return {
+        "arrecadacao_atual": frappe.db.sql("""
+            SELECT SUM(valor_pago) 
+            FROM `tabIPTU Payment`
+            WHERE YEAR(data_pagamento) = %s
+        """, [current_year])[0][0] or 0,
+        "imoveis_cadastrados": frappe.db.count("IPTU Cadastro"),
+        "carnês_emitidos": frappe.db.count("IPTU Lancamento", {
+            "ano_referencia": current_year
+        }),
+        "inadimplencia": calculate_iptu_default_rate(current_year)
+    }
+
+@cached_function('municipal_data', ttl=3600)
+def get_iss_data():
+    """Dados de ISS"""
+    current_year = datetime.now().year
+    
+    return {
+        "arrecadacao_atual": frappe.db.sql("""
+            SELECT SUM(valor_iss) 
+            FROM `tabISS Declaracao`
+            WHERE YEAR(data_competencia) = %s
+        """, [current_year])[0][0] or 0,
+        "prestadores_ativos": frappe.db.count("ISS Prestador", {"ativo": 1}),
+        "declaracoes_mes": frappe.db.count("ISS Declaracao", {
+            "data_competencia": [">=", frappe.utils.get_first_day()]
+        })
+    }
+
+@cached_function('municipal_data', ttl=7200)
+def get_license_data():
+    """Dados de licenças e alvarás"""
+    current_year = datetime.now().year
+    
+    return {
+        "alvaras_emitidos": frappe.db.count("Alvara Municipal", {
+            "data_emissao": [">=", f"{current_year}-01-01"]
+        }),
+        "licencas_vigentes": frappe.db.count("Alvara Municipal", {
+            "data_vencimento": [">=", frappe.utils.nowdate()]
+        }),
+        "processos_andamento": frappe.db.count("Processo Licenciamento", {
+            "status": "Em Análise"
+        })
+    }
+
+@cached_function('municipal_data', ttl=3600, data_categories=["obras"])
+def get_public_works_data():
+    """Dados de obras públicas"""
+    return {
+        "obras_andamento": frappe.db.count("Obra Publica", {"status": "Em Execução"}),
+        "obras_concluidas": frappe.db.count("Obra Publica", {"status": "Concluída"}),
+        "investimento_total": frappe.db.sql("""
+            SELECT SUM(valor_contrato) 
+            FROM `tabObra Publica`
+            WHERE status IN ('Em Execução', 'Concluída')
+        """)[0][0] or 0
+    }
+
+def get_municipal_summary():
+    """Resumo geral municipal"""
+    return {
+        "iptu": get_iptu_data(),
+        "iss": get_iss_data(),
+        "alvaras": get_license_data(),
+        "obras": get_public_works_data()
+    }
+
+# ========== FUNÇÕES AUXILIARES ==========
+
+def calculate_iptu_default_rate(year):
+    """Calcular taxa de inadimplência do IPTU"""
+    total_lancado = frappe.db.count("IPTU Lancamento", {"ano_referencia": year})
+    total_pago = frappe.db.sql("""
+        SELECT COUNT(DISTINCT imovel_codigo)
+        FROM `tabIPTU Payment`
+        WHERE YEAR(data_pagamento) = %s
+    """, [year])[0][0] or 0
+    
+    if total_lancado == 0:
+        return 0
+    
+    return round(((total_lancado - total_pago) / total_lancado * 100), 2)
+
+def get_revenue_summary(year=None):
+    """Resumo de receitas"""
+    year = year or datetime.now().year
+    
+    return frappe.db.sql("""
+        SELECT SUM(debit) as total
+        FROM `tabGL Entry`
+        WHERE account LIKE '3.%'
+        AND YEAR(posting_date) = %s
+        AND is_cancelled = 0
+    """, [year])[0][0] or 0
+
+def get_expense_summary(year=None):
+    """Resumo de despesas"""
+    year = year or datetime.now().year
+    
+    return frappe.db.sql("""
+        SELECT SUM(credit) as total
+        FROM `tabGL Entry`
+        WHERE account LIKE '4.%'
+        AND YEAR(posting_date) = %s
+        AND is_cancelled = 0
+    """, [year])[0][0] or 0
+
+def get_active_tenders_count():
+    """Contar licitações ativas"""
+    return frappe.db.count("Public Tender", {"status": "Active"})
+
+def get_active_contracts_count():
+    """Contar contratos vigentes"""
+    return frappe.db.count("Purchase Order", {
+        "docstatus": 1,
+        "end_date": [">=", frappe.utils.nowdate()]
+    })
+
+def get_budget_execution_percentage(year=None):
+    """Percentual de execução orçamentária"""
+    year = year or datetime.now().year
+    
+    result = frappe.db.sql("""
+        SELECT 
+            SUM(budget_amount) as orcado,
+            SUM(actual_amount) as realizado
+        FROM `tabBudget Account`
+        WHERE parent IN (
+            SELECT name FROM `tabBudget`
+            WHERE fiscal_year = %s
+        )
+    """, [year], as_dict=True)
+    
+    if result and result[0].get('orcado', 0) > 0:
+        return round((result[0].get('realizado', 0) / result[0].get('orcado', 0) * 100), 2)
+    
+    return 0
+
+# ========== FUNÇÕES DE BUSCA ==========
+
+def search_revenue_data(query, limit):
+    """Buscar nos dados de receita"""
+    return frappe.db.sql("""
+        SELECT account, SUM(debit) as valor, posting_date
+        FROM `tabGL Entry`
+        WHERE account LIKE '3.%'
+        AND (account LIKE %s OR remarks LIKE %s)
+        AND is_cancelled = 0
+        GROUP BY account, posting_date
+        ORDER BY posting_date DESC
+        LIMIT %s
+    """, [f"%{query}%", f"%{query}%", limit], as_dict=True)
+
+def search_expense_data(query, limit):
+    """Buscar nos dados de despesa"""
+    return frappe.db.sql("""
+        SELECT account, SUM(credit) as valor, posting_date, party
+        FROM `tabGL Entry`
+        WHERE account LIKE '4.%'
+        AND (account LIKE %s OR remarks LIKE %s OR party LIKE %s)
+        AND is_cancelled = 0
+        GROUP BY account, posting_date, party
+        ORDER BY posting_date DESC
+        LIMIT %s
+    """, [f"%{query}%", f"%{query}%", f"%{query}%", limit], as_dict=True)
+
+def search_contract_data(query, limit):
+    """Buscar nos dados de contratos"""
+    return frappe.db.sql("""
+        SELECT name, title, supplier, total_amount, start_date
+        FROM `tabPurchase Order`
+        WHERE docstatus = 1
+        AND (title LIKE %s OR supplier LIKE %s)
+        ORDER BY start_date DESC
+        LIMIT %s
+    """, [f"%{query}%", f"%{query}%", limit], as_dict=True)
+
+def search_tender_data(query, limit):
+    """Buscar nos dados de licitações"""
+    return frappe.db.sql("""
+        SELECT name, tender_title, tender_type, estimated_amount, opening_date
+        FROM `tabPublic Tender`
+        WHERE tender_title LIKE %s
+        ORDER BY opening_date DESC
+        LIMIT %s
+    """, [f"%{query}%", limit], as_dict=True)
+
+def search_employee_data(query, limit):
+    """Buscar nos dados de servidores"""
+    return frappe.db.sql("""
+        SELECT employee_name, designation, department
+        FROM `tabEmployee`
+        WHERE status = 'Active'
+        AND (employee_name LIKE %s OR designation LIKE %s OR department LIKE %s)
+        ORDER BY employee_name
+        LIMIT %s
+    """, [f"%{query}%", f"%{query}%", f"%{query}%", limit], as_dict=True)
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Previsão de receitas e despesas
+
+Projeta o restante do exercício para a receita e a despesa totais, para
+cada fonte de receita e para cada função de despesa (prefixo de conta de
+cinco caracteres, como nas análises do dashboard financeiro).
+
+Todas as séries saem de uma única consulta aos saldos mensais e formam uma
+matriz (série x mês); o modelo é ajustado de uma vez para todas as linhas:
+
+1. tendência linear por mínimos quadrados;
+2. sazonalidade aditiva: média dos resíduos de cada mês do calendário,
+   centrada em zero (com ao menos dois anos de histórico);
+3. tendência reajustada sobre a série dessazonalizada;
+4. intervalo de predição de mínimos quadrados a partir da variância dos
+   resíduos, para cada mês e para o total do restante do exercício.
+
+Só entram no ajuste os meses fechados; o mês corrente também é previsto.
+O resultado fica em cache (financial_data) com a versão dos dados de
+receitas e despesas na chave: um novo lançamento contábil muda a versão e a
+próxima leitura recalcula as previsões, uma vez para todos os usuários.
+"""
+
+import frappe
+import numpy as np
+from datetime import datetime
+from ..utils.cache_manager import cache_manager
+from ..utils.data_version import get_data_version
+
+# Anos de histórico usados no ajuste
+FORECAST_HISTORY_YEARS = 5
+
+# Mínimo de meses para estimar a sazonalidade (dois ciclos)
+MIN_SEASONAL_MONTHS = 24
+
+# Quantil normal do intervalo de predição (95%)
+FORECAST_INTERVAL_Z = 1.96
+
+FORECAST_CACHE_TTL = 86400
+
+# Categorias de dados cuja versão invalida as previsões
+FORECAST_DATA_CATEGORIES = ["receitas", "despesas"]
+
+SERIES_QUERY = """
+    SELECT
+        IF(account LIKE '3.%%', 'receitas', 'despesas') as tipo,
+        SUBSTRING(account, 1, 5) as grupo,
+        ano * 12 + mes - 1 as indice,
+        SUM(IF(account LIKE '3.%%', debito, credito)) as valor
+    FROM `tabSaldo Contabil Mensal`
+    WHERE ano BETWEEN %(start_year)s AND %(end_year)s
+    AND ano * 12 + mes - 1 BETWEEN %(start)s AND %(end)s
+    AND (account LIKE '3.%%' OR account LIKE '4.%%')
+    GROUP BY tipo, grupo, ano, mes
+"""
+
+
+def load_series_matrix(start_index, end_index):
+    """
+    Matriz das séries mensais entre dois índices de mês (ano*12 + mês-1)
+
+    Returns:
+        (chaves, matriz) onde chaves é a lista de (tipo, grupo) de cada
+        linha; as duas primeiras são os totais de receitas e despesas
+    """
+    size = end_index - start_index + 1
+    rows = frappe.db.sql(SERIES_QUERY, {
+        "start_year": start_index // 12,
+        "end_year": end_index // 12,
+        "start": start_index,
+        "end": end_index
+    })
+
+    keys = [("receitas", "total"), ("despesas", "total")]
+    positions = {key: i for i, key in enumerate(keys)}
+    for tipo, grupo, indice, valor in rows:
+        positions.setdefault((tipo, grupo), len(positions))
+    keys = sorted(positions, key=positions.get)
+
+    matrix = np.zeros((len(keys), size))
+    if rows:
+        row_index = np.array([positions[(tipo, grupo)] for tipo, grupo, indice, valor in rows])
+        column_index = np.array([int(indice) for tipo, grupo, indice, valor in rows]) - start_index
+        values = np.array([float(valor or 0) for tipo, grupo, indice, valor in rows])
+        tipo_total = np.array([positions[(tipo, "total")] for tipo, grupo, indice, valor in rows])
+
+        matrix[row_index, column_index] = values
+        np.add.at(matrix, (tipo_total, column_index), values)
+
+    return keys, matrix
+
+
+def forecast_matrix(history, start_index, horizon, z=FORECAST_INTERVAL_Z):
+    """
+    Ajusta tendência + sazonalidade a todas as linhas e projeta `horizon` meses
+
+    Cada série é ajustada a partir do seu primeiro mês com dados: os meses
+    anteriores (sem histórico, não valores nulos) não entram no ajuste.
+
+    Args:
+        history: Matriz (séries x meses) de valores observados
+        start_index: Índice de mês da primeira coluna
+        horizon: Número de meses a prever após a última coluna
+
+    Returns:
+        Dict com arrays: previsto, minimo, maximo (séries x horizon) e
+        total, total_minimo, total_maximo (soma do horizonte, por série)
+    """
+    n_series, size = history.shape
+    months = (start_index + np.arange(size + horizon)) % 12
+
+    # Tempo contado a partir do primeiro mês com dados de cada série
+    has_data = history != 0
+    first = np.where(has_data.any(axis=1), has_data.argmax(axis=1), size)
+    t = np.arange(size, dtype=float)[None, :] - first[:, None]
+    t_future = np.arange(size, size + horizon, dtype=float)[None, :] - first[:, None]
+    weights = (t >= 0).astype(float)
+    observed = weights.sum(axis=1)
+
+    # Mínimos quadrados por série (equações normais 2x2, vetorizadas)
+    xtx = np.empty((n_series, 2, 2))
+    xtx[:, 0, 0] = observed
+    xtx[:, 0, 1] = xtx[:, 1, 0] = (weights * t).sum(axis=1)
+    xtx[:, 1, 1] = (weights * t ** 2).sum(axis=1)
+    xtx_inv = np.linalg.pinv(xtx)
+
+    def fit(values):
+        xty = np.stack([(weights * values).sum(axis=1), (weights * t * values).sum(axis=1)], axis=1)
+        return np.einsum("sij,sj->si", xtx_inv, xty)
+
+    def trend(coefficients, times):
+        return coefficients[:, :1] + coefficients[:, 1:] * times
+
+    coefficients = fit(history)
+    seasonal = np.zeros((n_series, 12))
+    seasonal_params = np.zeros(n_series)
+
+    seasonal_rows = observed >= MIN_SEASONAL_MONTHS
+    if seasonal_rows.any():
+        one_hot = np.eye(12)[months[:size]]
+        residuals = (history - trend(coefficients, t)) * weights
+        counts = weights @ one_hot
+        means = np.divide(residuals @ one_hot, counts, out=np.zeros((n_series, 12)), where=counts > 0)
+        means -= means.mean(axis=1, keepdims=True)
+
+        seasonal[seasonal_rows] = means[seasonal_rows]
+        seasonal_params[seasonal_rows] = 11
+        coefficients = fit(history - seasonal[:, months[:size]])
+
+    fitted = trend(coefficients, t) + seasonal[:, months[:size]]
+    dof = observed - 2 - seasonal_params
+    sse = (((history - fitted) * weights) ** 2).sum(axis=1)
+    sigma = np.sqrt(np.divide(sse, dof, out=np.zeros(n_series), where=dof > 0))
+
+    forecast = trend(coefficients, t_future) + seasonal[:, months[size:]]
+
+    # Variância de predição: ruído + incerteza dos coeficientes
+    leverage = (xtx_inv[:, :1, :1][:, :, 0] + 2 * xtx_inv[:, 0, 1][:, None] * t_future
+                + xtx_inv[:, 1, 1][:, None] * t_future ** 2)
+    margin = z * sigma[:, None] * np.sqrt(1 + leverage)
+
+    total_t = t_future.sum(axis=1)
+    total_leverage = (xtx_inv[:, 0, 0] * horizon ** 2 + 2 * xtx_inv[:, 0, 1] * horizon * total_t
+                      + xtx_inv[:, 1, 1] * total_t ** 2)
+    total_margin = z * sigma * np.sqrt(horizon + total_leverage)
+    total = forecast.sum(axis=1)
+
+    # Receitas e despesas não são negativas
+    return {
+        "previsto": np.clip(forecast, 0, None),
+        "minimo": np.clip(forecast - margin, 0, None),
+        "maximo": np.clip(forecast + margin, 0, None),
+        "total": np.clip(total, 0, None),
+        "total_minimo": np.clip(total - total_margin, 0, None),
+        "total_maximo": np.clip(total + total_margin, 0, None)
+    }
+
+
+def compute_forecasts(year, today=None):
+    """
+    Previsões do exercício para todas as séries
+
+    Returns:
+        Dict com meses_fechados e, por série, realizado nos meses fechados,
+        previsão do restante, projeção anual e intervalo
+    """
+    today = today or datetime.now()
+    year = int(year)
+    if year < today.year:
+        closed_months = 12
+    elif year == today.year:
+        closed_months = today.month - 1
+    else:
+        closed_months = 0
+
+    year_start = year * 12
+    history_start = year_start - FORECAST_HISTORY_YEARS * 12
+    history_end = year_start + closed_months - 1
+    horizon = 12 - closed_months
+
+    keys, matrix = load_series_matrix(history_start, history_end)
+    realized = matrix[:, matrix.shape[1] - closed_months:].sum(axis=1) if closed_months else np.zeros(len(keys))
+
+    if horizon:
+        model = forecast_matrix(matrix, history_start, horizon)
+    else:
+        empty = np.zeros((len(keys), 0))
+        zeros = np.zeros(len(keys))
+        model = {"previsto": empty, "minimo": empty, "maximo": empty,
+                 "total": zeros, "total_minimo": zeros, "total_maximo": zeros}
+
+    periods = [f"{year}-{month:02d}" for month in range(closed_months + 1, 13)]
+    series = []
+    for i, (tipo, grupo) in enumerate(keys):
+        series.append({
+            "tipo": tipo,
+            "grupo": grupo,
+            "realizado": float(realized[i]),
+            "previsto_restante": float(model["total"][i]),
+            "projecao_anual": float(realized[i] + model["total"][i]),
+            "intervalo_anual": [
+                float(realized[i] + model["total_minimo"][i]),
+                float(realized[i] + model["total_maximo"][i])
+            ],
+            "mensal": [
+                {
+                    "periodo": period,
+                    "previsto": float(model["previsto"][i, h]),
+                    "minimo": float(model["minimo"][i, h]),
+                    "maximo": float(model["maximo"][i, h])
+                }
+                for h, period in enumerate(periods)
+            ]
+        })
+
+    return {
+        "ano": year,
+        "meses_fechados": closed_months,
+        "intervalo_confianca": 0.95,
+        "series": series
+    }
+
+
+def get_forecasts(year):
+    """Previsões do exercício, em cache até a próxima alteração dos dados contábeis"""
+    version, _last_modified = get_data_version(FORECAST_DATA_CATEGORIES)
+    params = {"ano": int(year), "versao": version, "mes": datetime.now().strftime("%Y-%m")}
+
+    if version is not None:
+        cached = cache_manager.get("financial_data", "forecasts", params)
+        if cached is not None:
+            return cached
+
+    forecasts = compute_forecasts(year)
+
+    if version is not None:
+        cache_manager.set("financial_data", "forecasts", forecasts, ttl=FORECAST_CACHE_TTL, params=params)
+
+    return forecasts
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico dos KPIs do portal (Historico KPI)
+
+O job diário grava o valor de cada KPI no fim do dia, lido dos contadores
+de KPI (utils.kpi_counters), em três granularidades: o dia, a semana
+(segunda-feira) e o mês (dia 1). A linha da semana e a do mês são
+reescritas a cada dia e ficam com o último valor do período, que é a
+redução correta para os KPIs acumulados no exercício e para as contagens.
+
+Os gráficos de tendência leem uma granularidade por vez com uma varredura
+do índice (kpi, granularidade, data). Linhas diárias e semanais antigas são
+removidas (KPI_HISTORY_RETENTION_DAYS); as mensais são mantidas.
+
+Para meses anteriores ao início da coleta, backfill_kpi_history grava as
+linhas mensais dos KPIs financeiros a partir dos saldos mensais do razão:
+
+    bench --site <site> execute govnext_core.transparencia.kpi_history.backfill_kpi_history --kwargs "{'year': 2024}"
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, getdate, now, nowdate
+from ..utils.kpi_counters import get_kpi_counters, reconcile_kpi_counters
+
+# Valor de cada KPI a partir dos contadores do exercício
+HISTORY_KPIS = {
+    "receitas_arrecadadas": lambda c: c["receitas"],
+    "despesas_executadas": lambda c: c["despesas"],
+    "resultado_orcamentario": lambda c: c["receitas"] - c["despesas"],
+    "valor_empenhado": lambda c: c["empenhado"],
+    "valor_pago": lambda c: c["pago"],
+    "licitacoes_andamento": lambda c: c["licitacoes_ativas"],
+    "obras_execucao": lambda c: c["obras_execucao"],
+}
+
+# Tempo de guarda por granularidade (None: permanente)
+KPI_HISTORY_RETENTION_DAYS = {
+    "dia": 400,
+    "semana": 5 * 366,
+    "mes": None
+}
+
+# Maior intervalo (em dias) atendido por cada granularidade
+KPI_HISTORY_RANGES = [
+    (92, "dia"),
+    (731, "semana"),
+]
+
+MAX_HISTORY_DAYS = 3660
+
+UPSERT_QUERY = """
+    INSERT INTO `tabHistorico KPI`
+        (name, creation, modified, modified_by, owner, docstatus,
+         kpi, granularidade, data, valor)
+    VALUES {rows}
+    ON DUPLICATE KEY UPDATE
+        valor = VALUES(valor),
+        modified = VALUES(modified)
+"""
+
+_ROW_SQL = (
+    "(MD5(CONCAT_WS('|', %s, %s, %s)), %s, %s, %s, %s, 0, %s, %s, %s, %s)"
+)
+
+
+def period_start(day, granularidade):
+    """Data de início do período (dia, semana iniciada na segunda ou mês)"""
+    day = getdate(day)
+    if granularidade == "semana":
+        return add_days(day, -day.weekday())
+    if granularidade == "mes":
+        return day.replace(day=1)
+    return day
+
+
+def write_history(points):
+    """
+    Grava os pontos informados (substituindo os existentes)
+
+    Args:
+        points: Lista de (kpi, granularidade, data, valor)
+    """
+    if not points:
+        return
+
+    timestamp, user = now(), frappe.session.user
+    values = []
+    for kpi, granularidade, data, valor in points:
+        data = str(getdate(data))
+        values.extend([
+            kpi, granularidade, data,
+            timestamp, timestamp, user, user,
+            kpi, granularidade, data, flt(valor)
+        ])
+
+    frappe.db.sql(UPSERT_QUERY.format(rows=", ".join([_ROW_SQL] * len(points))), values)
+
+
+def record_kpi_snapshot(day=None):
+    """
+    Grava os KPIs do dia (padrão: ontem, para o job da meia-noite) nas
+    granularidades diária, semanal e mensal
+    """
+    day = getdate(day or add_days(nowdate(), -1))
+
+    counters = get_kpi_counters(day.year)
+    if counters is None:
+        reconcile_kpi_counters()
+        counters = get_kpi_counters(day.year)
+    if counters is None:
+        frappe.throw(_("Contadores de KPI indisponíveis"))
+
+    points = []
+    for kpi, value in HISTORY_KPIS.items():
+        for granularidade in ("dia", "semana", "mes"):
+            points.append((kpi, granularidade, period_start(day, granularidade), value(counters)))
+
+    write_history(points)
+
+
+def prune_kpi_history():
+    """Remove as linhas diárias e semanais fora do prazo de guarda"""
+    for granularidade, days in KPI_HISTORY_RETENTION_DAYS.items():
+        if days:
+            frappe.db.sql("""
+                DELETE FROM `tabHistorico KPI`
+                WHERE granularidade = %s AND data < %s
+            """, [granularidade, add_days(nowdate(), -days)])
+
+
+def record_kpi_snapshot_job():
+    """Job agendado: grava os KPIs do dia anterior e aplica a retenção"""
+    try:
+        record_kpi_snapshot()
+        prune_kpi_history()
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Erro ao gravar histórico de KPIs: {str(e)}", "Historico KPI")
+
+
+def backfill_kpi_history(year):
+    """Grava as linhas mensais dos KPIs financeiros de um exercício a partir dos saldos mensais"""
+    rows = frappe.db.sql("""
+        SELECT
+            mes,
+            SUM(CASE WHEN account LIKE '3.%%' THEN debito ELSE 0 END) as receitas,
+            SUM(CASE WHEN account LIKE '4.%%' THEN credito ELSE 0 END) as despesas
+        FROM `tabSaldo Contabil Mensal`
+        WHERE ano = %s
+        AND (account LIKE '3.%%' OR account LIKE '4.%%')
+        GROUP BY mes
+        ORDER BY mes
+    """, [int(year)], as_dict=True)
+
+    points = []
+    receitas = despesas = 0.0
+    for row in rows:
+        # Valores acumulados no exercício até o fim do mês
+        receitas += flt(row.receitas)
+        despesas += flt(row.despesas)
+        data = getdate(f"{int(year)}-{int(row.mes):02d}-01")
+        points.extend([
+            ("receitas_arrecadadas", "mes", data, receitas),
+            ("despesas_executadas", "mes", data, despesas),
+            ("resultado_orcamentario", "mes", data, receitas - despesas),
+        ])
+
+    write_history(points)
+    frappe.db.commit()
+
+
+def get_history_granularity(days):
+    """Granularidade usada para um intervalo de `days` dias"""
+    for limit, granularidade in KPI_HISTORY_RANGES:
+        if days <= limit:
+            return granularidade
+    return "mes"
+
+
+def get_kpi_history(kpi, days=30):
+    """
+    Série de um KPI nos últimos `days` dias
+
+    Returns:
+        Dicionário com granularidade, labels e valores (em ordem de data;
+        vazios para KPI desconhecido)
+    """
+    days = min(max(cint(days), 1), MAX_HISTORY_DAYS)
+    granularidade = get_history_granularity(days)
+
+    if kpi not in HISTORY_KPIS:
+        return {"granularidade": granularidade, "labels": [], "valores": []}
+
+    start = period_start(add_days(nowdate(), -days), granularidade)
+
+    rows = frappe.db.sql("""
+        SELECT data, valor
+        FROM `tabHistorico KPI`
+        WHERE kpi = %s AND granularidade = %s AND data >= %s
+        ORDER BY data
+    """, [kpi, granularidade, start])
+
+    label_format = "%m/%Y" if granularidade == "mes" else "%d/%m"
+    return {
+        "granularidade": granularidade,
+        "labels": [getdate(data).strftime(label_format) for data, valor in rows],
+        "valores": [flt(valor) for data, valor in rows]
+    }
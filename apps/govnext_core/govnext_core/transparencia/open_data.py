@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Dados abertos: arquivos completos dos conjuntos do Portal da Transparência
+
+Um job noturno grava, para cada conjunto de OPEN_DATASETS, o arquivo
+completo em CSV comprimido (gzip) e em Parquet (quando o pyarrow está
+instalado), mais um arquivo de alterações do dia (delta) com as linhas
+criadas ou modificadas desde a execução anterior. O manifest.json lista
+todos os arquivos com tamanho, número de linhas e SHA-256; os arquivos são
+servidos diretamente pelo nginx em /dados-abertos (ver config/nginx).
+
+Consumidores baixam o completo uma vez e depois aplicam os deltas, em vez
+de percorrer os endpoints paginados. Deltas não registram exclusões nem
+cancelamentos: para esses casos vale o completo da noite seguinte.
+
+Os arquivos gzip são gravados sem data no cabeçalho, então um conjunto
+sem alterações produz o mesmo checksum de uma noite para outra.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import frappe
+from ..utils.export_engine import query_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Linhas por row group do Parquet (memória do job ~ um lote)
+PARQUET_BATCH_ROWS = 50000
+
+# Dias de deltas mantidos no diretório e no manifesto
+DELTA_RETENTION_DAYS = 30
+
+MANIFEST_FILE = "manifest.json"
+CHECKSUMS_FILE = "SHA256SUMS"
+
+# Conjunto -> título, descrição e consulta. {delta} recebe o filtro de
+# alterações (vazio no arquivo completo); consultas agregadas filtram no
+# HAVING, pela última modificação entre as linhas do grupo.
+OPEN_DATASETS = {
+    "despesas": {
+        "titulo": "Despesas",
+        "descricao": "Lançamentos contábeis de despesa por documento e favorecido",
+        "query": """
+            SELECT
+                account AS conta,
+                posting_date AS data,
+                voucher_no AS documento,
+                party AS favorecido,
+                SUM(credit) AS valor,
+                remarks AS observacoes
+            FROM `tabGL Entry`
+            WHERE is_cancelled = 0
+            AND account LIKE %(expense_accounts)s
+            GROUP BY account, posting_date, voucher_no, party
+            {delta}
+            ORDER BY posting_date, voucher_no, account
+        """,
+        "delta": "HAVING MAX(modified) >= %(since)s AND MAX(modified) < %(until)s",
+    },
+    "receitas": {
+        "titulo": "Receitas",
+        "descricao": "Lançamentos contábeis de receita por documento",
+        "query": """
+            SELECT
+                account AS conta,
+                posting_date AS data,
+                voucher_no AS documento,
+                SUM(debit) AS valor,
+                remarks AS observacoes
+            FROM `tabGL Entry`
+            WHERE is_cancelled = 0
+            AND account LIKE %(revenue_accounts)s
+            GROUP BY account, posting_date, voucher_no
+            {delta}
+            ORDER BY posting_date, voucher_no, account
+        """,
+        "delta": "HAVING MAX(modified) >= %(since)s AND MAX(modified) < %(until)s",
+    },
+    "contratos": {
+        "titulo": "Contratos",
+        "descricao": "Contratos (ordens de compra) submetidos",
+        "query": """
+            SELECT
+                name AS numero_contrato,
+                title AS objeto,
+                supplier AS contratado,
+                total_amount AS valor,
+                start_date AS data_inicio,
+                end_date AS data_fim,
+                status
+            FROM `tabPurchase Order`
+            WHERE docstatus = 1
+            {delta}
+            ORDER BY start_date, name
+        """,
+        "delta": "AND modified >= %(since)s AND modified < %(until)s",
+    },
+    "licitacoes": {
+        "titulo": "Licitações",
+        "descricao": "Processos licitatórios",
+        "query": """
+            SELECT
+                name AS numero_licitacao,
+                tender_title AS objeto,
+                tender_type AS modalidade,
+                estimated_amount AS valor_estimado,
+                opening_date AS data_abertura,
+                status,
+                winner AS vencedor
+            FROM `tabPublic Tender`
+            WHERE docstatus >= 0
+            {delta}
+            ORDER BY opening_date, name
+        """,
+        "delta": "AND modified >= %(since)s AND modified < %(until)s",
+    },
+    "obras": {
+        "titulo": "Obras públicas",
+        "descricao": "Obras com valores, execução, prazos e localização",
+        "query": """
+            SELECT
+                codigo_obra,
+                nome_obra,
+                descricao,
+                tipo_obra,
+                situacao,
+                valor_contratado,
+                valor_executado,
+                percentual_executado,
+                data_inicio,
+                data_previsao_conclusao,
+                data_conclusao_real,
+                secretaria_responsavel,
+                empresa_contratada,
+                endereco_completo,
+                bairro,
+                regiao,
+                latitude,
+                longitude,
+                beneficiarios_estimados
+            FROM `tabTransparencia Obra`
+            WHERE 1=1
+            {delta}
+            ORDER BY codigo_obra
+        """,
+        "delta": "AND modified >= %(since)s AND modified < %(until)s",
+    },
+    "remuneracao_agregada": {
+        "titulo": "Folha de pagamento (agregada)",
+        "descricao": "Remuneração mensal por órgão, cargo e categoria, sem dados individuais",
+        "query": """
+            SELECT
+                r.data_referencia AS mes_referencia,
+                s.orgao_nome,
+                s.cargo,
+                s.categoria,
+                COUNT(DISTINCT s.name) AS quantidade_servidores,
+                SUM(r.valor_bruto) AS total_bruto,
+                SUM(r.valor_liquido) AS total_liquido,
+                AVG(r.valor_bruto) AS media_bruto
+            FROM `tabTransparencia Remuneracao` r
+            INNER JOIN `tabTransparencia Servidor` s ON s.name = r.servidor
+            GROUP BY r.data_referencia, s.orgao_nome, s.cargo, s.categoria
+            {delta}
+            ORDER BY r.data_referencia, s.orgao_nome, s.cargo, s.categoria
+        """,
+        "delta": "HAVING MAX(r.modified) >= %(since)s AND MAX(r.modified) < %(until)s",
+    },
+}
+
+
+def get_output_path() -> str:
+    """Diretório servido pelo nginx em /dados-abertos"""
+    return frappe.conf.get("open_data_path") or frappe.get_site_path("public", "dados-abertos")
+
+
+def get_formats() -> List[str]:
+    return ["csv.gz", "parquet"] if pq else ["csv.gz"]
+
+
+def _query_values(**values) -> Dict:
+    # Prefixos passados como parâmetro: o % do LIKE não conflita com o
+    # marcador de parâmetros do driver
+    return dict(values, expense_accounts="4.%", revenue_accounts="3.%")
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as data_file:
+        for block in iter(lambda: data_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parquet_schema(schema):
+    """Tipos estáveis entre lotes: nulo vira texto, decimal ganha escala fixa"""
+    fields = []
+    for field in schema:
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_decimal(field.type):
+            field = field.with_type(pa.decimal128(38, 9))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class SnapshotWriter:
+    """
+    Grava um conjunto de linhas em todos os formatos numa única passagem
+
+    Os arquivos são escritos em temporários no diretório de destino e só
+    substituem os publicados em commit(), via rename atômico.
+    """
+
+    def __init__(self, directory: str, basename: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.basename = basename
+        self.rows = 0
+        self.columns = []
+        self._temp_files = {}
+        self._raw_file = None
+        self._csv_file = None
+        self._csv_writer = None
+        self._parquet_writer = None
+        self._parquet_schema = None
+        self._batch = []
+
+    def _temp(self, extension: str) -> str:
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=".open-data-", suffix="." + extension)
+        os.close(fd)
+        self._temp_files[extension] = path
+        return path
+
+    def _open(self, columns: List[str]):
+        self.columns = columns
+
+        # Sem nome nem data no cabeçalho gzip: o checksum depende só dos dados
+        self._raw_file = open(self._temp("csv.gz"), "wb")
+        compressed = gzip.GzipFile(filename="", fileobj=self._raw_file, mode="wb", mtime=0)
+        self._csv_file = io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+        self._csv_writer = csv.writer(self._csv_file)
+        if columns:
+            self._csv_writer.writerow(columns)
+
+    def write(self, row: Dict):
+        if self._csv_writer is None:
+            self._open(list(row.keys()))
+
+        self._csv_writer.writerow([_csv_value(row.get(column)) for column in self.columns])
+        self.rows += 1
+
+        if pq:
+            self._batch.append(row)
+            if len(self._batch) >= PARQUET_BATCH_ROWS:
+                self._flush_parquet()
+
+    def _flush_parquet(self):
+        if not self._batch:
+            return
+
+        table = pa.Table.from_pylist(self._batch, schema=self._parquet_schema)
+        if self._parquet_writer is None:
+            self._parquet_schema = _parquet_schema(table.schema)
+            table = table.cast(self._parquet_schema)
+            self._parquet_writer = pq.ParquetWriter(
+                self._temp("parquet"), self._parquet_schema, compression="zstd"
+            )
+
+        self._parquet_writer.write_table(table)
+        self._batch = []
+
+    def _close(self):
+        if self._csv_file:
+            self._csv_file.close()
+            self._raw_file.close()
+            self._csv_file = None
+        if self._parquet_writer:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def commit(self) -> List[Dict]:
+        """Publica os arquivos e devolve suas entradas para o manifesto"""
+        if pq:
+            self._flush_parquet()
+        self._close()
+
+        if not self.rows:
+            # Conjunto vazio: publica um CSV vazio (sem colunas conhecidas)
+            self._open([])
+            self._close()
+
+        files = []
+        for extension, temp_path in self._temp_files.items():
+            path = os.path.join(self.directory, f"{self.basename}.{extension}")
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+            files.append({
+                "formato": extension,
+                "arquivo": os.path.basename(path),
+                "bytes": os.path.getsize(path),
+                "sha256": _sha256(path),
+            })
+
+        self._temp_files = {}
+        return files
+
+    def abort(self):
+        self._close()
+        for temp_path in self._temp_files.values():
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._temp_files = {}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def write_dataset(rows: Iterable[Dict], directory: str, basename: str) -> Dict:
+    """Grava as linhas em todos os formatos; devolve linhas, colunas e arquivos"""
+    writer = SnapshotWriter(directory, basename)
+    try:
+        for row in rows:
+            writer.write(row)
+        files = writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+
+    return {"linhas": writer.rows, "colunas": writer.columns, "arquivos": files}
+
+
+def _relative(entry: Dict, prefix: str) -> Dict:
+    entry["arquivos"] = [dict(item, arquivo=f"{prefix}/{item['arquivo']}") for item in entry["arquivos"]]
+    return entry
+
+
+def export_dataset(name: str, output_path: str, previous: Optional[Dict], run_at: datetime) -> Dict:
+    """
+    Gera o completo e o delta do dia de um conjunto
+
+    O delta do dia cobre desde a primeira execução do dia (ou desde a
+    execução anterior) até agora: execuções repetidas no mesmo dia
+    regravam o mesmo arquivo com a janela ampliada.
+    """
+    config = OPEN_DATASETS[name]
+    dataset_path = os.path.join(output_path, name)
+
+    entry = {"titulo": config["titulo"], "descricao": config["descricao"]}
+    entry.update(_relative(
+        write_dataset(
+            query_rows(config["query"].format(delta=""), _query_values()),
+            dataset_path,
+            name
+        ),
+        name
+    ))
+
+    today = run_at.date().isoformat()
+    deltas = [delta for delta in (previous or {}).get("deltas", []) if delta["data"] != today]
+    same_day = [delta for delta in (previous or {}).get("deltas", []) if delta["data"] == today]
+
+    if same_day:
+        since = same_day[0]["desde"]
+    elif previous and previous.get("gerado_em"):
+        since = previous["gerado_em"]
+    else:
+        since = _timestamp(run_at - timedelta(days=1))
+
+    delta = write_dataset(
+        query_rows(
+            config["query"].format(delta=config["delta"]),
+            _query_values(since=since, until=_timestamp(run_at))
+        ),
+        os.path.join(dataset_path, "deltas"),
+        f"{name}-{today}"
+    )
+    delta.update({"data": today, "desde": since, "ate": _timestamp(run_at)})
+    deltas.append(_relative(delta, f"{name}/deltas"))
+
+    # Retenção: remove deltas antigos do disco e do manifesto
+    cutoff = (run_at - timedelta(days=DELTA_RETENTION_DAYS)).date().isoformat()
+    for old in [delta for delta in deltas if delta["data"] < cutoff]:
+        for item in old["arquivos"]:
+            old_path = os.path.join(output_path, item["arquivo"])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+    entry["deltas"] = sorted((delta for delta in deltas if delta["data"] >= cutoff), key=lambda delta: delta["data"])
+    entry["gerado_em"] = _timestamp(run_at)
+    return entry
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _write_text(path: str, content: str):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".open-data-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as temp_file:
+            temp_file.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def export_open_data(datasets: Optional[List[str]] = None) -> Dict:
+    """
+    Gera os arquivos de dados abertos e o manifesto
+
+    Args:
+        datasets: Conjuntos a gerar (padrão: todos de OPEN_DATASETS)
+
+    Returns:
+        {"exported": [...], "failed": [...]}
+    """
+    output_path = get_output_path()
+    manifest_path = os.path.join(output_path, MANIFEST_FILE)
+    os.makedirs(output_path, exist_ok=True)
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+    entries = manifest.get("conjuntos", {})
+    run_at = datetime.now().replace(microsecond=0)
+    result = {"exported": [], "failed": []}
+
+    for name in datasets or OPEN_DATASETS:
+        try:
+            entries[name] = export_dataset(name, output_path, entries.get(name), run_at)
+            result["exported"].append(name)
+        except Exception as e:
+            result["failed"].append(name)
+            frappe.log_error(f"Erro ao exportar dados abertos ({name}): {str(e)}", "Open Data")
+
+    manifest = {
+        "gerado_em": _timestamp(run_at),
+        "formatos": get_formats(),
+        "conjuntos": {name: entries[name] for name in OPEN_DATASETS if name in entries},
+    }
+    _write_text(manifest_path, json.dumps(manifest, indent=1, ensure_ascii=False, default=str))
+
+    # Formato do sha256sum -c, para conferência sem ler o manifesto
+    checksums = []
+    for entry in manifest["conjuntos"].values():
+        for item in entry["arquivos"] + [f for delta in entry["deltas"] for f in delta["arquivos"]]:
+            checksums.append(f"{item['sha256']}  {item['arquivo']}")
+    _write_text(os.path.join(output_path, CHECKSUMS_FILE), "\n".join(checksums) + "\n")
+
+    return result
+
+
+def export_open_data_job():
+    """Job agendado: arquivos noturnos de dados abertos"""
+    try:
+        export_open_data()
+    except Exception as e:
+        frappe.log_error(f"Erro na exportação de dados abertos: {str(e)}", "Open Data")
+
+
+@frappe.whitelist()
+def rebuild_open_data():
+    """Enfileira a geração dos arquivos de dados abertos"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "govnext_core.transparencia.open_data.export_open_data",
+        queue="long",
+        timeout=7200
+    )
+    return {"success": True}
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Cache de páginas completas do Portal da Transparência
+
+Requisições anônimas (GET/HEAD) às rotas configuradas em PAGE_CACHE_ROUTES
+são servidas do Redis, sem executar o get_context da página. A chave
+combina a rota, os parâmetros permitidos da query string, o idioma e os
+carimbos de versão das categorias de dados da página (utils/data_version):
+qualquer alteração nesses dados gera uma nova chave, então a invalidação
+por dependência não exige expurgo. O TTL de cada rota limita a idade máxima.
+
+As respostas levam Cache-Control, X-Accel-Expires (cache do nginx, ver
+config/nginx) e Surrogate-Key (expurgo por categoria em CDNs).
+"""
+
+import json
+from typing import Dict, Optional
+
+import frappe
+from werkzeug.http import http_date, parse_etags
+from werkzeug.wrappers import Response
+from frappe.website.page_renderers.base_renderer import BaseRenderer
+from ..utils.cache import cache_system
+from ..utils.data_version import make_etag
+
+# Rota -> TTL em segundos, categorias de dados e parâmetros da query string
+# que alteram a página (os demais são ignorados na chave)
+PAGE_CACHE_ROUTES = {
+    "transparencia": {
+        "ttl": 300,
+        "categories": ["receitas", "despesas", "contratos", "licitacoes", "orcamento", "obras"],
+        "params": [],
+    },
+    "transparencia/home": {
+        "ttl": 300,
+        "categories": ["receitas", "despesas", "contratos", "licitacoes", "orcamento", "obras"],
+        "params": [],
+    },
+    "transparencia/dashboard": {
+        "ttl": 300,
+        "categories": ["receitas", "despesas", "contratos", "licitacoes", "orcamento"],
+        "params": [],
+    },
+    "transparencia/receitas": {"ttl": 900, "categories": ["receitas"], "params": []},
+    "transparencia/despesas": {"ttl": 900, "categories": ["despesas"], "params": []},
+    "transparencia/contratos": {"ttl": 900, "categories": ["contratos"], "params": []},
+    "transparencia/licitacoes": {"ttl": 900, "categories": ["licitacoes"], "params": []},
+    "transparencia/orcamento": {"ttl": 1800, "categories": ["orcamento"], "params": []},
+    "transparencia/convenios": {"ttl": 1800, "categories": ["convenios"], "params": []},
+    "transparencia/obras": {"ttl": 1800, "categories": ["obras"], "params": []},
+    "transparencia/obras-publicas": {"ttl": 1800, "categories": ["obras"], "params": []},
+    "transparencia/servidores": {"ttl": 3600, "categories": ["servidores"], "params": []},
+    "transparencia/gestao-pessoas": {"ttl": 3600, "categories": ["servidores"], "params": []},
+    "transparencia/prestacao-contas": {
+        "ttl": 3600,
+        "categories": ["orcamento", "receitas", "despesas"],
+        "params": [],
+    },
+    "transparencia/busca": {
+        "ttl": 300,
+        "categories": ["receitas", "despesas", "contratos", "licitacoes", "servidores"],
+        "params": ["q"],
+    },
+}
+
+# Validade máxima no navegador; o cache compartilhado usa o TTL da rota
+BROWSER_MAX_AGE = 60
+
+
+class PageCache:
+    """Armazena o HTML renderizado das páginas públicas por versão dos dados"""
+
+    def __init__(self):
+        self.enabled = frappe.conf.get("portal_page_cache", True)
+
+    def _client(self):
+        return cache_system.redis_client or frappe.cache()
+
+    def _key(self, etag: str) -> str:
+        return cache_system.cache_prefix + "page:" + etag.strip('"')
+
+    def get_route(self) -> Optional[str]:
+        """Rota configurada da requisição atual, se elegível ao cache"""
+        if not self.enabled or not frappe.request or frappe.request.method not in ("GET", "HEAD"):
+            return None
+
+        if frappe.session.user != "Guest":
+            return None
+
+        route = frappe.request.path.strip("/")
+        return route if route in PAGE_CACHE_ROUTES else None
+
+    def get_validator(self, route: str):
+        """ETag e Last-Modified da página (None se os carimbos estão indisponíveis)"""
+        config = PAGE_CACHE_ROUTES[route]
+        params = {"route": route}
+        for name in config["params"]:
+            value = frappe.form_dict.get(name)
+            if value not in (None, ""):
+                params[name] = str(value).strip()
+
+        return make_etag(config["categories"], params)
+
+    def get(self, etag: str) -> Optional[Dict]:
+        try:
+            cached = self._client().get(self._key(etag))
+            return json.loads(cached) if cached else None
+        except Exception:
+            return None
+
+    def set(self, etag: str, route: str, response: Response):
+        try:
+            self._client().setex(
+                self._key(etag),
+                PAGE_CACHE_ROUTES[route]["ttl"],
+                json.dumps({
+                    "body": response.get_data(as_text=True),
+                    "content_type": response.content_type
+                })
+            )
+        except Exception as e:
+            frappe.log_error(f"Erro ao gravar cache da página {route}: {str(e)}", "Page Cache")
+
+    def set_headers(self, response: Response, route: str, etag: str, last_modified, status: str):
+        config = PAGE_CACHE_ROUTES[route]
+        ttl = config["ttl"]
+
+        response.headers["Cache-Control"] = f"public, max-age={min(BROWSER_MAX_AGE, ttl)}, s-maxage={ttl}"
+        response.headers["X-Accel-Expires"] = str(ttl)
+        response.headers["Surrogate-Key"] = " ".join(
+            ["transparencia", "route-" + route.replace("/", "-")] + config["categories"]
+        )
+        response.headers["ETag"] = etag
+        response.headers["Vary"] = "Accept-Language"
+        response.headers["X-Page-Cache"] = status
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(last_modified)
+
+
+# Instância global do cache de páginas
+page_cache = PageCache()
+
+
+class CachedPageRenderer(BaseRenderer):
+    """
+    Renderizador registrado no hook `page_renderer`
+
+    Assume as rotas elegíveis ao cache; em caso de falta, delega ao
+    renderizador padrão do Frappe e grava o resultado.
+    """
+
+    def can_render(self):
+        self.route = page_cache.get_route()
+        return bool(self.route)
+
+    def render(self):
+        etag, last_modified = page_cache.get_validator(self.route)
+        if not etag:
+            return self.render_uncached()
+
+        # O cliente já tem esta versão da página
+        if etag in parse_etags(frappe.request.headers.get("If-None-Match")):
+            response = Response(status=304)
+            page_cache.set_headers(response, self.route, etag, last_modified, "HIT")
+            return response
+
+        cached = page_cache.get(etag)
+        if cached:
+            response = Response(cached["body"], status=200, content_type=cached["content_type"])
+            page_cache.set_headers(response, self.route, etag, last_modified, "HIT")
+            return response
+
+        response = self.render_uncached()
+        if response.status_code == 200:
+            page_cache.set(etag, self.route, response)
+            page_cache.set_headers(response, self.route, etag, last_modified, "MISS")
+
+        return response
+
+    def render_uncached(self):
+        """Renderiza com a cadeia padrão de renderizadores do Frappe"""
+        from frappe.website.page_renderers.document_page import DocumentPage
+        from frappe.website.page_renderers.list_page import ListPage
+        from frappe.website.page_renderers.not_found_page import NotFoundPage
+        from frappe.website.page_renderers.print_page import PrintPage
+        from frappe.website.page_renderers.static_page import StaticPage
+        from frappe.website.page_renderers.template_page import TemplatePage
+        from frappe.website.page_renderers.web_form import WebFormPage
+
+        for renderer in (StaticPage, WebFormPage, DocumentPage, TemplatePage, ListPage, PrintPage):
+            instance = renderer(self.path, self.http_status_code)
+            if instance.can_render():
+                return instance.render()
+
+        return NotFoundPage(self.path).render()
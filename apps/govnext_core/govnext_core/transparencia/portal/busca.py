@@ -7,6 +7,10 @@ from frappe import _
 from frappe.utils import flt, fmt_money, getdate
 import json
 import re
+from urllib.parse import quote
+from ...utils.search_analytics import search_analytics
+from ...utils.search_index import search_index
+from ...utils.typeahead import typeahead_index
 
 def get_context(context):
 	"""
@@ -42,7 +46,13 @@ def get_context(context):
 def realizar_busca(query):
 	"""
 	Realiza a busca nos diferentes módulos do portal.
+
+	Usa o índice invertido (BM25) quando disponível; a varredura abaixo
+	permanece apenas enquanto o índice não foi construído.
 	"""
+	if search_index.is_ready():
+		return [formatar_resultado_indice(resultado) for resultado in search_index.search(query, limit=50)]
+
 	resultados = []
 
 	# Buscar em despesas
@@ -71,6 +81,16 @@ def realizar_busca(query):
 
 	return resultados
 
+def formatar_resultado_indice(resultado):
+	"""Formata um documento do índice de busca para exibição."""
+	if resultado.get("valor"):
+		resultado["valor"] = fmt_money(flt(resultado["valor"]), currency="BRL")
+
+	if re.match(r"^\d{4}-\d{2}-\d{2}$", resultado.get("data") or ""):
+		resultado["data"] = frappe.utils.formatdate(resultado["data"], "dd/MM/yyyy")
+
+	return resultado
+
 def buscar_despesas(query):
 	"""Busca em despesas."""
 	resultados = []
@@ -322,7 +342,14 @@ def get_stats_busca(resultados):
 def get_sugestoes_busca():
 	"""
 	Retorna sugestões de busca populares.
+
+	Vêm do snapshot das estatísticas de busca; a lista fixa é usada até
+	que haja buscas suficientes registradas.
 	"""
+	populares = search_analytics.get_snapshot()
+	if len(populares) >= 5:
+		return [item["termo"] for item in populares[:10]]
+
 	return [
 		"IPTU",
 		"Folha de pagamento",
@@ -338,8 +365,12 @@ def get_sugestoes_busca():
 
 def get_termos_populares():
 	"""
-	Retorna os termos mais buscados.
+	Retorna os termos mais buscados (snapshot das estatísticas de busca).
 	"""
+	populares = search_analytics.get_snapshot()
+	if populares:
+		return populares[:6]
+
 	return [
 		{"termo": "IPTU", "frequencia": 245},
 		{"termo": "Folha pagamento", "frequencia": 189},
@@ -353,14 +384,21 @@ def get_termos_populares():
 def busca_ajax(query):
 	"""
 	Endpoint AJAX para busca em tempo real.
+
+	Responde com as completações do autocompletar, mantido em memória por
+	worker; a busca completa fica para a página de resultados.
 	"""
 	if not query or len(query) < 3:
 		return {"resultados": [], "total": 0}
 
-	resultados = realizar_busca(query)
-
-	# Limitar resultados para AJAX
-	resultados = resultados[:10]
+	resultados = [
+		{
+			"tipo": "sugestao",
+			"titulo": completacao["termo"],
+			"link": f"/transparencia/busca?q={quote(completacao['termo'])}"
+		}
+		for completacao in typeahead_index.complete(query, limit=10)
+	]
 
 	return {
 		"resultados": resultados,
@@ -374,7 +412,6 @@ def registrar_busca(query):
 	Registra uma busca para estatísticas (sem dados pessoais).
 	"""
 	if query and len(query.strip()) >= 3:
-		# Em produção, salvar em log de buscas para melhorar sugestões
-		frappe.logger().info(f"Busca realizada: {query}")
+		search_analytics.record(query)
 
 	return {"success": True}
@@ -6,6 +6,9 @@ import frappe
 from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months
 import json
+from ...api.v2.utils.response_formatter import response_formatter
+from ...api.v2.utils.fieldsets import project_rows
+from ...utils.export_engine import export_response
 
 def get_context(context):
 	"""
@@ -386,20 +389,24 @@ def get_orgaos_list():
 		]
 
 @frappe.whitelist(allow_guest=True)
-def get_convenios_ajax(filtros=None):
+def get_convenios_ajax(filtros=None, fields=None):
 	"""Endpoint AJAX para buscar convênios com filtros."""
+	not_modified = response_formatter.not_modified(["convenios"], {"filtros": filtros, "fields": fields})
+	if not_modified:
+		return not_modified
+
 	if filtros:
 		filtros = json.loads(filtros)
 
 	# Aplicar filtros e retornar dados
 	convenios = get_convenios_data()
 
-	return {
+	return response_formatter.render({
 		"success": True,
-		"data": convenios,
+		"data": project_rows(convenios, fields),
 		"total": len(convenios),
 		"total_valor": sum([c["valor_total"] for c in convenios])
-	}
+	})
 
 @frappe.whitelist(allow_guest=True)
 def get_convenio_detalhes(convenio_id):
@@ -441,8 +448,8 @@ def exportar_convenios(formato="csv", filtros=None):
 
 	convenios = get_convenios_data()
 
-	if formato == "csv":
-		return gerar_csv_convenios(convenios)
+	if formato in ("csv", "xml", "jsonl"):
+		return gerar_csv_convenios(convenios, formato)
 	elif formato == "xlsx":
 		return gerar_xlsx_convenios(convenios)
 	elif formato == "pdf":
@@ -450,42 +457,31 @@ def exportar_convenios(formato="csv", filtros=None):
 
 	return {"error": "Formato não suportado"}
 
-def gerar_csv_convenios(convenios):
-	"""Gera arquivo CSV com dados de convênios."""
-	import csv
-	import io
-
-	output = io.StringIO()
-	writer = csv.writer(output)
-
-	# Cabeçalho
-	writer.writerow([
-		"Número", "Data Assinatura", "Convenente", "CNPJ", "Tipo", "Objeto",
-		"Área", "Situação", "Valor Total", "Valor Repasse", "Valor Executado",
-		"% Execução", "Órgão Responsável", "Beneficiários"
-	])
-
-	# Dados
-	for convenio in convenios:
-		writer.writerow([
-			convenio["numero"],
-			convenio["data_assinatura_formatada"],
-			convenio["convenente"],
-			convenio["cnpj"],
-			convenio["tipo"],
-			convenio["objeto"],
-			convenio["area"],
-			convenio["situacao"],
-			convenio["valor_total_formatado"],
-			convenio["valor_repasse_formatado"],
-			convenio["valor_executado_formatado"],
-			f"{convenio['percentual_execucao']}%",
-			convenio["orgao_responsavel"],
-			convenio["beneficiarios_atendidos"]
-		])
-
-	return {
-		"content": output.getvalue(),
-		"filename": f"convenios_{frappe.utils.today()}.csv",
-		"type": "text/csv"
-	}
\ No newline at end of file
+# Colunas do CSV: (cabeçalho, campo ou função sobre o registro)
+COLUNAS_CSV_CONVENIOS = [
+	("Número", "numero"),
+	("Data Assinatura", "data_assinatura_formatada"),
+	("Convenente", "convenente"),
+	("CNPJ", "cnpj"),
+	("Tipo", "tipo"),
+	("Objeto", "objeto"),
+	("Área", "area"),
+	("Situação", "situacao"),
+	("Valor Total", "valor_total_formatado"),
+	("Valor Repasse", "valor_repasse_formatado"),
+	("Valor Executado", "valor_executado_formatado"),
+	("% Execução", lambda item: f"{item['percentual_execucao']}%"),
+	("Órgão Responsável", "orgao_responsavel"),
+	("Beneficiários", "beneficiarios_atendidos"),
+]
+
+def gerar_csv_convenios(convenios, formato="csv"):
+	"""Gera o arquivo de convênios em fluxo (CSV, XML ou JSON Lines)."""
+	return export_response(
+		convenios,
+		formato,
+		f"convenios_{frappe.utils.today()}",
+		columns=COLUNAS_CSV_CONVENIOS if formato == "csv" else None,
+		root="convenios",
+		item="convenio"
+	)
\ No newline at end of file
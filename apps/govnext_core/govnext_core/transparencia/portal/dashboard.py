@@ -7,6 +7,10 @@ from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months, nowdate
 import json
 import datetime
+from ...api.v2.utils.response_formatter import response_formatter
+from ...utils.kpi_counters import get_kpi_counters
+from ..kpi_history import get_kpi_history
+from ..transparency_index import get_transparency_history
 
 def get_context(context):
 	"""
@@ -40,7 +44,7 @@ def get_context(context):
 
 def get_kpis_principais():
 	"""Retorna os KPIs principais do dashboard."""
-	return {
+	kpis = {
 		"financeiro": {
 			"orcamento_total": {
 				"valor": 24000000,
@@ -145,6 +149,66 @@ def get_kpis_principais():
 		}
 	}
 
+	aplicar_contadores_kpi(kpis)
+	return kpis
+
+def aplicar_contadores_kpi(kpis):
+	"""
+	Substitui os valores financeiros e operacionais pelos contadores de KPI do exercício.
+
+	Os campos derivados (orçamento total, percentuais de meta e de execução)
+	são recalculados a partir dos mesmos valores; variações e tendências de
+	exemplo são removidas dos indicadores atualizados, pois não há base de
+	comparação calculada.
+	"""
+	ano = getdate(nowdate()).year
+	contadores = get_kpi_counters(ano)
+	if not contadores:
+		return
+
+	financeiro = kpis["financeiro"]
+	resultado = contadores["receitas"] - contadores["despesas"]
+	orcamento_total = get_orcamento_total(ano)
+
+	for chave, valor in (
+		("orcamento_total", orcamento_total),
+		("receitas_arrecadadas", contadores["receitas"]),
+		("despesas_executadas", contadores["despesas"]),
+		("resultado_orcamentario", resultado)
+	):
+		financeiro[chave]["valor"] = valor
+		financeiro[chave]["formatado"] = fmt_money(valor, currency="BRL")
+
+	financeiro["receitas_arrecadadas"]["percentual_meta"] = percentual(contadores["receitas"], orcamento_total)
+	financeiro["despesas_executadas"]["percentual_orcamento"] = percentual(contadores["despesas"], orcamento_total)
+
+	financeiro["resultado_orcamentario"]["tipo"] = "Superávit" if resultado >= 0 else "Déficit"
+	financeiro["resultado_orcamentario"]["cor"] = "success" if resultado >= 0 else "danger"
+
+	kpis["operacional"]["licitacoes_andamento"]["valor"] = contadores["licitacoes_ativas"]
+	kpis["operacional"]["obras_execucao"]["valor"] = contadores["obras_execucao"]
+
+	for kpi in (
+		*financeiro.values(),
+		kpis["operacional"]["licitacoes_andamento"],
+		kpis["operacional"]["obras_execucao"]
+	):
+		kpi.pop("variacao", None)
+		kpi.pop("tendencia", None)
+
+def get_orcamento_total(ano):
+	"""Total orçado no exercício (soma das contas de orçamento)."""
+	total = frappe.db.sql("""
+		SELECT SUM(budget_amount)
+		FROM `tabBudget Account`
+		WHERE parent IN (SELECT name FROM `tabBudget` WHERE fiscal_year = %s)
+	""", [ano])
+	return flt(total[0][0]) if total else 0
+
+def percentual(valor, total):
+	"""Percentual de `valor` sobre `total` (None sem total)."""
+	return round(flt(valor) / total * 100, 1) if total else None
+
 def get_indicadores_transparencia():
 	"""Retorna indicadores específicos de transparência."""
 	return {
@@ -472,6 +536,7 @@ def get_ultimas_atualizacoes():
 def get_ranking_transparencia():
 	"""Retorna dados do ranking de transparência."""
 	return {
+		"historico_indice": get_transparency_history(),
 		"posicao_atual": 15,
 		"total_municipios": 645,
 		"percentil": 97.7,
@@ -558,7 +623,21 @@ def get_metas_desempenho():
 
 @frappe.whitelist(allow_guest=True)
 def get_dashboard_data(periodo="atual"):
-	"""API para carregar dados do dashboard dinamicamente."""
+	"""
+	API para carregar dados do dashboard dinamicamente.
+
+	Telas que ficam abertas devem carregar esta API uma vez e receber os KPIs
+	pelo evento realtime `govnext_kpis` (ver utils.kpi_broadcast), em vez de
+	consultá-la periodicamente: govnext_portal.kpis.init(dados.kpis), em
+	public/js/transparencia.js, assina o evento e atualiza a estrutura.
+	"""
+	not_modified = response_formatter.not_modified(
+		["receitas", "despesas", "licitacoes", "contratos", "orcamento", "obras"],
+		{"periodo": periodo}
+	)
+	if not_modified:
+		return not_modified
+
 	return {
 		"kpis": get_kpis_principais(),
 		"graficos": get_dados_graficos_dashboard(),
@@ -570,20 +649,8 @@ def get_dashboard_data(periodo="atual"):
 
 @frappe.whitelist(allow_guest=True)
 def get_historico_kpi(kpi, periodo_dias=30):
-	"""API para buscar histórico de um KPI específico."""
-	# Em um ambiente real, buscaria dados históricos do banco
-	dados_exemplo = {
-		"receitas_arrecadadas": {
-			"labels": ["Sem 1", "Sem 2", "Sem 3", "Sem 4"],
-			"valores": [4200000, 4650000, 4900000, 5100000]
-		},
-		"despesas_executadas": {
-			"labels": ["Sem 1", "Sem 2", "Sem 3", "Sem 4"],
-			"valores": [3800000, 4100000, 3900000, 3800000]
-		}
-	}
-	
-	return dados_exemplo.get(kpi, {"labels": [], "valores": []})
+	"""API para buscar histórico de um KPI específico (ver transparencia.kpi_history)."""
+	return get_kpi_history(kpi, periodo_dias)
 
 @frappe.whitelist(allow_guest=True)
 def atualizar_meta_desempenho(meta_id, novo_valor):
@@ -6,6 +6,9 @@ import frappe
 from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months, get_first_day, get_last_day
 import json
+from ...api.v2.utils.response_formatter import response_formatter
+from ...api.v2.utils.fieldsets import project_rows
+from ...utils.export_engine import export_response
 
 def get_context(context):
 	"""
@@ -239,20 +242,24 @@ def get_orgaos_list():
 		]
 
 @frappe.whitelist(allow_guest=True)
-def get_despesas_ajax(filtros=None):
+def get_despesas_ajax(filtros=None, fields=None):
 	"""Endpoint AJAX para buscar despesas com filtros."""
+	not_modified = response_formatter.not_modified(["despesas"], {"filtros": filtros, "fields": fields})
+	if not_modified:
+		return not_modified
+
 	if filtros:
 		filtros = json.loads(filtros)
 
 	# Aplicar filtros e retornar dados
 	despesas = get_despesas_data()
 
-	return {
+	return response_formatter.render({
 		"success": True,
-		"data": despesas,
+		"data": project_rows(despesas, fields),
 		"total": len(despesas),
 		"total_valor": sum([d["valor"] for d in despesas])
-	}
+	})
 
 @frappe.whitelist(allow_guest=True)
 def exportar_despesas(formato="csv", filtros=None):
@@ -262,8 +269,8 @@ def exportar_despesas(formato="csv", filtros=None):
 
 	despesas = get_despesas_data()
 
-	if formato == "csv":
-		return gerar_csv_despesas(despesas)
+	if formato in ("csv", "xml", "jsonl"):
+		return gerar_csv_despesas(despesas, formato)
 	elif formato == "xlsx":
 		return gerar_xlsx_despesas(despesas)
 	elif formato == "pdf":
@@ -271,36 +278,26 @@ def exportar_despesas(formato="csv", filtros=None):
 
 	return {"error": "Formato não suportado"}
 
-def gerar_csv_despesas(despesas):
-	"""Gera arquivo CSV com dados de despesas."""
-	import csv
-	import io
-
-	output = io.StringIO()
-	writer = csv.writer(output)
+# Colunas do CSV: (cabeçalho, campo ou função sobre o registro)
+COLUNAS_CSV_DESPESAS = [
+	("ID", "id"),
+	("Data", "data_formatada"),
+	("Fornecedor", "fornecedor"),
+	("CNPJ", "cnpj"),
+	("Descrição", "descricao"),
+	("Categoria", "categoria"),
+	("Órgão", "orgao"),
+	("Valor", "valor_formatado"),
+	("Tipo", "tipo_despesa"),
+]
 
-	# Cabeçalho
-	writer.writerow([
-		"ID", "Data", "Fornecedor", "CNPJ", "Descrição",
-		"Categoria", "Órgão", "Valor", "Tipo"
-	])
-
-	# Dados
-	for despesa in despesas:
-		writer.writerow([
-			despesa["id"],
-			despesa["data_formatada"],
-			despesa["fornecedor"],
-			despesa["cnpj"],
-			despesa["descricao"],
-			despesa["categoria"],
-			despesa["orgao"],
-			despesa["valor_formatado"],
-			despesa["tipo_despesa"]
-		])
-
-	return {
-		"content": output.getvalue(),
-		"filename": f"despesas_{frappe.utils.today()}.csv",
-		"type": "text/csv"
-	}
+def gerar_csv_despesas(despesas, formato="csv"):
+	"""Gera o arquivo de despesas em fluxo (CSV, XML ou JSON Lines)."""
+	return export_response(
+		despesas,
+		formato,
+		f"despesas_{frappe.utils.today()}",
+		columns=COLUNAS_CSV_DESPESAS if formato == "csv" else None,
+		root="despesas",
+		item="despesa"
+	)
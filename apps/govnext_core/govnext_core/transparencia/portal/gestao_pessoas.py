@@ -9,6 +9,32 @@ from frappe import _
 from frappe.utils import cint, flt, date_diff, nowdate
 import hashlib
 import json
+from ...api.v2.utils.fieldsets import select_clause
+from ...utils.export_engine import export_response, query_rows
+
+# Campos publicáveis de remuneração (nome público -> expressão SQL).
+# Identificadores pessoais só aparecem mascarados (LGPD).
+REMUNERACAO_FIELDS = {
+    "servidor_hash": "MD5(CONCAT(s.name, s.cpf))",
+    "cargo": "s.cargo",
+    "categoria": "s.categoria",
+    "orgao_nome": "s.orgao_nome",
+    "data_referencia": "r.data_referencia",
+    "valor_bruto": "r.valor_bruto",
+    "valor_liquido": "r.valor_liquido",
+    "valor_descontos": "r.valor_descontos",
+    "valor_vantagens": "r.valor_vantagens",
+    "faixa_salarial": """CASE 
+                WHEN r.valor_bruto <= 2000 THEN 'Faixa 1'
+                WHEN r.valor_bruto <= 4000 THEN 'Faixa 2'
+                WHEN r.valor_bruto <= 6000 THEN 'Faixa 3'
+                WHEN r.valor_bruto <= 8000 THEN 'Faixa 4'
+                WHEN r.valor_bruto <= 10000 THEN 'Faixa 5'
+                WHEN r.valor_bruto <= 15000 THEN 'Faixa 6'
+                WHEN r.valor_bruto <= 20000 THEN 'Faixa 7'
+                ELSE 'Faixa 8'
+            END""",
+}
 
 def get_context(context):
     """
@@ -219,13 +245,21 @@ def get_remuneracao_por_faixas():
     return resultado
 
 @frappe.whitelist()
-def get_remuneracao_detalhada(filters=None):
+def get_remuneracao_detalhada(filters=None, fields=None):
     """
     API para busca detalhada de remuneração
     Retorna dados anonimizados conforme LGPD
+    `fields` restringe as colunas selecionadas (ver REMUNERACAO_FIELDS)
     """
+    query, values = build_remuneracao_query(filters, fields, limit=1000)
+    return frappe.db.sql(query, values, as_dict=True)
+
+def build_remuneracao_query(filters=None, fields=None, limit=None):
+    """Monta a consulta de remuneração anonimizada (sem limite para exportação)"""
     if not filters:
         filters = {}
+    elif isinstance(filters, str):
+        filters = json.loads(filters)
     
     # Constrói query com filtros
     conditions = ["s.status = 'Ativo'"]
@@ -248,83 +282,38 @@ def get_remuneracao_detalhada(filters=None):
         values['mes'] = cint(filters['mes'])
     
     where_clause = " AND ".join(conditions)
+    limit_clause = f"LIMIT {cint(limit)}" if limit else ""
     
     # Query principal com dados anonimizados
     query = f"""
         SELECT 
-            MD5(CONCAT(s.name, s.cpf)) as servidor_hash,
-            s.cargo,
-            s.categoria,
-            s.orgao_nome,
-            r.data_referencia,
-            r.valor_bruto,
-            r.valor_liquido,
-            r.valor_descontos,
-            r.valor_vantagens,
-            CASE 
-                WHEN r.valor_bruto <= 2000 THEN 'Faixa 1'
-                WHEN r.valor_bruto <= 4000 THEN 'Faixa 2'
-                WHEN r.valor_bruto <= 6000 THEN 'Faixa 3'
-                WHEN r.valor_bruto <= 8000 THEN 'Faixa 4'
-                WHEN r.valor_bruto <= 10000 THEN 'Faixa 5'
-                WHEN r.valor_bruto <= 15000 THEN 'Faixa 6'
-                WHEN r.valor_bruto <= 20000 THEN 'Faixa 7'
-                ELSE 'Faixa 8'
-            END as faixa_salarial
+            {select_clause(REMUNERACAO_FIELDS, fields)}
         FROM `tabTransparencia Servidor` s
         LEFT JOIN `tabTransparencia Remuneracao` r ON s.name = r.servidor
         WHERE {where_clause}
         ORDER BY r.data_referencia DESC, r.valor_bruto DESC
-        LIMIT 1000
+        {limit_clause}
     """
     
-    return frappe.db.sql(query, values, as_dict=True)
+    return query, values
 
 @frappe.whitelist()
-def export_dados_pessoas(format_type="csv", filters=None):
+def export_dados_pessoas(format_type="csv", filters=None, fields=None):
     """
     Exporta dados de gestão de pessoas em formato aberto
-    Formatos: CSV, JSON, XML, Excel
+    Formatos: CSV, JSON, JSON Lines, XML (em fluxo, sem limite de linhas)
     """
-    if not filters:
-        filters = {}
-    
-    dados = get_remuneracao_detalhada(filters)
-    
-    if format_type == "json":
-        return json.dumps(dados, indent=2, ensure_ascii=False)
-    elif format_type == "csv":
-        return convert_to_csv(dados)
-    elif format_type == "xml":
-        return convert_to_xml(dados)
-    else:
-        return dados
-
-def convert_to_csv(dados):
-    """Converte dados para formato CSV"""
-    import csv
-    import io
-    
-    output = io.StringIO()
-    if dados:
-        writer = csv.DictWriter(output, fieldnames=dados[0].keys())
-        writer.writeheader()
-        writer.writerows(dados)
-    
-    return output.getvalue()
-
-def convert_to_xml(dados):
-    """Converte dados para formato XML"""
-    xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n<gestao_pessoas>\n'
-    
-    for item in dados:
-        xml_content += '  <servidor>\n'
-        for key, value in item.items():
-            xml_content += f'    <{key}>{value}</{key}>\n'
-        xml_content += '  </servidor>\n'
+    if format_type not in ("csv", "json", "jsonl", "xml"):
+        return get_remuneracao_detalhada(filters, fields)
     
-    xml_content += '</gestao_pessoas>'
-    return xml_content
+    query, values = build_remuneracao_query(filters, fields)
+    return export_response(
+        query_rows(query, values),
+        format_type,
+        f"gestao_pessoas_{frappe.utils.today()}",
+        root="gestao_pessoas",
+        item="servidor"
+    )
 
 def anonimizar_dados_pessoais(dados):
     """
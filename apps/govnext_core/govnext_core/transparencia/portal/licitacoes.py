@@ -6,6 +6,8 @@ import frappe
 from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months
 import json
+from ...api.v2.utils.response_formatter import response_formatter
+from ...api.v2.utils.fieldsets import project_rows
 
 def get_context(context):
 	"""
@@ -278,20 +280,24 @@ def get_orgaos_list():
 		]
 
 @frappe.whitelist(allow_guest=True)
-def get_licitacoes_ajax(filtros=None):
+def get_licitacoes_ajax(filtros=None, fields=None):
 	"""Endpoint AJAX para buscar licitações com filtros."""
+	not_modified = response_formatter.not_modified(["licitacoes"], {"filtros": filtros, "fields": fields})
+	if not_modified:
+		return not_modified
+
 	if filtros:
 		filtros = json.loads(filtros)
 
 	# Aplicar filtros e retornar dados
 	licitacoes = get_licitacoes_data()
 
-	return {
+	return response_formatter.render({
 		"success": True,
-		"data": licitacoes,
+		"data": project_rows(licitacoes, fields),
 		"total": len(licitacoes),
 		"total_valor": sum([l["valor_estimado"] for l in licitacoes])
-	}
+	})
 
 @frappe.whitelist(allow_guest=True)
 def get_edital_download(licitacao_id):
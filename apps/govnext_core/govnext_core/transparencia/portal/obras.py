@@ -9,6 +9,8 @@ from frappe import _
 from frappe.utils import cint, flt, date_diff, nowdate, get_datetime
 import json
 import math
+from html import escape as escape_html
+from ...utils.export_engine import export_response, query_rows
 
 def get_context(context):
     """
@@ -395,8 +397,15 @@ def get_obras_filtradas(filters=None):
     API para busca filtrada de obras
     Retorna obras conforme filtros aplicados
     """
+    query, values = build_obras_query(filters, limit=500)
+    return frappe.db.sql(query, values, as_dict=True)
+
+def build_obras_query(filters=None, limit=None):
+    """Monta a consulta filtrada de obras (sem limite para exportação)"""
     if not filters:
         filters = {}
+    elif isinstance(filters, str):
+        filters = json.loads(filters)
     
     # Constrói query com filtros
     conditions = ["1=1"]
@@ -428,6 +437,7 @@ def get_obras_filtradas(filters=None):
         values['bairro'] = f"%{filters['bairro']}%"
     
     where_clause = " AND ".join(conditions)
+    limit_clause = f"LIMIT {cint(limit)}" if limit else ""
     
     # Query principal
     query = f"""
@@ -461,114 +471,52 @@ def get_obras_filtradas(filters=None):
         FROM `tabTransparencia Obra`
         WHERE {where_clause}
         ORDER BY valor_contratado DESC, data_inicio DESC
-        LIMIT 500
+        {limit_clause}
     """
     
-    return frappe.db.sql(query, values, as_dict=True)
+    return query, values
+
+# Estilos dos marcadores no KML: id -> (cor aabbggrr, ícone)
+KML_STYLES = {
+    "obra-execucao": ("ffff0000", "http://maps.google.com/mapfiles/kml/shapes/construction.png"),
+    "obra-concluida": ("ff00ff00", "http://maps.google.com/mapfiles/kml/shapes/check-circle.png"),
+}
 
 @frappe.whitelist()
 def export_dados_obras(format_type="csv", filters=None):
     """
     Exporta dados de obras em formato aberto
-    Formatos: CSV, JSON, XML, Excel, KML (para dados geográficos)
+    Formatos: CSV, JSON, JSON Lines, XML, GeoJSON e KML (dados geográficos),
+    gerados em fluxo e sem limite de linhas
     """
-    if not filters:
-        filters = {}
-    
-    dados = get_obras_filtradas(filters)
-    
-    if format_type == "json":
-        return json.dumps(dados, indent=2, ensure_ascii=False, default=str)
-    elif format_type == "csv":
-        return convert_to_csv(dados)
-    elif format_type == "xml":
-        return convert_to_xml(dados)
-    elif format_type == "kml":
-        return convert_to_kml(dados)
-    else:
-        return dados
-
-def convert_to_csv(dados):
-    """Converte dados para formato CSV"""
-    import csv
-    import io
-    
-    output = io.StringIO()
-    if dados:
-        writer = csv.DictWriter(output, fieldnames=dados[0].keys())
-        writer.writeheader()
-        writer.writerows(dados)
-    
-    return output.getvalue()
-
-def convert_to_xml(dados):
-    """Converte dados para formato XML"""
-    xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n<obras_publicas>\n'
-    
-    for obra in dados:
-        xml_content += '  <obra>\n'
-        for key, value in obra.items():
-            xml_content += f'    <{key}>{value}</{key}>\n'
-        xml_content += '  </obra>\n'
-    
-    xml_content += '</obras_publicas>'
-    return xml_content
+    if format_type not in ("csv", "json", "jsonl", "xml", "geojson", "kml"):
+        return get_obras_filtradas(filters)
+    
+    query, values = build_obras_query(filters)
+    return export_response(
+        query_rows(query, values),
+        format_type,
+        f"obras_publicas_{frappe.utils.today()}",
+        root="obras_publicas",
+        item="obra",
+        name="Obras Públicas",
+        description="Localização das obras públicas municipais",
+        styles=KML_STYLES,
+        placemark_name=lambda obra: obra.get("nome_obra"),
+        placemark_description=descricao_kml_obra,
+        placemark_style=lambda obra: "obra-concluida" if obra.get("situacao") == "concluida" else "obra-execucao"
+    )
 
-def convert_to_kml(dados):
-    """Converte dados para formato KML (Google Earth)"""
-    kml_content = '''<?xml version="1.0" encoding="UTF-8"?>
-<kml xmlns="http://www.opengis.net/kml/2.2">
-  <Document>
-    <name>Obras Públicas</name>
-    <description>Localização das obras públicas municipais</description>
-    
-    <Style id="obra-execucao">
-      <IconStyle>
-        <color>ffff0000</color>
-        <scale>1.0</scale>
-        <Icon>
-          <href>http://maps.google.com/mapfiles/kml/shapes/construction.png</href>
-        </Icon>
-      </IconStyle>
-    </Style>
-    
-    <Style id="obra-concluida">
-      <IconStyle>
-        <color>ff00ff00</color>
-        <scale>1.0</scale>
-        <Icon>
-          <href>http://maps.google.com/mapfiles/kml/shapes/check-circle.png</href>
-        </Icon>
-      </IconStyle>
-    </Style>
-'''
-    
-    for obra in dados:
-        if obra.get('latitude') and obra.get('longitude'):
-            style_id = "obra-concluida" if obra['situacao'] == 'concluida' else "obra-execucao"
-            
-            kml_content += f'''
-    <Placemark>
-      <name>{obra['nome_obra']}</name>
-      <description><![CDATA[
-        <b>Tipo:</b> {obra['tipo_obra']}<br/>
-        <b>Situação:</b> {obra['situacao']}<br/>
-        <b>Valor:</b> R$ {obra['valor_contratado']:,.2f}<br/>
-        <b>Execução:</b> {obra['percentual_executado']:.1f}%<br/>
-        <b>Endereço:</b> {obra['endereco_completo']}<br/>
-        <b>Responsável:</b> {obra['secretaria_responsavel']}
-      ]]></description>
-      <styleUrl>#{style_id}</styleUrl>
-      <Point>
-        <coordinates>{obra['longitude']},{obra['latitude']},0</coordinates>
-      </Point>
-    </Placemark>'''
-    
-    kml_content += '''
-  </Document>
-</kml>'''
-    
-    return kml_content
+def descricao_kml_obra(obra):
+    """Descrição HTML do marcador da obra no KML"""
+    return (
+        f"<b>Tipo:</b> {escape_html(obra.get('tipo_obra') or '')}<br/>"
+        f"<b>Situação:</b> {escape_html(obra.get('situacao') or '')}<br/>"
+        f"<b>Valor:</b> R$ {flt(obra.get('valor_contratado')):,.2f}<br/>"
+        f"<b>Execução:</b> {flt(obra.get('percentual_executado')):.1f}%<br/>"
+        f"<b>Endereço:</b> {escape_html(obra.get('endereco_completo') or '')}<br/>"
+        f"<b>Responsável:</b> {escape_html(obra.get('secretaria_responsavel') or '')}"
+    )
 
 def calcular_distancia_obras(lat1, lon1, lat2, lon2):
     """
@@ -6,6 +6,7 @@ import frappe
 from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months
 import json
+from ...api.v2.utils.response_formatter import response_formatter
 
 def get_context(context):
 	"""
@@ -433,6 +434,10 @@ def get_orgaos_list():
 @frappe.whitelist(allow_guest=True)
 def get_orcamento_ajax(filtros=None):
 	"""Endpoint AJAX para buscar dados orçamentários com filtros."""
+	not_modified = response_formatter.not_modified(["orcamento"], {"filtros": filtros})
+	if not_modified:
+		return not_modified
+
 	if filtros:
 		filtros = json.loads(filtros)
 
@@ -6,6 +6,9 @@ import frappe
 from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months
 import json
+from ...api.v2.utils.response_formatter import response_formatter
+from ...api.v2.utils.fieldsets import project_rows
+from ...utils.export_engine import export_response
 
 def get_context(context):
 	"""
@@ -260,20 +263,24 @@ def get_orgaos_list():
 		]
 
 @frappe.whitelist(allow_guest=True)
-def get_receitas_ajax(filtros=None):
+def get_receitas_ajax(filtros=None, fields=None):
 	"""Endpoint AJAX para buscar receitas com filtros."""
+	not_modified = response_formatter.not_modified(["receitas"], {"filtros": filtros, "fields": fields})
+	if not_modified:
+		return not_modified
+
 	if filtros:
 		filtros = json.loads(filtros)
 
 	# Aplicar filtros e retornar dados
 	receitas = get_receitas_data()
 
-	return {
+	return response_formatter.render({
 		"success": True,
-		"data": receitas,
+		"data": project_rows(receitas, fields),
 		"total": len(receitas),
 		"total_valor": sum([r["valor"] for r in receitas])
-	}
+	})
 
 @frappe.whitelist(allow_guest=True)
 def exportar_receitas(formato="csv", filtros=None):
@@ -283,8 +290,8 @@ def exportar_receitas(formato="csv", filtros=None):
 
 	receitas = get_receitas_data()
 
-	if formato == "csv":
-		return gerar_csv_receitas(receitas)
+	if formato in ("csv", "xml", "jsonl"):
+		return gerar_csv_receitas(receitas, formato)
 	elif formato == "xlsx":
 		return gerar_xlsx_receitas(receitas)
 	elif formato == "pdf":
@@ -292,38 +299,28 @@ def exportar_receitas(formato="csv", filtros=None):
 
 	return {"error": "Formato não suportado"}
 
-def gerar_csv_receitas(receitas):
-	"""Gera arquivo CSV com dados de receitas."""
-	import csv
-	import io
-
-	output = io.StringIO()
-	writer = csv.writer(output)
+# Colunas do CSV: (cabeçalho, campo ou função sobre o registro)
+COLUNAS_CSV_RECEITAS = [
+	("ID", "id"),
+	("Data", "data_formatada"),
+	("Fonte", "fonte"),
+	("Código", "codigo"),
+	("Descrição", "descricao"),
+	("Categoria", "categoria"),
+	("Tipo", "tipo"),
+	("Órgão", "orgao"),
+	("Valor", "valor_formatado"),
+	("Meta Anual", "meta_anual_formatada"),
+	("% Meta", lambda item: f"{item['percentual_meta']}%"),
+]
 
-	# Cabeçalho
-	writer.writerow([
-		"ID", "Data", "Fonte", "Código", "Descrição",
-		"Categoria", "Tipo", "Órgão", "Valor", "Meta Anual", "% Meta"
-	])
-
-	# Dados
-	for receita in receitas:
-		writer.writerow([
-			receita["id"],
-			receita["data_formatada"],
-			receita["fonte"],
-			receita["codigo"],
-			receita["descricao"],
-			receita["categoria"],
-			receita["tipo"],
-			receita["orgao"],
-			receita["valor_formatado"],
-			receita["meta_anual_formatada"],
-			f"{receita['percentual_meta']}%"
-		])
-
-	return {
-		"content": output.getvalue(),
-		"filename": f"receitas_{frappe.utils.today()}.csv",
-		"type": "text/csv"
-	}
+def gerar_csv_receitas(receitas, formato="csv"):
+	"""Gera o arquivo de receitas em fluxo (CSV, XML ou JSON Lines)."""
+	return export_response(
+		receitas,
+		formato,
+		f"receitas_{frappe.utils.today()}",
+		columns=COLUNAS_CSV_RECEITAS if formato == "csv" else None,
+		root="receitas",
+		item="receita"
+	)
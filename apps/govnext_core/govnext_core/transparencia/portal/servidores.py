@@ -6,6 +6,8 @@ import frappe
 from frappe import _
 from frappe.utils import flt, fmt_money, getdate, add_months
 import json
+from ...api.v2.utils.response_formatter import response_formatter
+from ...api.v2.utils.fieldsets import project_rows
 
 def get_context(context):
 	"""
@@ -349,20 +351,24 @@ def get_orgaos_list():
 		]
 
 @frappe.whitelist(allow_guest=True)
-def get_servidores_ajax(filtros=None):
+def get_servidores_ajax(filtros=None, fields=None):
 	"""Endpoint AJAX para buscar servidores com filtros."""
+	not_modified = response_formatter.not_modified(["servidores"], {"filtros": filtros, "fields": fields})
+	if not_modified:
+		return not_modified
+
 	if filtros:
 		filtros = json.loads(filtros)
 
 	# Aplicar filtros e retornar dados
 	servidores = get_servidores_data()
 
-	return {
+	return response_formatter.render({
 		"success": True,
-		"data": servidores,
+		"data": project_rows(servidores, fields),
 		"total": len(servidores),
 		"total_folha": sum([s["salario_liquido"] for s in servidores])
-	}
+	})
 
 @frappe.whitelist(allow_guest=True)
 def get_folha_pagamento(mes=None, ano=None):
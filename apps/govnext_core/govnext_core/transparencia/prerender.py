@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Pré-renderização estática do Portal da Transparência
+
+As rotas de `portal_routes` são renderizadas como visitante anônimo e
+gravadas em disco (index.html e, quando há dados associados, data.json),
+para que o nginx as sirva diretamente sem chegar ao Python. Um manifesto
+guarda, por rota, a versão dos dados (utils/data_version) e a versão do
+app usadas na renderização; cada execução do job re-renderiza apenas as
+rotas cujas dependências mudaram desde então.
+"""
+
+import json
+import os
+import tempfile
+
+import frappe
+import govnext_core
+from frappe import _
+from .page_cache import PAGE_CACHE_ROUTES
+from .routes import portal_routes
+from ..api.v2.utils.json_encoder import json_default
+from ..utils.data_version import get_data_version
+
+# Dados publicados junto de cada página: rota -> (função, argumentos)
+PRERENDER_JSON = {
+    "transparencia/receitas": ("govnext_core.transparencia.data.fetch_transparency_data", {"category": "receitas"}),
+    "transparencia/despesas": ("govnext_core.transparencia.data.fetch_transparency_data", {"category": "despesas"}),
+    "transparencia/contratos": ("govnext_core.transparencia.data.fetch_transparency_data", {"category": "contratos"}),
+    "transparencia/compras-licitacoes": ("govnext_core.transparencia.data.fetch_transparency_data", {"category": "licitacoes"}),
+    "transparencia/gestao-pessoas": ("govnext_core.transparencia.data.fetch_transparency_data", {"category": "servidores"}),
+    "transparencia/orcamento": ("govnext_core.transparencia.data.fetch_budget_summary", {}),
+    "transparencia/obras-publicas": ("govnext_core.transparencia.data.fetch_municipal_data", {"category": "obras"}),
+}
+
+# Categorias de dados de cada rota do portal ([] = conteúdo fixo, versionado
+# apenas pela versão do app). Toda rota de `portal_routes` precisa constar
+# aqui; as rotas com cache de página herdam as categorias de PAGE_CACHE_ROUTES.
+PRERENDER_DEPENDENCIES = {
+    **{route: config["categories"] for route, config in PAGE_CACHE_ROUTES.items()},
+    "transparencia/convenios-sem-repasse": ["convenios"],
+    "transparencia/ordem-cronologica": ["despesas"],
+    "transparencia/convenios-transferencias": ["convenios"],
+    "transparencia/concursos": ["servidores"],
+    "transparencia/diarias": ["despesas"],
+    "transparencia/compras-licitacoes": ["licitacoes", "contratos"],
+    "transparencia/adesao-registro-preco": ["licitacoes", "contratos"],
+    "transparencia/renuncias-receitas": ["receitas"],
+    "transparencia/emendas-parlamentares": ["orcamento", "despesas"],
+    "transparencia/multas-receitas-despesas": ["receitas", "despesas"],
+    "transparencia/julgamento-contas": [],
+    "transparencia/educacao": ["despesas"],
+    "transparencia/institucional": [],
+    "transparencia/carta-servicos": [],
+    "transparencia/relatorio-atividades": [],
+    "transparencia/divida-ativa": ["municipal", "receitas"],
+    "transparencia/bolsa-familia": ["receitas"],
+    "transparencia/transferencias-recebidas": ["receitas", "convenios"],
+    "transparencia/empresas-sancionadas": ["contratos", "licitacoes"],
+    "transparencia/fiscais-contrato": ["contratos"],
+    "transparencia/pesquisa-satisfacao": [],
+    "transparencia/metas-fiscais": ["orcamento"],
+    "transparencia/plano-metas": ["orcamento"],
+    "transparencia/sic": [],
+    "transparencia/ouvidoria": [],
+    "transparencia/saude": ["despesas"],
+    "transparencia/legislacao": [],
+    "transparencia/perguntas-frequentes": [],
+    "transparencia/radar-transparencia": [],
+    "transparencia/calendario-oficial": [],
+    "transparencia/orgao-oficial": [],
+    "transparencia/assistencia-social": ["despesas"],
+    "transparencia/covid-19": ["despesas", "contratos"],
+    "transparencia/ajuda": [],
+    "transparencia/dados-antes-2016": [],
+    "transparencia/api": [],
+}
+
+MANIFEST_FILE = "manifest.json"
+
+
+def get_output_path() -> str:
+    """Diretório servido pelo nginx (ver config/nginx/conf.d/govnext.conf)"""
+    return frappe.conf.get("portal_prerender_path") or frappe.get_site_path("public", "portal")
+
+
+def get_dependencies(route: str):
+    """Categorias de dados das quais a rota depende ([] = conteúdo fixo)"""
+    if route not in PRERENDER_DEPENDENCIES:
+        frappe.throw(_("Rota sem dependências declaradas em PRERENDER_DEPENDENCIES: {0}").format(route))
+    return PRERENDER_DEPENDENCIES[route]
+
+
+def validate_dependencies(routes):
+    """Toda rota declarada; rotas com data.json precisam de categorias de dados"""
+    missing = [route for route in routes if route not in PRERENDER_DEPENDENCIES]
+    unversioned = [route for route in PRERENDER_JSON if not PRERENDER_DEPENDENCIES.get(route)]
+    if missing or unversioned:
+        frappe.throw(_("Dependências de pré-renderização inválidas. Sem declaração: {0}; dados sem categorias: {1}").format(
+            ", ".join(missing) or "-", ", ".join(unversioned) or "-"
+        ))
+
+
+def get_route_version(route: str):
+    """Versão do app + versão dos dados da rota (None se indisponível)"""
+    dependencies = get_dependencies(route)
+    if not dependencies:
+        return govnext_core.__version__
+
+    version, _last_modified = get_data_version(dependencies)
+    return f"{govnext_core.__version__}|{version}" if version is not None else None
+
+
+def _write_atomic(path: str, content: str):
+    """Grava via arquivo temporário + rename: o nginx nunca lê arquivo parcial"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".prerender-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as temp_file:
+            temp_file.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def render_route(route: str, output_path: str) -> bool:
+    """Renderiza uma rota como visitante; False se a página não existe"""
+    from frappe.utils import set_request
+    from frappe.website.serve import get_response
+
+    frappe.set_user("Guest")
+    set_request(method="GET", path=f"/{route}")
+    frappe.local.form_dict = frappe._dict()
+
+    response = get_response()
+    route_path = os.path.join(output_path, route)
+
+    if response.status_code != 200:
+        _remove(os.path.join(route_path, "index.html"))
+        _remove(os.path.join(route_path, "data.json"))
+        return False
+
+    # Dados montados antes de gravar qualquer arquivo: uma falha aqui mantém
+    # a página e os dados anteriores, sempre consistentes entre si
+    payload = None
+    if route in PRERENDER_JSON:
+        method, kwargs = PRERENDER_JSON[route]
+        data = frappe.get_attr(method)(**kwargs)
+        if isinstance(data, tuple):
+            data, meta = data
+        else:
+            meta = {}
+        payload = json.dumps({"data": data, "meta": meta}, default=json_default, ensure_ascii=False)
+
+    # data.json antes do index.html: a página nova nunca aparece sem seus dados
+    if payload is not None:
+        _write_atomic(os.path.join(route_path, "data.json"), payload)
+    _write_atomic(os.path.join(route_path, "index.html"), response.get_data(as_text=True))
+
+    return True
+
+
+def prerender_portal(force: bool = False) -> dict:
+    """
+    Re-renderiza as rotas do portal cujas dependências mudaram
+
+    Args:
+        force: Renderiza todas as rotas, ignorando o manifesto
+
+    Returns:
+        {"rendered": [...], "skipped": n, "failed": [...]}
+    """
+    output_path = get_output_path()
+    manifest_path = os.path.join(output_path, MANIFEST_FILE)
+
+    manifest = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+    user = frappe.session.user
+    result = {"rendered": [], "skipped": 0, "failed": []}
+    routes = list(dict.fromkeys(route["from_route"].strip("/") for route in portal_routes))
+    validate_dependencies(routes)
+
+    try:
+        for route in routes:
+            version = get_route_version(route)
+            if version is not None and manifest.get(route) == version:
+                result["skipped"] += 1
+                continue
+
+            try:
+                if render_route(route, output_path):
+                    result["rendered"].append(route)
+                if version is not None:
+                    manifest[route] = version
+            except Exception as e:
+                manifest.pop(route, None)
+                result["failed"].append(route)
+                frappe.log_error(f"Erro ao pré-renderizar {route}: {str(e)}", "Portal Prerender")
+    finally:
+        frappe.set_user(user)
+        frappe.local.request = None
+
+    _write_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True))
+    return result
+
+
+def prerender_portal_job():
+    """Job agendado: mantém as páginas estáticas em dia com os dados"""
+    try:
+        prerender_portal()
+    except Exception as e:
+        frappe.log_error(f"Erro na pré-renderização do portal: {str(e)}", "Portal Prerender")
+
+
+@frappe.whitelist()
+def rebuild_static_portal():
+    """Enfileira a re-renderização completa do portal"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "govnext_core.transparencia.prerender.prerender_portal",
+        queue="long",
+        timeout=3600,
+        force=True
+    )
+    return {"success": True}
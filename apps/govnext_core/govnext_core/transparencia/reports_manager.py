@@ -7,13 +7,31 @@ Sistema completo para geração de relatórios governamentais
 import frappe
 from frappe import _
 from datetime import datetime, date, timedelta
+import calendar
+import hashlib
 import json
-import pandas as pd
-import io
-import base64
-from ..utils.cache_manager import cached_function
+import os
+import tempfile
+from decimal import Decimal
+from ..utils.cache_manager import cache_manager, cached_function
+from ..utils.export_engine import export_sections_response, write_xlsx, XLSX_CONTENT_TYPE
+from ..utils.report_pdf import render_pdf
+from ..api.v2.middleware.compression import response_compressor
 from ..utils.audit import audit_operation
 
+# Evento realtime enviado ao usuário quando o PDF fica pronto
+REPORT_READY_EVENT = "govnext_report_ready"
+
+# Tempo em que o resultado de um pedido de PDF é reaproveitado
+PDF_RESULT_TTL = 3600
+
+# Prefixo dos arquivos de PDF gerados (usado também na limpeza)
+PDF_FILE_PREFIX = "relatorio_"
+
+# Idade a partir da qual o PDF é removido; maior que PDF_RESULT_TTL para
+# que nenhuma situação "ready" ainda em cache aponte para arquivo apagado
+PDF_RETENTION = 2 * PDF_RESULT_TTL
+
 class TransparencyReportsManager:
     """Gerenciador de relatórios de transparência"""
     
@@ -25,29 +43,33 @@ class TransparencyReportsManager:
         """Gerar relatório baseado no tipo"""
         try:
             report_generators = {
-                "receitas_despesas": self.generate_revenue_expense_report,
-                "execucao_orcamentaria": self.generate_budget_execution_report,
-                "licitacoes_contratos": self.generate_tenders_contracts_report,
-                "obras_publicas": self.generate_public_works_report,
-                "prestacao_contas": self.generate_accountability_report,
-                "transparencia_geral": self.generate_general_transparency_report,
-                "compliance_lai": self.generate_lai_compliance_report,
-                "analise_financeira": self.generate_financial_analysis_report,
-                "fornecedores": self.generate_suppliers_report,
-                "funcionarios": self.generate_employees_report
+                "receitas_despesas": "generate_revenue_expense_report",
+                "execucao_orcamentaria": "generate_budget_execution_report",
+                "licitacoes_contratos": "generate_tenders_contracts_report",
+                "obras_publicas": "generate_public_works_report",
+                "prestacao_contas": "generate_accountability_report",
+                "transparencia_geral": "generate_general_transparency_report",
+                "compliance_lai": "generate_lai_compliance_report",
+                "analise_financeira": "generate_financial_analysis_report",
+                "fornecedores": "generate_suppliers_report",
+                "funcionarios": "generate_employees_report"
             }
             
-            if report_type not in report_generators:
+            # Geradores ainda não implementados contam como não suportados
+            generator = getattr(self, report_generators.get(report_type, ""), None)
+            if not generator:
                 frappe.throw(_("Tipo de relatório não suportado: {0}").format(report_type))
             
+            # PDF é renderizado em background (os dados vêm do cache do gerador)
+            if format_type.lower() == "pdf":
+                return self.export_to_pdf(report_type, parameters)
+            
             # Gerar dados do relatório
-            report_data = report_generators[report_type](parameters)
+            report_data = generator(parameters)
             
             # Formatear saída baseado no tipo solicitado
             if format_type.lower() == "excel":
                 return self.export_to_excel(report_data, report_type)
-            elif format_type.lower() == "pdf":
-                return self.export_to_pdf(report_data, report_type)
             elif format_type.lower() == "csv":
                 return self.export_to_csv(report_data, report_type)
             else:
@@ -77,23 +99,24 @@ class TransparencyReportsManager:
         # Receitas detalhadas
         receitas_query = """
             SELECT 
-                account as conta,
-                account_name as nome_conta,
-                SUM(debit) as valor,
-                MONTH(posting_date) as mes,
-                COUNT(*) as numero_lancamentos
-            FROM `tabGL Entry`
-            WHERE account LIKE '3.%'
-            AND YEAR(posting_date) = %s
-            AND MONTH(posting_date) BETWEEN %s AND %s
-            AND is_cancelled = 0
-            GROUP BY account, MONTH(posting_date)
-            ORDER BY account, mes
+                s.account as conta,
+                a.account_name as nome_conta,
+                SUM(s.debito) as valor,
+                s.mes,
+                SUM(s.lancamentos) as numero_lancamentos
+            FROM `tabSaldo Contabil Mensal` s
+            LEFT JOIN `tabAccount` a ON a.name = s.account
+            WHERE s.account LIKE '3.%%'
+            AND s.ano = %s
+            AND s.mes BETWEEN %s AND %s
+            GROUP BY s.account, a.account_name, s.mes
+            ORDER BY s.account, s.mes
         """
         
         receitas = frappe.db.sql(receitas_query, [year, month_start, month_end], as_dict=True)
         
-        # Despesas detalhadas
+        # Despesas detalhadas (por favorecido: consulta o razão, com
+        # intervalo de datas para usar o índice de posting_date)
         despesas_query = """
             SELECT 
                 account as conta,
@@ -103,15 +126,16 @@ class TransparencyReportsManager:
                 MONTH(posting_date) as mes,
                 COUNT(*) as numero_lancamentos
             FROM `tabGL Entry`
-            WHERE account LIKE '4.%'
-            AND YEAR(posting_date) = %s
-            AND MONTH(posting_date) BETWEEN %s AND %s
+            WHERE account LIKE '4.%%'
+            AND posting_date BETWEEN %s AND %s
             AND is_cancelled = 0
             GROUP BY account, party, MONTH(posting_date)
             ORDER BY account, mes, valor DESC
         """
         
-        despesas = frappe.db.sql(despesas_query, [year, month_start, month_end], as_dict=True)
+        period_start = date(int(year), int(month_start), 1)
+        period_end = date(int(year), int(month_end), calendar.monthrange(int(year), int(month_end))[1])
+        despesas = frappe.db.sql(despesas_query, [period_start, period_end], as_dict=True)
         
         # Resumo por categoria
         resumo_receitas = self.categorize_accounts(receitas, "receita")
@@ -480,24 +504,24 @@ class TransparencyReportsManager:
         """Comparativo mensal"""
         comparison = []
         
+        totals = {
+            row.mes: row
+            for row in frappe.db.sql("""
+                SELECT
+                    mes,
+                    SUM(CASE WHEN account LIKE '3.%%' THEN debito ELSE 0 END) as receitas,
+                    SUM(CASE WHEN account LIKE '4.%%' THEN credito ELSE 0 END) as despesas
+                FROM `tabSaldo Contabil Mensal`
+                WHERE ano = %s
+                AND mes BETWEEN %s AND %s
+                GROUP BY mes
+            """, [year, month_start, month_end], as_dict=True)
+        }
+        
         for month in range(month_start, month_end + 1):
-            receitas = frappe.db.sql("""
-                SELECT SUM(debit) as total
-                FROM `tabGL Entry`
-                WHERE account LIKE '3.%'
-                AND YEAR(posting_date) = %s
-                AND MONTH(posting_date) = %s
-                AND is_cancelled = 0
-            """, [year, month])[0][0] or 0
-            
-            despesas = frappe.db.sql("""
-                SELECT SUM(credit) as total
-                FROM `tabGL Entry`
-                WHERE account LIKE '4.%'
-                AND YEAR(posting_date) = %s
-                AND MONTH(posting_date) = %s
-                AND is_cancelled = 0
-            """, [year, month])[0][0] or 0
+            row = totals.get(month)
+            receitas = (row.receitas if row else 0) or 0
+            despesas = (row.despesas if row else 0) or 0
             
             comparison.append({
                 "mes": month,
@@ -584,31 +608,31 @@ class TransparencyReportsManager:
         return [{"fornecedor": f, **data} for f, data in top_fornecedores]
     
     def export_to_excel(self, data, report_type):
-        """Exportar relatório para Excel"""
+        """
+        Exportar relatório para Excel (download de arquivo, sem base64)
+        
+        Cada tabela do relatório (ver iter_report_tables) vira uma planilha,
+        gravada linha a linha em modo de memória constante num arquivo
+        temporário e enviada em blocos.
+        """
         try:
-            # Criar arquivo Excel em memória
-            output = io.BytesIO()
-            
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # Converter dados para DataFrames e escrever em abas
-                if report_type == "receitas_despesas":
-                    pd.DataFrame(data["receitas"]["detalhado"]).to_excel(writer, sheet_name='Receitas', index=False)
-                    pd.DataFrame(data["despesas"]["detalhado"]).to_excel(writer, sheet_name='Despesas', index=False)
-                elif report_type == "execucao_orcamentaria":
-                    pd.DataFrame(data["execucao_por_orgao"]).to_excel(writer, sheet_name='Execução por Órgão', index=False)
-                # Adicionar mais tipos conforme necessário
-            
-            output.seek(0)
+            output = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+            output.close()
             
-            # Codificar em base64 para retorno
-            excel_data = base64.b64encode(output.read()).decode()
+            try:
+                write_xlsx(iter_report_tables(data), output.name)
+                size = os.path.getsize(output.name)
+                file_obj = open(output.name, "rb")
+            finally:
+                # O arquivo aberto continua legível até ser fechado
+                os.unlink(output.name)
             
-            return {
-                "success": True,
-                "file_data": excel_data,
-                "file_name": f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                "content_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            }
+            return response_compressor.file_response(
+                iter_file(file_obj),
+                f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                XLSX_CONTENT_TYPE,
+                size=size
+            )
             
         except Exception as e:
             return {
@@ -617,17 +641,18 @@ class TransparencyReportsManager:
             }
     
     def export_to_csv(self, data, report_type):
-        """Exportar relatório para CSV"""
+        """
+        Exportar relatório para CSV (download em fluxo)
+        
+        As tabelas do relatório (ver iter_report_tables) saem em sequência
+        no mesmo arquivo, cada uma com título e cabeçalho, e são escritas e
+        enviadas em blocos à medida que as linhas são percorridas.
+        """
         try:
-            # Implementar exportação CSV
-            csv_data = "Implementar exportação CSV"
-            
-            return {
-                "success": True,
-                "file_data": csv_data,
-                "file_name": f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                "content_type": "text/csv"
-            }
+            return export_sections_response(
+                iter_report_tables(data),
+                f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
             
         except Exception as e:
             return {
@@ -635,17 +660,57 @@ class TransparencyReportsManager:
                 "error": f"Erro ao gerar CSV: {str(e)}"
             }
     
-    def export_to_pdf(self, data, report_type):
-        """Exportar relatório para PDF"""
+    def export_to_pdf(self, report_type, parameters):
+        """
+        Exportar relatório para PDF (em background)
+        
+        Enfileira a renderização na fila long e retorna a chave do pedido;
+        pedidos iguais reaproveitam o job em andamento ou o arquivo gerado
+        nos últimos PDF_RESULT_TTL segundos. Quando o arquivo fica pronto, o
+        usuário recebe o evento REPORT_READY_EVENT; clientes sem sessão
+        consultam get_report_pdf_status.
+        
+        Cada chave tem um único arquivo, regravado a cada nova geração e
+        removido por cleanup_report_pdfs_job. Pedidos anônimos geram
+        arquivos públicos (compartilhados); pedidos de usuários geram
+        arquivos privados, com chave própria do usuário.
+        """
         try:
-            # Implementar exportação PDF
-            pdf_data = "Implementar exportação PDF"
+            parameters = get_report_parameters(report_type, parameters)
+            is_public = frappe.session.user == "Guest"
+            key = hashlib.md5(
+                json.dumps(
+                    [report_type, parameters, None if is_public else frappe.session.user],
+                    sort_keys=True, default=str
+                ).encode()
+            ).hexdigest()
+            
+            status = get_pdf_status(key)
+            if status and status["status"] in ("queued", "ready"):
+                return {"success": True, "chave": key, **status}
+            
+            status = {"status": "queued"}
+            cache_manager.set("reports_data", "pdf", status, ttl=PDF_RESULT_TTL, params={"chave": key})
+            
+            frappe.enqueue(
+                "govnext_core.transparencia.reports_manager.render_report_pdf_job",
+                queue="long",
+                timeout=3600,
+                job_id=f"report_pdf_{key}",
+                deduplicate=True,
+                enqueue_after_commit=True,
+                report_type=report_type,
+                parameters=parameters,
+                key=key,
+                user=frappe.session.user,
+                is_public=is_public
+            )
             
             return {
                 "success": True,
-                "file_data": pdf_data,
-                "file_name": f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                "content_type": "application/pdf"
+                "chave": key,
+                "message": _("O PDF está sendo gerado"),
+                **status
             }
             
         except Exception as e:
@@ -654,9 +719,180 @@ class TransparencyReportsManager:
                 "error": f"Erro ao gerar PDF: {str(e)}"
             }
 
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, Decimal, date, datetime))
+
+
+def _is_table(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def _title(path):
+    return " - ".join(str(part).replace("_", " ").capitalize() for part in path) or _("Resumo")
+
+
+def _parent_rows(items, nested):
+    for item in items:
+        yield {key: value for key, value in item.items() if key not in nested}
+
+
+def _child_rows(items, key):
+    for item in items:
+        parent = {k: v for k, v in item.items() if _is_scalar(v)}
+        for child in item.get(key) or []:
+            yield {**parent, **child}
+
+
+def iter_report_tables(data, path=()):
+    """
+    Tabelas de um relatório, na ordem do dicionário de dados
+    
+    Vale para qualquer tipo de relatório:
+    - lista de dicts: uma tabela com uma linha por item; listas de dicts
+      dentro dos itens (ex.: etapas do cronograma) viram uma tabela à
+      parte, com os campos simples do item repetidos em cada linha;
+    - valores simples de um dict: tabela campo/valor;
+    - dict cujos valores são dicts simples (ex.: resumo por categoria):
+      uma tabela com a chave na coluna "item";
+    - demais valores compostos: percorridos recursivamente.
+    
+    Yields:
+        (título, linhas, colunas) com colunas None (campos da primeira linha)
+    """
+    if isinstance(data, list):
+        items = [item for item in data if isinstance(item, dict)]
+        if items:
+            nested = []
+            for item in items:
+                nested.extend(key for key, value in item.items() if _is_table(value) and key not in nested)
+            
+            yield _title(path), _parent_rows(items, set(nested)), None
+            for key in nested:
+                yield _title(path + (key,)), _child_rows(items, key), None
+        
+        scalars = [item for item in data if _is_scalar(item)]
+        if scalars:
+            yield _title(path), [{"valor": item} for item in scalars], None
+        return
+    
+    if not isinstance(data, dict):
+        return
+    
+    scalars = [{"campo": key, "valor": value} for key, value in data.items() if _is_scalar(value)]
+    if scalars:
+        yield _title(path), scalars, None
+    
+    for key, value in data.items():
+        if _is_scalar(value):
+            continue
+        
+        if isinstance(value, dict) and value and all(
+            isinstance(item, dict) and all(_is_scalar(v) for v in item.values())
+            for item in value.values()
+        ):
+            yield _title(path + (key,)), [{"item": item_key, **item} for item_key, item in value.items()], None
+        else:
+            yield from iter_report_tables(value, path + (key,))
+
+def iter_file(file_obj, chunk_size=64 * 1024):
+    """Lê um arquivo em blocos e o fecha ao final da transmissão"""
+    try:
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file_obj.close()
+
 # Instância global
 reports_manager = TransparencyReportsManager()
 
+def get_pdf_status(key):
+    """Situação de um pedido de PDF (None se desconhecido ou expirado)"""
+    return cache_manager.get("reports_data", "pdf", {"chave": key})
+
+def get_report_title(report_type, parameters):
+    """Título impresso nas páginas do relatório"""
+    names = {report["type"]: report["name"] for report in get_available_reports()["reports"]}
+    title = names.get(report_type) or _title((report_type,))
+    if parameters.get("year"):
+        title = f"{title} - {parameters['year']}"
+    return title
+
+def get_report_parameters(report_type, parameters):
+    """Apenas os parâmetros declarados para o tipo (ver get_available_reports)"""
+    declared = {report["type"]: report["parameters"] for report in get_available_reports()["reports"]}
+    allowed = declared.get(report_type, ["year"])
+    return {name: value for name, value in (parameters or {}).items() if name in allowed}
+
+def get_report_pdf_path(file_name, is_public):
+    """Caminho no site e URL do PDF de um pedido"""
+    folder = "public" if is_public else "private"
+    url = f"/files/{file_name}" if is_public else f"/private/files/{file_name}"
+    return frappe.get_site_path(folder, "files", file_name), url
+
+def render_report_pdf_job(report_type, parameters, key, user=None, is_public=True):
+    """Job: renderiza o PDF do relatório (um arquivo por chave) e avisa o usuário"""
+    try:
+        result = reports_manager.generate_report(report_type, parameters)
+        if not result.get("success"):
+            raise frappe.ValidationError(result.get("error"))
+        
+        data = result["data"]
+        file_name = f"{PDF_FILE_PREFIX}{report_type}_{key}.pdf"
+        path, file_url = get_report_pdf_path(file_name, is_public)
+        pages = render_pdf(
+            lambda: iter_report_tables(data),
+            get_report_title(report_type, parameters),
+            path
+        )
+        
+        # Mesmo arquivo regravado: o registro existente só tem a data atualizada
+        file_doc_name = frappe.db.get_value("File", {"file_url": file_url})
+        if file_doc_name:
+            frappe.db.set_value("File", file_doc_name, "file_size", os.path.getsize(path))
+        else:
+            frappe.get_doc({
+                "doctype": "File",
+                "file_name": file_name,
+                "file_url": file_url,
+                "is_private": 0 if is_public else 1
+            }).insert(ignore_permissions=True)
+        frappe.db.commit()
+        
+        status = {"status": "ready", "file_url": file_url, "paginas": pages}
+        
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), f"Report PDF Error: {report_type}")
+        status = {"status": "failed", "error": str(e)}
+    
+    cache_manager.set("reports_data", "pdf", status, ttl=PDF_RESULT_TTL, params={"chave": key})
+    
+    if user and user != "Guest":
+        frappe.publish_realtime(REPORT_READY_EVENT, {"chave": key, **status}, user=user)
+
+def cleanup_report_pdfs_job():
+    """Job agendado: remove PDFs de relatório (arquivo e registro File) já expirados"""
+    try:
+        expired = frappe.get_all(
+            "File",
+            filters={
+                "file_name": ["like", f"{PDF_FILE_PREFIX}%.pdf"],
+                "modified": ["<", datetime.now() - timedelta(seconds=PDF_RETENTION)]
+            },
+            pluck="name"
+        )
+        
+        for name in expired:
+            # on_trash do File apaga também o arquivo em disco
+            frappe.delete_doc("File", name, ignore_permissions=True, force=True)
+        
+        frappe.db.commit()
+        
+    except Exception as e:
+        frappe.log_error(f"Erro na limpeza de PDFs de relatório: {str(e)}", "Report PDF Cleanup")
+
 # APIs públicas
 @frappe.whitelist(allow_guest=True)
 @audit_operation("GENERATE_TRANSPARENCY_REPORT")
@@ -676,6 +912,15 @@ def generate_transparency_report_api(report_type, parameters=None, format_type="
             "error": str(e)
         }
 
+@frappe.whitelist(allow_guest=True)
+def get_report_pdf_status(chave):
+    """API para consultar um pedido de PDF (ver TransparencyReportsManager.export_to_pdf)"""
+    status = get_pdf_status(chave)
+    if not status:
+        return {"success": False, "error": _("Pedido de PDF não encontrado ou expirado")}
+    
+    return {"success": True, "chave": chave, **status}
+
 @frappe.whitelist(allow_guest=True)
 def get_available_reports():
     """API para listar relatórios disponíveis"""
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de transparência materializado (Indice Transparencia Mensal)
+
+Cada linha guarda as publicações de um mês (lançamentos de receita e de
+despesa, licitações, contratos e obras), se o orçamento do exercício está
+publicado e o índice acumulado no exercício até aquele mês, com a
+pontuação de cada critério. Dashboards, API e ranking leem o índice com
+uma consulta de até 12 linhas.
+
+Os eventos dos documentos de TRANSPARENCY_SOURCES marcam como pendentes os
+meses afetados (o da data atual do documento e o da data anterior, se
+mudou) e enfileiram, após o commit, um job com deduplicação que recalcula
+esses meses e o acumulado do exercício. Uma rajada de lançamentos resulta
+em um único recálculo. A reconstrução diária do exercício corrente corrige
+eventos perdidos e cargas feitas fora do ORM.
+"""
+
+import frappe
+import json
+from frappe import _
+from frappe.utils import add_days, cint, flt, getdate, now
+from ..utils.cache import cache_system
+
+# Peso de cada critério no índice
+TRANSPARENCY_WEIGHTS = {
+    "receitas_publicadas": 0.2,
+    "despesas_publicadas": 0.2,
+    "licitacoes_publicadas": 0.15,
+    "contratos_publicados": 0.15,
+    "orcamento_publicado": 0.15,
+    "obras_publicadas": 0.15
+}
+
+# Metas anuais de publicação
+TRANSPARENCY_TARGETS = {
+    "licitacoes": 10,
+    "contratos": 20,
+    "obras": 5
+}
+
+# Campo de data que define o mês de publicação de cada doctype
+# (None: documento do exercício inteiro)
+TRANSPARENCY_SOURCES = {
+    "GL Entry": "posting_date",
+    "Public Tender": "opening_date",
+    "Purchase Order": "transaction_date",
+    "Obra Publica": "data_criacao",
+    "Budget": None,
+}
+
+MONTH_COMPONENTS_QUERY = """
+    SELECT
+        %(mes)s as mes,
+        (SELECT IFNULL(SUM(lancamentos), 0) FROM `tabSaldo Contabil Mensal`
+            WHERE ano = %(ano)s AND mes = %(mes)s AND account LIKE '3.%%') as lancamentos_receitas,
+        (SELECT IFNULL(SUM(lancamentos), 0) FROM `tabSaldo Contabil Mensal`
+            WHERE ano = %(ano)s AND mes = %(mes)s AND account LIKE '4.%%') as lancamentos_despesas,
+        (SELECT COUNT(*) FROM `tabPublic Tender`
+            WHERE opening_date BETWEEN %(inicio)s AND %(fim)s) as licitacoes,
+        (SELECT COUNT(*) FROM `tabPurchase Order`
+            WHERE transaction_date BETWEEN %(inicio)s AND %(fim)s) as contratos,
+        (SELECT COUNT(*) FROM `tabObra Publica`
+            WHERE data_criacao BETWEEN %(inicio)s AND %(fim)s) as obras
+"""
+
+UPSERT_QUERY = """
+    INSERT INTO `tabIndice Transparencia Mensal`
+        (name, creation, modified, modified_by, owner, docstatus,
+         ano, mes, indice, orcamento_publicado, atualizado_em,
+         lancamentos_receitas, lancamentos_despesas, licitacoes, contratos, obras, criterios)
+    VALUES
+        (%(name)s, %(now)s, %(now)s, %(user)s, %(user)s, 0,
+         %(ano)s, %(mes)s, %(indice)s, %(orcamento_publicado)s, %(now)s,
+         %(lancamentos_receitas)s, %(lancamentos_despesas)s, %(licitacoes)s, %(contratos)s, %(obras)s,
+         %(criterios)s)
+    ON DUPLICATE KEY UPDATE
+        indice = VALUES(indice),
+        orcamento_publicado = VALUES(orcamento_publicado),
+        atualizado_em = VALUES(atualizado_em),
+        lancamentos_receitas = VALUES(lancamentos_receitas),
+        lancamentos_despesas = VALUES(lancamentos_despesas),
+        licitacoes = VALUES(licitacoes),
+        contratos = VALUES(contratos),
+        obras = VALUES(obras),
+        criterios = VALUES(criterios),
+        modified = VALUES(modified)
+"""
+
+COMPONENT_FIELDS = ["lancamentos_receitas", "lancamentos_despesas", "licitacoes", "contratos", "obras"]
+
+
+def get_transparency_classification(indice):
+    """Classificar nível de transparência"""
+    if indice >= 90:
+        return {"nivel": "Excelente", "cor": "success"}
+    elif indice >= 75:
+        return {"nivel": "Bom", "cor": "primary"}
+    elif indice >= 60:
+        return {"nivel": "Regular", "cor": "warning"}
+    else:
+        return {"nivel": "Insuficiente", "cor": "danger"}
+
+
+def score_components(months, orcamento_publicado):
+    """
+    Pontuação dos critérios (0 a 100) e índice a partir das publicações
+    dos meses do exercício considerados
+
+    Args:
+        months: Lista de dicts com os campos de COMPONENT_FIELDS
+    """
+    criterios = {
+        "receitas_publicadas": min(sum(1 for m in months if m["lancamentos_receitas"] > 0) / 12 * 100, 100),
+        "despesas_publicadas": min(sum(1 for m in months if m["lancamentos_despesas"] > 0) / 12 * 100, 100),
+        "licitacoes_publicadas": min(
+            sum(m["licitacoes"] for m in months) / TRANSPARENCY_TARGETS["licitacoes"] * 100, 100),
+        "contratos_publicados": min(
+            sum(m["contratos"] for m in months) / TRANSPARENCY_TARGETS["contratos"] * 100, 100),
+        "orcamento_publicado": 100 if orcamento_publicado else 0,
+        "obras_publicadas": min(
+            sum(m["obras"] for m in months) / TRANSPARENCY_TARGETS["obras"] * 100, 100)
+    }
+
+    indice = sum(criterios[k] * TRANSPARENCY_WEIGHTS[k] for k in criterios)
+    return round(indice, 1), criterios
+
+
+def _month_components(year, month):
+    inicio = getdate(f"{year}-{month:02d}-01")
+    fim = getdate(f"{year + month // 12}-{month % 12 + 1:02d}-01")
+    row = frappe.db.sql(MONTH_COMPONENTS_QUERY, {
+        "ano": year,
+        "mes": month,
+        "inicio": inicio,
+        "fim": add_days(fim, -1)
+    }, as_dict=True)[0]
+    return {field: cint(row[field]) for field in COMPONENT_FIELDS}
+
+
+def compute_transparency_rows(year, months=None):
+    """
+    Linhas do exercício com os componentes dos meses informados
+    recalculados (padrão: todos) e o índice acumulado de cada mês
+
+    Returns:
+        Lista de 12 dicts (mes, indice, criterios, orcamento_publicado e
+        os campos de COMPONENT_FIELDS), sem gravar nada
+    """
+    year = int(year)
+    months = sorted(set(int(m) for m in months)) if months is not None else list(range(1, 13))
+
+    stored = {}
+    if len(months) < 12:
+        stored = {
+            row.mes: {field: cint(row[field]) for field in COMPONENT_FIELDS}
+            for row in frappe.db.sql("""
+                SELECT mes, {fields}
+                FROM `tabIndice Transparencia Mensal`
+                WHERE ano = %s
+            """.format(fields=", ".join(COMPONENT_FIELDS)), [year], as_dict=True)
+        }
+    for month in months:
+        stored[month] = _month_components(year, month)
+
+    orcamento_publicado = 1 if frappe.db.exists("Budget", {"fiscal_year": year}) else 0
+
+    rows = []
+    for month in range(1, 13):
+        components = stored.setdefault(month, {field: 0 for field in COMPONENT_FIELDS})
+        indice, criterios = score_components([stored[m] for m in range(1, month + 1)], orcamento_publicado)
+        rows.append(frappe._dict(
+            components,
+            mes=month,
+            indice=indice,
+            criterios=criterios,
+            orcamento_publicado=orcamento_publicado
+        ))
+
+    return rows
+
+
+def recompute_transparency_index(year, months=None):
+    """
+    Recalcula os componentes dos meses informados (padrão: todos) e grava
+    o índice acumulado de todos os meses do exercício
+    """
+    year = int(year)
+    timestamp, user = now(), frappe.session.user
+
+    for row in compute_transparency_rows(year, months):
+        frappe.db.sql(UPSERT_QUERY, dict(
+            row,
+            name=f"{year}-{row.mes:02d}",
+            now=timestamp,
+            user=user,
+            ano=year,
+            criterios=json.dumps(row.criterios)
+        ))
+
+
+def rebuild_transparency_index(year=None):
+    """Reconstrói o exercício informado (padrão: o corrente)"""
+    recompute_transparency_index(year or getdate().year)
+    frappe.db.commit()
+
+
+def rebuild_transparency_index_job():
+    """Job agendado: reconstrói o índice do exercício corrente"""
+    try:
+        rebuild_transparency_index()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Erro ao reconstruir índice de transparência: {str(e)}", "Transparency Index")
+
+
+def _get_client():
+    return cache_system.redis_client or frappe.cache()
+
+
+def _get_key():
+    return f"{cache_system.cache_prefix}transparency_index:pendentes"
+
+
+def _affected_periods(doc, date_field):
+    """Períodos 'AAAA-MM' (ou 'AAAA' para documentos anuais) afetados pelo documento"""
+    if date_field is None:
+        fiscal_year = str(doc.get("fiscal_year") or "")[:4]
+        return {fiscal_year} if fiscal_year.isdigit() else set()
+
+    periods = set()
+    previous = doc.get_doc_before_save()
+    for source in (doc, previous):
+        value = source.get(date_field) if source else None
+        if value:
+            periods.add(getdate(value).strftime("%Y-%m"))
+    return periods
+
+
+def mark_transparency_index_on_change(doc, method):
+    """Hook de documento: marca os meses afetados e agenda o recálculo"""
+    date_field = TRANSPARENCY_SOURCES.get(doc.doctype, False)
+    if date_field is False:
+        return
+
+    try:
+        periods = _affected_periods(doc, date_field)
+        if not periods:
+            return
+
+        _get_client().sadd(_get_key(), *periods)
+        frappe.enqueue(
+            "govnext_core.transparencia.transparency_index.process_pending_months",
+            queue="short",
+            job_id="transparency_index",
+            deduplicate=True,
+            enqueue_after_commit=True
+        )
+
+    except Exception as e:
+        frappe.log_error(f"Erro ao agendar recálculo do índice de transparência: {str(e)}", "Transparency Index")
+
+
+def process_pending_months():
+    """Job: recalcula os meses marcados pelos eventos de publicação"""
+    client = _get_client()
+
+    try:
+        while True:
+            pipe = client.pipeline(transaction=True)
+            pipe.smembers(_get_key())
+            pipe.delete(_get_key())
+            pending, _deleted = pipe.execute()
+            if not pending:
+                return
+
+            years = {}
+            for period in pending:
+                period = period.decode() if isinstance(period, bytes) else period
+                year, _sep, month = period.partition("-")
+                years.setdefault(int(year), set())
+                if month:
+                    years[int(year)].add(int(month))
+
+            for year, months in years.items():
+                recompute_transparency_index(year, months)
+            frappe.db.commit()
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Erro ao recalcular índice de transparência: {str(e)}", "Transparency Index")
+
+
+def validate_year(year):
+    """
+    Exercício consultável: do primeiro ano com saldos contábeis até o
+    corrente (ValidationError fora desse intervalo)
+    """
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        frappe.throw(_("Exercício inválido: {0}").format(year), frappe.ValidationError)
+
+    current_year = getdate().year
+    first_year = frappe.db.sql("SELECT MIN(ano) FROM `tabSaldo Contabil Mensal`")[0][0] or current_year
+
+    if not first_year <= year <= current_year:
+        frappe.throw(
+            _("Exercício fora do intervalo disponível ({0} a {1})").format(first_year, current_year),
+            frappe.ValidationError
+        )
+
+    return year
+
+
+def get_transparency_index(year, month=None):
+    """
+    Índice de transparência do exercício com a pontuação por critério
+
+    Args:
+        month: Índice acumulado até o mês (padrão: último mês)
+
+    Returns:
+        Dict com indice_geral, criterios, classificacao, componentes do
+        período e a evolução mensal do índice
+    """
+    year = validate_year(year)
+    rows = frappe.db.sql("""
+        SELECT mes, indice, criterios, atualizado_em, {fields}
+        FROM `tabIndice Transparencia Mensal`
+        WHERE ano = %s
+        ORDER BY mes
+    """.format(fields=", ".join(COMPONENT_FIELDS)), [year], as_dict=True)
+
+    if not rows:
+        # Exercício ainda não materializado: calcula sem gravar (leitura
+        # de visitante) e deixa a gravação para o job
+        frappe.enqueue(
+            "govnext_core.transparencia.transparency_index.rebuild_transparency_index",
+            queue="long",
+            job_id=f"transparency_index_{year}",
+            deduplicate=True,
+            year=year
+        )
+        rows = compute_transparency_rows(year)
+        for row in rows:
+            row.atualizado_em = None
+
+    month = min(max(cint(month), 1), 12) if month else 12
+    current = rows[month - 1]
+    criterios = json.loads(current.criterios) if isinstance(current.criterios, str) else current.criterios
+
+    return {
+        "ano": year,
+        "mes": month,
+        "indice_geral": flt(current.indice, 1),
+        "criterios": criterios,
+        "classificacao": get_transparency_classification(flt(current.indice)),
+        "componentes": {
+            field: sum(cint(row[field]) for row in rows[:month]) for field in COMPONENT_FIELDS
+        },
+        "evolucao_mensal": [{"mes": row.mes, "indice": flt(row.indice, 1)} for row in rows],
+        "atualizado_em": current.atualizado_em
+    }
+
+
+def get_transparency_history(years=5):
+    """Índice de cada exercício (acumulado até dezembro) nos últimos `years` anos"""
+    current_year = getdate().year
+    rows = frappe.db.sql("""
+        SELECT ano, indice
+        FROM `tabIndice Transparencia Mensal`
+        WHERE mes = 12 AND ano BETWEEN %s AND %s
+        ORDER BY ano
+    """, [current_year - max(cint(years), 1) + 1, current_year], as_dict=True)
+
+    return [{"ano": row.ano, "indice": flt(row.indice, 1)} for row in rows]
+
+
+@frappe.whitelist()
+def rebuild_transparency_index_api(year=None):
+    """API para reconstruir o índice de um exercício (em segundo plano)"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "govnext_core.transparencia.transparency_index.rebuild_transparency_index",
+        queue="long",
+        year=int(year) if year else None
+    )
+    return {"success": True, "message": _("Reconstrução do índice de transparência enfileirada")}
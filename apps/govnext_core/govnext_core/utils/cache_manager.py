@@ -271,8 +271,15 @@ class GovCacheManager:
 # Instância global do gerenciador de cache
 cache_manager = GovCacheManager()
 
-def cached_function(category, ttl=None, key_func=None):
-    """Decorator para cache automático de funções"""
+def cached_function(category, ttl=None, key_func=None, data_categories=None):
+    """
+    Decorator para cache automático de funções
+    
+    Com `data_categories`, a versão dessas categorias de dados
+    (utils.data_version) entra na chave: uma alteração nos dados leva a
+    uma nova chave, e o resultado antigo apenas expira. Sem versão
+    disponível, a função é executada sem cache.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -282,6 +289,14 @@ def cached_function(category, ttl=None, key_func=None):
             else:
                 cache_key = f"{func.__name__}_{hash(str(args) + str(kwargs))}"
             
+            if data_categories:
+                from .data_version import get_data_version
+                
+                version, _last_modified = get_data_version(data_categories)
+                if version is None:
+                    return func(*args, **kwargs)
+                cache_key = f"{cache_key}_{hashlib.md5(version.encode()).hexdigest()[:8]}"
+            
             # Verificar se categoria foi invalidada
             if cache_manager.is_category_invalid(category):
                 cache_manager.delete(category, cache_key)
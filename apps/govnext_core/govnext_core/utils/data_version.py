@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Carimbos de versão dos dados de transparência
+
+Cada categoria de dados publicada (receitas, despesas, contratos...) tem um
+contador e a data da última alteração, mantidos no Redis e atualizados pelos
+eventos de documento após o commit da transação. ETags e cabeçalhos
+Last-Modified são derivados desses carimbos, sem precisar gerar ou hashear
+o corpo da resposta.
+
+Os contadores recomeçam do zero se o Redis for esvaziado; a época (valor
+aleatório gravado junto com os contadores) entra no carimbo para que as
+versões novas não repitam ETags já emitidas.
+"""
+
+import frappe
+import hashlib
+import secrets
+import time
+from datetime import datetime
+from .cache import cache_system
+
+# Categorias de dados afetadas por cada doctype
+DATA_VERSION_DOCTYPES = {
+    "GL Entry": ["receitas", "despesas", "orcamento"],
+    "Empenho": ["despesas", "orcamento"],
+    "Liquidacao": ["despesas", "orcamento"],
+    "Pagamento": ["despesas", "orcamento"],
+    "Purchase Order": ["contratos"],
+    "Public Tender": ["licitacoes"],
+    "Budget": ["orcamento"],
+    "Public Budget": ["orcamento"],
+    "Orcamento": ["orcamento"],
+    "Lei Orcamentaria Anual": ["orcamento"],
+    "Dotacao Orcamentaria": ["orcamento"],
+    "Employee": ["servidores"],
+    "Servidor Publico": ["servidores"],
+    "Transparencia Servidor": ["servidores"],
+    "Transparencia Remuneracao": ["servidores"],
+    "Transparencia Orgao": ["servidores"],
+    "IPTU Payment": ["municipal"],
+    "IPTU Lancamento": ["municipal"],
+    "ISS Declaracao": ["municipal"],
+    "Alvara Municipal": ["municipal"],
+    "Obra Publica": ["municipal", "obras"],
+    "Transparencia Obra": ["obras"],
+    "Convenio": ["convenios"],
+}
+
+
+def _get_client():
+    return cache_system.redis_client or frappe.cache()
+
+
+def _get_key():
+    return f"{cache_system.cache_prefix}data_version"
+
+
+def _new_epoch():
+    return secrets.token_hex(4)
+
+
+def bump_data_version(*categories):
+    """Avança a versão das categorias informadas"""
+    if not categories:
+        return
+
+    try:
+        now = int(time.time())
+        pipe = _get_client().pipeline(transaction=True)
+        pipe.hsetnx(_get_key(), "epoch", _new_epoch())
+        for category in categories:
+            pipe.hincrby(_get_key(), f"{category}:v", 1)
+            pipe.hset(_get_key(), f"{category}:t", now)
+        pipe.execute()
+
+    except Exception as e:
+        frappe.log_error(f"Erro ao atualizar versão de dados: {str(e)}", "Data Version")
+
+
+def get_data_version(categories):
+    """
+    Obtém o carimbo combinado de um conjunto de categorias
+
+    Returns:
+        Tupla (versão, última_alteração) onde versão é uma string estável
+        e última_alteração é um datetime UTC (ou None se desconhecida)
+    """
+    categories = sorted(set(categories))
+
+    try:
+        client = _get_client()
+        fields = ["epoch"]
+        for category in categories:
+            fields.extend([f"{category}:v", f"{category}:t"])
+
+        epoch, *values = client.hmget(_get_key(), fields)
+        if not epoch:
+            client.hsetnx(_get_key(), "epoch", _new_epoch())
+            epoch = client.hget(_get_key(), "epoch")
+
+    except Exception:
+        return None, None
+
+    if isinstance(epoch, bytes):
+        epoch = epoch.decode()
+
+    parts = [f"epoch={epoch}"]
+    last_modified = 0
+    for i, category in enumerate(categories):
+        version = _as_int(values[i * 2])
+        modified = _as_int(values[i * 2 + 1])
+        parts.append(f"{category}={version}")
+        last_modified = max(last_modified, modified)
+
+    return ",".join(parts), (datetime.utcfromtimestamp(last_modified) if last_modified else None)
+
+
+def make_etag(categories, params=None):
+    """ETag forte a partir dos carimbos das categorias e dos parâmetros da consulta"""
+    version, last_modified = get_data_version(categories)
+    if version is None:
+        return None, None
+
+    key = f"{version}|{frappe.local.lang if hasattr(frappe.local, 'lang') else ''}|{sorted((params or {}).items())}"
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"', last_modified
+
+
+def bump_data_version_on_change(doc, method):
+    """
+    Hook de documento: avança a versão das categorias afetadas após o commit
+
+    Antes do commit, um leitor concorrente poderia calcular os dados antigos
+    e guardá-los sob a versão nova.
+    """
+    categories = DATA_VERSION_DOCTYPES.get(doc.doctype)
+    if not categories:
+        return
+
+    hooks = getattr(frappe.db, "after_commit", None)
+    if hooks is not None and hasattr(hooks, "add"):
+        hooks.add(lambda: bump_data_version(*categories))
+    else:
+        bump_data_version(*categories)
+
+
+def _as_int(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
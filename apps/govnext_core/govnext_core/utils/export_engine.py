@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Exportação em fluxo dos dados do Portal da Transparência
+
+Linhas lidas de um cursor sem buffer (ou de qualquer iterável) passam por
+um escritor de formato (CSV, XML, JSON, JSON Lines, GeoJSON, KML) e saem
+em blocos numa resposta HTTP chunked, comprimida quando o cliente aceita.
+Nenhuma etapa materializa o arquivo: a memória é constante para qualquer
+volume de dados.
+
+O corpo da resposta é consumido pelo servidor WSGI depois que o Frappe
+encerra o contexto da requisição; por isso consultas ao banco abrem o
+próprio contexto de site durante o fluxo (ver query_rows).
+"""
+
+import csv
+import json
+import re
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+import frappe
+from werkzeug.wrappers import Response
+from ..api.v2.middleware.compression import response_compressor
+from ..api.v2.utils.json_encoder import json_default
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Tamanho aproximado de cada bloco enviado ao cliente
+CHUNK_SIZE = 64 * 1024
+
+# Coluna: nome do campo ou (rótulo, campo/função sobre a linha)
+Column = Union[str, Tuple[str, Union[str, Callable[[Dict], Any]]]]
+
+_XML_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Limites do formato XLSX
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_STRING = 32767
+_SHEET_NAME_RE = re.compile(r"[\[\]:*?/\\]")
+
+
+def query_rows(query: str, values=None) -> Iterator[Dict]:
+    """
+    Linhas de uma consulta lidas sob demanda de um cursor sem buffer
+
+    Se o contexto da requisição já foi encerrado quando o fluxo começa,
+    abre um contexto próprio no mesmo site e com o mesmo usuário.
+    """
+    site = frappe.local.site
+    sites_path = frappe.local.sites_path
+    user = frappe.session.user
+
+    def generate():
+        owns_context = not getattr(frappe.local, "db", None)
+        if owns_context:
+            frappe.init(site=site, sites_path=sites_path)
+            frappe.connect()
+            frappe.set_user(user)
+
+        try:
+            if hasattr(frappe.db, "unbuffered_cursor"):
+                with frappe.db.unbuffered_cursor():
+                    yield from frappe.db.sql(query, values, as_dict=True, as_iterator=True)
+            else:
+                yield from frappe.db.sql(query, values, as_dict=True, as_iterator=True)
+        finally:
+            if owns_context:
+                frappe.destroy()
+
+    return generate()
+
+
+def _resolve_columns(columns: Optional[List[Column]], first_row: Dict) -> List[Tuple[str, Callable]]:
+    resolved = []
+    for column in columns or list(first_row.keys()):
+        label, getter = (column, column) if isinstance(column, str) else column
+        if isinstance(getter, str):
+            getter = (lambda field: lambda row: row.get(field))(getter)
+        resolved.append((label, getter))
+    return resolved
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _xml_name(name: str) -> str:
+    name = _XML_NAME_RE.sub("_", str(name))
+    return name if name and not name[0].isdigit() else f"_{name}"
+
+
+def _buffered(parts: Iterable[str]) -> Iterator[bytes]:
+    """Agrupa pedaços pequenos em blocos UTF-8 de ~CHUNK_SIZE"""
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+class _LineBuffer:
+    """Destino mínimo para csv.writer: guarda a última linha escrita"""
+
+    def __init__(self):
+        self.value = ""
+
+    def write(self, text):
+        self.value = text
+
+
+def write_csv(rows: Iterable[Dict], columns: Optional[List[Column]] = None, **options) -> Iterator[str]:
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+
+    resolved = _resolve_columns(columns, first)
+    line = _LineBuffer()
+    writer = csv.writer(line)
+
+    writer.writerow([label for label, _getter in resolved])
+    yield line.value
+
+    for row in _chain(first, rows):
+        writer.writerow([getter(row) for _label, getter in resolved])
+        yield line.value
+
+
+def write_csv_sections(sections: Iterable[Tuple[str, Iterable[Dict], Optional[List[Column]]]],
+                       **options) -> Iterator[str]:
+    """
+    Várias tabelas num único CSV: para cada seção com linhas, uma linha com
+    o título, o cabeçalho, os dados e uma linha em branco
+    """
+    line = _LineBuffer()
+    writer = csv.writer(line)
+
+    for title, rows, columns in sections:
+        lines = write_csv(rows, columns, **options)
+        header = next(lines, None)
+        if header is None:
+            continue
+
+        writer.writerow([title])
+        yield line.value
+        yield header
+        yield from lines
+        yield "\r\n"
+
+
+def write_xml(rows: Iterable[Dict], columns: Optional[List[Column]] = None,
+              root: str = "dados", item: str = "item", **options) -> Iterator[str]:
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<{_xml_name(root)}>\n'
+
+    resolved = None
+    for row in rows:
+        resolved = resolved or [(_xml_name(label), getter) for label, getter in _resolve_columns(columns, row)]
+        fields = "".join(
+            f"    <{name}>{escape(_text(getter(row)))}</{name}>\n" for name, getter in resolved
+        )
+        yield f"  <{_xml_name(item)}>\n{fields}  </{_xml_name(item)}>\n"
+
+    yield f"</{_xml_name(root)}>\n"
+
+
+def _row_dict(row: Dict, resolved) -> Dict:
+    return {label: getter(row) for label, getter in resolved}
+
+
+def write_jsonl(rows: Iterable[Dict], columns: Optional[List[Column]] = None, **options) -> Iterator[str]:
+    resolved = None
+    for row in rows:
+        resolved = resolved or _resolve_columns(columns, row)
+        yield json.dumps(_row_dict(row, resolved), default=json_default, ensure_ascii=False) + "\n"
+
+
+def write_json(rows: Iterable[Dict], columns: Optional[List[Column]] = None, **options) -> Iterator[str]:
+    yield "["
+    resolved = None
+    for index, row in enumerate(rows):
+        resolved = resolved or _resolve_columns(columns, row)
+        yield ("," if index else "") + json.dumps(_row_dict(row, resolved), default=json_default, ensure_ascii=False)
+    yield "]\n"
+
+
+def write_geojson(rows: Iterable[Dict], columns: Optional[List[Column]] = None,
+                  latitude: str = "latitude", longitude: str = "longitude", **options) -> Iterator[str]:
+    yield '{"type":"FeatureCollection","features":['
+    resolved = None
+    first = True
+    for row in rows:
+        if row.get(latitude) in (None, "") or row.get(longitude) in (None, ""):
+            continue
+
+        resolved = resolved or _resolve_columns(columns, row)
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(row[longitude]), float(row[latitude])]},
+            "properties": _row_dict(row, resolved)
+        }
+        yield ("" if first else ",") + json.dumps(feature, default=json_default, ensure_ascii=False)
+        first = False
+    yield "]}\n"
+
+
+def write_kml(rows: Iterable[Dict], name: str = "Dados", description: str = "",
+              styles: Optional[Dict[str, Tuple[str, str]]] = None,
+              placemark_name: Optional[Callable[[Dict], str]] = None,
+              placemark_description: Optional[Callable[[Dict], str]] = None,
+              placemark_style: Optional[Callable[[Dict], str]] = None,
+              latitude: str = "latitude", longitude: str = "longitude", **options) -> Iterator[str]:
+    """
+    KML com um Placemark por linha georreferenciada
+
+    `styles` mapeia id -> (cor aabbggrr, URL do ícone). A descrição do
+    Placemark é HTML em CDATA; o texto dos campos deve vir escapado.
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+        "  <Document>\n"
+        f"    <name>{escape(name)}</name>\n"
+        f"    <description>{escape(description)}</description>\n"
+    )
+
+    for style_id, (color, icon) in (styles or {}).items():
+        yield (
+            f"    <Style id={quoteattr(style_id)}>\n"
+            f"      <IconStyle><color>{escape(color)}</color><scale>1.0</scale>"
+            f"<Icon><href>{escape(icon)}</href></Icon></IconStyle>\n"
+            "    </Style>\n"
+        )
+
+    for row in rows:
+        if row.get(latitude) in (None, "") or row.get(longitude) in (None, ""):
+            continue
+
+        html = placemark_description(row) if placemark_description else ""
+        style = f"      <styleUrl>#{escape(placemark_style(row))}</styleUrl>\n" if placemark_style else ""
+        yield (
+            "    <Placemark>\n"
+            f"      <name>{escape(_text(placemark_name(row) if placemark_name else ''))}</name>\n"
+            f"      <description><![CDATA[{html.replace(']]>', ']]]]><![CDATA[>')}]]></description>\n"
+            f"{style}"
+            f"      <Point><coordinates>{float(row[longitude])},{float(row[latitude])},0</coordinates></Point>\n"
+            "    </Placemark>\n"
+        )
+
+    yield "  </Document>\n</kml>\n"
+
+
+# Formato -> (escritor, tipo MIME, extensão)
+EXPORT_FORMATS = {
+    "csv": (write_csv, "text/csv", "csv"),
+    "xml": (write_xml, "application/xml", "xml"),
+    "json": (write_json, "application/json", "json"),
+    "jsonl": (write_jsonl, "application/x-ndjson", "jsonl"),
+    "geojson": (write_geojson, "application/geo+json", "geojson"),
+    "kml": (write_kml, "application/vnd.google-earth.kml+xml", "kml"),
+}
+
+
+def export_response(rows: Iterable[Dict], format_type: str, filename: str, **options) -> Response:
+    """
+    Resposta de download em fluxo
+
+    Args:
+        rows: Iterável de linhas (dicts), ex.: query_rows(...)
+        format_type: Chave de EXPORT_FORMATS
+        filename: Nome do arquivo sem extensão
+        **options: Repassadas ao escritor (columns, root, item, styles...)
+    """
+    if format_type not in EXPORT_FORMATS:
+        frappe.throw(
+            frappe._("Formato não suportado: {0}. Disponíveis: {1}").format(format_type, ", ".join(EXPORT_FORMATS)),
+            frappe.ValidationError
+        )
+
+    writer, content_type, extension = EXPORT_FORMATS[format_type]
+    return response_compressor.file_response(
+        _buffered(writer(rows, **options)),
+        f"{filename}.{extension}",
+        content_type
+    )
+
+
+def export_sections_response(sections: Iterable[Tuple[str, Iterable[Dict], Optional[List[Column]]]],
+                             filename: str) -> Response:
+    """Download em fluxo de um CSV com várias seções (ver write_csv_sections)"""
+    return response_compressor.file_response(
+        _buffered(write_csv_sections(sections)),
+        f"{filename}.csv",
+        "text/csv"
+    )
+
+
+def _sheet_name(name: str, used: set) -> str:
+    """Nome de planilha válido (até 31 caracteres, sem []:*?/\\) e único"""
+    base = _SHEET_NAME_RE.sub(" ", str(name)).strip()[:31] or "Dados"
+    candidate, suffix = base, 2
+    while candidate.lower() in used:
+        candidate = f"{base[:31 - len(str(suffix)) - 3]} ({suffix})"
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _write_cell(sheet, row: int, col: int, value):
+    if value is None or value == "":
+        return
+    if isinstance(value, bool):
+        sheet.write_boolean(row, col, value)
+    elif isinstance(value, (int, float, Decimal)):
+        sheet.write_number(row, col, float(value))
+    elif isinstance(value, datetime):
+        sheet.write_datetime(row, col, value.replace(tzinfo=None))
+    elif isinstance(value, date):
+        sheet.write_datetime(row, col, datetime(value.year, value.month, value.day))
+    elif isinstance(value, (dict, list)):
+        sheet.write_string(row, col, json.dumps(value, default=json_default, ensure_ascii=False)[:XLSX_MAX_STRING])
+    else:
+        sheet.write_string(row, col, str(value)[:XLSX_MAX_STRING])
+
+
+def write_xlsx(sheets: Iterable[Tuple[str, Iterable[Dict], Optional[List[Column]]]], path: str):
+    """
+    Grava uma pasta de trabalho XLSX em disco, em memória constante
+
+    Usa o modo constant_memory do xlsxwriter: cada linha vai para o
+    arquivo temporário da planilha assim que a seguinte começa, então as
+    linhas podem vir de um cursor sem buffer e o volume não altera o uso
+    de memória. Planilhas sem linhas são omitidas; as que passam do limite
+    de linhas do formato continuam em uma nova planilha.
+
+    Args:
+        sheets: Iterável de (nome, linhas, colunas); colunas como em write_csv
+        path: Arquivo de destino
+    """
+    if xlsxwriter is None:
+        frappe.throw(frappe._("Exportação XLSX indisponível: instale o pacote xlsxwriter"))
+
+    workbook = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "tmpdir": tempfile.gettempdir(),
+        "default_date_format": "dd/mm/yyyy",
+        "strings_to_numbers": False,
+        "strings_to_urls": False
+    })
+    header = workbook.add_format({"bold": True})
+    used = set()
+
+    def add_sheet(name, resolved):
+        sheet = workbook.add_worksheet(_sheet_name(name, used))
+        for col, (label, _getter) in enumerate(resolved):
+            sheet.write_string(0, col, str(label), header)
+        return sheet
+
+    try:
+        for name, rows, columns in sheets:
+            rows = iter(rows)
+            first = next(rows, None)
+            if first is None:
+                continue
+
+            resolved = _resolve_columns(columns, first)
+            sheet = add_sheet(name, resolved)
+            row_number = 0
+
+            for row in _chain(first, rows):
+                row_number += 1
+                if row_number == XLSX_MAX_ROWS:
+                    sheet = add_sheet(name, resolved)
+                    row_number = 1
+
+                for col, (_label, getter) in enumerate(resolved):
+                    _write_cell(sheet, row_number, col, getter(row))
+    finally:
+        workbook.close()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Envio dos KPIs em tempo real
+
+Quando os contadores de KPI mudam, um único job monta o quadro atual do
+exercício, compara com o último publicado e envia só os campos alterados
+pelo canal realtime do Frappe (evento `govnext_kpis`, sala do website). O
+servidor socket.io repassa a mesma mensagem a todos os navegadores
+conectados, sem recalcular nada por assinante.
+
+Clientes novos obtêm o quadro completo em get_kpi_snapshot e aplicam as
+mensagens seguintes; uma lacuna no número de versão indica mensagem
+perdida e pede uma nova leitura do quadro.
+
+Rajadas de lançamentos são agrupadas: cada alteração marca os KPIs como
+pendentes e enfileira o job com deduplicação; o job publica enquanto
+houver alterações pendentes.
+"""
+
+import frappe
+import json
+from frappe.utils import flt, getdate, nowdate
+from .cache import cache_system
+from .kpi_counters import get_kpi_counters
+
+# Evento realtime recebido pelos dashboards
+KPI_EVENT = "govnext_kpis"
+
+
+def _get_client():
+    return cache_system.redis_client or frappe.cache()
+
+
+def _get_key(name):
+    return f"{cache_system.cache_prefix}kpi_broadcast:{name}"
+
+
+def _website_room():
+    from frappe.realtime import get_website_room
+    return get_website_room()
+
+
+def build_kpi_snapshot():
+    """Quadro atual dos KPIs do exercício (None se os contadores não existem)"""
+    today = getdate(nowdate())
+    counters = get_kpi_counters(today.year, today.month)
+    if not counters:
+        return None
+
+    counters.pop("reconciliado_em", None)
+    counters["resultado"] = counters["receitas"] - counters["despesas"]
+    counters["resultado_mes"] = counters["receitas_mes"] - counters["despesas_mes"]
+
+    snapshot = {
+        key: flt(value, 2) if isinstance(value, float) else value
+        for key, value in counters.items()
+    }
+    snapshot.update({"ano": today.year, "mes": today.month})
+    return snapshot
+
+
+def schedule_kpi_broadcast():
+    """Marca os KPIs como alterados e enfileira a publicação"""
+    try:
+        _get_client().set(_get_key("pendente"), 1)
+        frappe.enqueue(
+            "govnext_core.utils.kpi_broadcast.publish_kpi_update",
+            queue="short",
+            job_id="kpi_broadcast",
+            deduplicate=True
+        )
+
+    except Exception as e:
+        frappe.log_error(f"Erro ao agendar envio de KPIs: {str(e)}", "KPI Broadcast")
+
+
+def _load_published():
+    value = _get_client().get(_get_key("publicado"))
+    if not value:
+        return {"versao": 0, "kpis": {}}
+    return json.loads(value)
+
+
+def publish_kpi_update():
+    """Job: publica os KPIs alterados desde a última mensagem"""
+    client = _get_client()
+
+    try:
+        # DEL retorna 1 se havia alteração pendente
+        while client.delete(_get_key("pendente")):
+            snapshot = build_kpi_snapshot()
+            if snapshot is None:
+                return
+
+            published = _load_published()
+            changed = {
+                key: value for key, value in snapshot.items()
+                if published["kpis"].get(key) != value
+            }
+            if not changed:
+                continue
+
+            versao = published["versao"] + 1
+            client.set(_get_key("publicado"), json.dumps({"versao": versao, "kpis": snapshot}))
+
+            frappe.publish_realtime(
+                KPI_EVENT,
+                {"versao": versao, "alterados": changed},
+                room=_website_room()
+            )
+
+    except Exception as e:
+        frappe.log_error(f"Erro ao publicar KPIs: {str(e)}", "KPI Broadcast")
+
+
+@frappe.whitelist(allow_guest=True)
+def get_kpi_snapshot():
+    """
+    Quadro completo dos KPIs para clientes que acabaram de se conectar
+
+    Retorna o último quadro publicado (mesma versão das mensagens
+    realtime); antes da primeira publicação, monta o quadro atual.
+    """
+    published = _load_published()
+    if published["kpis"]:
+        return published
+
+    return {"versao": 0, "kpis": build_kpi_snapshot() or {}}
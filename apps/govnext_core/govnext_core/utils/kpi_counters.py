@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Contadores dos KPIs principais
+
+Receitas, despesas, valores empenhados e pagos (por exercício e mês) e as
+contagens de licitações ativas e obras em execução ficam em hashes do
+Redis, atualizados pelos eventos de documento com HINCRBYFLOAT. Os
+dashboards leem os indicadores com um HGETALL, sem agregar as tabelas.
+
+Cada doctype tem uma função de contribuição: os valores com que o
+documento entra nos contadores no seu estado atual. Em cada evento, o
+contador recebe a diferença entre a contribuição atual e a do documento
+antes da gravação, de modo que submissão, cancelamento, troca de status e
+exclusão são tratados da mesma forma. Os incrementos são aplicados depois
+do commit da transação (um rollback não altera os contadores).
+
+A reconciliação diária recalcula todos os contadores a partir das tabelas
+de origem, corrigindo cargas feitas fora do ORM e perda de dados do Redis.
+Enquanto os contadores não forem reconciliados, get_kpi_counters retorna
+None e os chamadores consultam o banco.
+"""
+
+import frappe
+import time
+from frappe import _
+from frappe.utils import flt, getdate
+from .cache import cache_system
+
+# Chave dos contadores que não dependem de período
+SCOPE_ESTADO = "estado"
+
+# Statuses que entram nas contagens
+TENDER_ACTIVE_STATUS = "Active"
+OBRA_EXECUCAO_STATUS = "Em Execução"
+PAGAMENTO_CANCELADO_STATUS = "Cancelado"
+
+
+def _get_client():
+    return cache_system.redis_client or frappe.cache()
+
+
+def _get_key(scope):
+    return f"{cache_system.cache_prefix}kpi:{scope}"
+
+
+def _periodo(date, field, value):
+    """Contribuição de um valor no exercício e no mês da data"""
+    date = getdate(date)
+    return {
+        (date.year, field): value,
+        (date.year, f"{field}:{date.month:02d}"): value
+    }
+
+
+def _gl_entry_contribution(doc):
+    if doc.docstatus != 1 or not doc.posting_date:
+        return {}
+
+    # Estorno: espelha o lançamento original com débito e crédito trocados
+    account = doc.account or ""
+    if account.startswith("3."):
+        field = "receitas"
+        value = -flt(doc.credit) if doc.is_cancelled else flt(doc.debit)
+    elif account.startswith("4."):
+        field = "despesas"
+        value = -flt(doc.debit) if doc.is_cancelled else flt(doc.credit)
+    else:
+        return {}
+
+    return _periodo(doc.posting_date, field, value)
+
+
+def _empenho_contribution(doc):
+    if doc.docstatus != 1 or not doc.get("data_empenho"):
+        return {}
+    return _periodo(doc.data_empenho, "empenhado", flt(doc.get("valor_total")))
+
+
+def _pagamento_contribution(doc):
+    if doc.docstatus != 1 or not doc.get("data_pagamento"):
+        return {}
+    if doc.get("status_pagamento") == PAGAMENTO_CANCELADO_STATUS:
+        return {}
+    return _periodo(doc.data_pagamento, "pago", flt(doc.get("valor_pagamento")))
+
+
+def _public_tender_contribution(doc):
+    if doc.get("status") != TENDER_ACTIVE_STATUS:
+        return {}
+    return {(SCOPE_ESTADO, "licitacoes_ativas"): 1}
+
+
+def _obra_publica_contribution(doc):
+    if doc.get("status") != OBRA_EXECUCAO_STATUS:
+        return {}
+    return {(SCOPE_ESTADO, "obras_execucao"): 1}
+
+
+# Contribuição de cada doctype para os contadores
+KPI_COUNTER_DOCTYPES = {
+    "GL Entry": _gl_entry_contribution,
+    "Empenho": _empenho_contribution,
+    "Pagamento": _pagamento_contribution,
+    "Public Tender": _public_tender_contribution,
+    "Obra Publica": _obra_publica_contribution,
+}
+
+
+def _diff(before, after):
+    """Incrementos que levam os contadores de `before` para `after`"""
+    deltas = {}
+    for key in set(before) | set(after):
+        delta = flt(after.get(key)) - flt(before.get(key))
+        if delta:
+            deltas[key] = delta
+    return deltas
+
+
+def _apply(deltas):
+    """Aplica os incrementos atomicamente (MULTI/EXEC)"""
+    try:
+        pipe = _get_client().pipeline(transaction=True)
+        for (scope, field), delta in deltas.items():
+            pipe.hincrbyfloat(_get_key(scope), field, delta)
+        pipe.execute()
+
+    except Exception as e:
+        frappe.log_error(f"Erro ao atualizar contadores de KPI: {str(e)}", "KPI Counters")
+        return
+
+    _broadcast()
+
+
+def _broadcast():
+    # Importação tardia: kpi_broadcast lê os contadores deste módulo
+    from .kpi_broadcast import schedule_kpi_broadcast
+    schedule_kpi_broadcast()
+
+
+def _after_commit(callback):
+    """Executa após o commit da transação corrente (ou já, sem suporte)"""
+    hooks = getattr(frappe.db, "after_commit", None)
+    if hooks is not None and hasattr(hooks, "add"):
+        hooks.add(callback)
+    else:
+        callback()
+
+
+def update_kpi_counters_on_change(doc, method):
+    """
+    Hook de documento (on_update, on_update_after_submit, on_cancel,
+    on_trash): aplica a variação da contribuição do documento
+    """
+    contribution = KPI_COUNTER_DOCTYPES.get(doc.doctype)
+    if not contribution:
+        return
+
+    try:
+        if method == "on_trash":
+            before, after = contribution(doc), {}
+        else:
+            previous = doc.get_doc_before_save()
+            before = contribution(previous) if previous else {}
+            after = contribution(doc)
+
+        deltas = _diff(before, after)
+
+    except Exception as e:
+        frappe.log_error(f"Erro ao calcular contadores de KPI: {str(e)}", "KPI Counters")
+        return
+
+    if deltas:
+        _after_commit(lambda: _apply(deltas))
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _as_dict(values):
+    return {_decode(field): flt(_decode(value)) for field, value in (values or {}).items()}
+
+
+def get_kpi_counters(year, month=None):
+    """
+    Lê os contadores de um exercício (e opcionalmente de um mês)
+
+    Returns:
+        Dicionário com receitas, despesas, empenhado, pago (do ano e, se
+        informado o mês, com sufixo _mes), licitacoes_ativas e
+        obras_execucao; None se os contadores ainda não foram reconciliados
+    """
+    try:
+        pipe = _get_client().pipeline(transaction=False)
+        pipe.hgetall(_get_key(SCOPE_ESTADO))
+        pipe.hgetall(_get_key(int(year)))
+        estado, periodo = (_as_dict(values) for values in pipe.execute())
+
+    except Exception:
+        return None
+
+    if not estado.get("reconciliado_em"):
+        return None
+
+    result = {
+        "licitacoes_ativas": int(estado.get("licitacoes_ativas", 0)),
+        "obras_execucao": int(estado.get("obras_execucao", 0)),
+        "reconciliado_em": int(estado["reconciliado_em"])
+    }
+    for field in ("receitas", "despesas", "empenhado", "pago"):
+        result[field] = periodo.get(field, 0.0)
+        if month:
+            result[f"{field}_mes"] = periodo.get(f"{field}:{int(month):02d}", 0.0)
+
+    return result
+
+
+def _add(counters, year, month, field, value):
+    scope = counters.setdefault(int(year), {})
+    scope[field] = scope.get(field, 0.0) + flt(value)
+    month_field = f"{field}:{int(month):02d}"
+    scope[month_field] = scope.get(month_field, 0.0) + flt(value)
+
+
+def compute_kpi_counters():
+    """Recalcula todos os contadores a partir das tabelas de origem"""
+    counters = {}
+
+    for row in frappe.db.sql("""
+        SELECT
+            YEAR(posting_date) as ano, MONTH(posting_date) as mes,
+            SUM(CASE WHEN account LIKE '3.%%' THEN debit ELSE 0 END) as receitas,
+            SUM(CASE WHEN account LIKE '4.%%' THEN credit ELSE 0 END) as despesas
+        FROM `tabGL Entry`
+        WHERE is_cancelled = 0
+        AND docstatus = 1
+        AND (account LIKE '3.%%' OR account LIKE '4.%%')
+        GROUP BY YEAR(posting_date), MONTH(posting_date)
+    """, as_dict=True):
+        _add(counters, row.ano, row.mes, "receitas", row.receitas)
+        _add(counters, row.ano, row.mes, "despesas", row.despesas)
+
+    for row in frappe.db.sql("""
+        SELECT YEAR(data_empenho) as ano, MONTH(data_empenho) as mes, SUM(valor_total) as valor
+        FROM `tabEmpenho`
+        WHERE docstatus = 1 AND data_empenho IS NOT NULL
+        GROUP BY YEAR(data_empenho), MONTH(data_empenho)
+    """, as_dict=True):
+        _add(counters, row.ano, row.mes, "empenhado", row.valor)
+
+    for row in frappe.db.sql("""
+        SELECT YEAR(data_pagamento) as ano, MONTH(data_pagamento) as mes, SUM(valor_pagamento) as valor
+        FROM `tabPagamento`
+        WHERE docstatus = 1 AND data_pagamento IS NOT NULL
+        AND IFNULL(status_pagamento, '') != %s
+        GROUP BY YEAR(data_pagamento), MONTH(data_pagamento)
+    """, [PAGAMENTO_CANCELADO_STATUS], as_dict=True):
+        _add(counters, row.ano, row.mes, "pago", row.valor)
+
+    counters[SCOPE_ESTADO] = {
+        "licitacoes_ativas": frappe.db.count("Public Tender", {"status": TENDER_ACTIVE_STATUS}),
+        "obras_execucao": frappe.db.count("Obra Publica", {"status": OBRA_EXECUCAO_STATUS}),
+        "reconciliado_em": int(time.time())
+    }
+
+    return counters
+
+
+def reconcile_kpi_counters():
+    """
+    Substitui os contadores pelos valores recalculados
+
+    A troca é feita numa única transação do Redis; eventos processados
+    durante o recálculo podem ser sobrescritos e são corrigidos na
+    reconciliação seguinte.
+    """
+    counters = compute_kpi_counters()
+    client = _get_client()
+
+    keys = {_get_key(scope) for scope in counters}
+    stale = [key for key in client.scan_iter(match=_get_key("*"), count=1000) if _decode(key) not in keys]
+
+    pipe = client.pipeline(transaction=True)
+    for key in stale:
+        pipe.delete(key)
+    for scope, values in counters.items():
+        pipe.delete(_get_key(scope))
+        if values:
+            pipe.hset(_get_key(scope), mapping=values)
+    pipe.execute()
+
+    _broadcast()
+    return counters
+
+
+def reconcile_kpi_counters_job():
+    """Job agendado: reconcilia os contadores com as tabelas de origem"""
+    try:
+        reconcile_kpi_counters()
+    except Exception as e:
+        frappe.log_error(f"Erro ao reconciliar contadores de KPI: {str(e)}", "KPI Counters")
+
+
+def ensure_kpi_counters():
+    """Enfileira a reconciliação quando os contadores ainda não existem"""
+    try:
+        frappe.enqueue(
+            "govnext_core.utils.kpi_counters.reconcile_kpi_counters_job",
+            queue="long",
+            job_id="reconcile_kpi_counters",
+            deduplicate=True
+        )
+    except Exception as e:
+        frappe.log_error(f"Erro ao enfileirar reconciliação de KPIs: {str(e)}", "KPI Counters")
+
+
+@frappe.whitelist()
+def reconcile_kpi_counters_api():
+    """API para reconciliar os contadores (em segundo plano)"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "govnext_core.utils.kpi_counters.reconcile_kpi_counters_job",
+        queue="long"
+    )
+    return {"success": True, "message": _("Reconciliação dos contadores de KPI enfileirada")}
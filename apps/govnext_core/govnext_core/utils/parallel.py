@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Execução concorrente de consultas independentes
+
+Cada tarefa roda em uma thread de um pool limitado, com seu próprio
+contexto de site Frappe e sua própria conexão de banco, sob o mesmo
+usuário da requisição original. Usado para montar respostas compostas
+(lotes de consultas, seções de dashboards) na latência da tarefa mais
+lenta em vez da soma de todas.
+
+O total de tarefas em execução no processo, somando todas as requisições,
+é limitado por `parallel_max_threads` (site_config): cada tarefa ocupa uma
+vaga, e portanto uma conexão de banco, até terminar, inclusive depois de
+reportada como timeout.
+"""
+
+import frappe
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Situação de cada tarefa no resultado
+TASK_OK = "ok"
+TASK_ERROR = "error"
+TASK_TIMEOUT = "timeout"
+
+# Tarefas simultâneas por processo (padrão de `parallel_max_threads`)
+PARALLEL_MAX_THREADS = 8
+
+_slots = None
+_slots_lock = Lock()
+
+
+class _NoSlot(Exception):
+    """Nenhuma vaga liberada antes do prazo da tarefa"""
+
+
+def _get_slots() -> BoundedSemaphore:
+    """Vagas de execução compartilhadas por todas as requisições do processo"""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = BoundedSemaphore(frappe.conf.get("parallel_max_threads", PARALLEL_MAX_THREADS))
+        return _slots
+
+
+def run_in_site_context(site: str, sites_path: str, user: str, fn: Callable, *args,
+                        _deadline: Optional[float] = None, _task_slots: BoundedSemaphore = None,
+                        **kwargs) -> Any:
+    """
+    Executa `fn` em um contexto Frappe próprio (thread de trabalho)
+
+    Aguarda uma vaga em `_task_slots` até o prazo `_deadline` (time.monotonic);
+    sem vaga a tempo, a tarefa não é executada.
+    """
+    if _task_slots is not None:
+        wait_for = max(_deadline - time.monotonic(), 0) if _deadline is not None else None
+        if not _task_slots.acquire(timeout=wait_for):
+            raise _NoSlot()
+
+    try:
+        frappe.init(site=site, sites_path=sites_path)
+        try:
+            frappe.connect()
+            frappe.set_user(user)
+            return fn(*args, **kwargs)
+        finally:
+            frappe.destroy()
+    finally:
+        if _task_slots is not None:
+            _task_slots.release()
+
+
+def run_concurrently(tasks: Dict[str, Tuple[Callable, tuple, dict]], max_workers: int = None,
+                     timeout: float = None,
+                     timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Executa tarefas independentes em paralelo
+
+    Args:
+        tasks: Chave -> (função, args, kwargs)
+        max_workers: Tamanho máximo do pool (padrão: `parallel_max_workers`
+            do site_config ou 4); o total entre requisições é limitado
+            por PARALLEL_MAX_THREADS
+        timeout: Tempo máximo em segundos para cada tarefa; tarefas não
+            concluídas são reportadas como timeout (resultado parcial)
+        timeouts: Tempo máximo por chave, substituindo `timeout`
+
+    Returns:
+        Chave -> {"status": ok|error|timeout, "result" ou "error"}
+    """
+    if not tasks:
+        return {}
+
+    max_workers = min(max_workers or frappe.conf.get("parallel_max_workers", 4), len(tasks))
+    site = frappe.local.site
+    sites_path = frappe.local.sites_path
+    user = frappe.session.user
+    slots = _get_slots()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="govnext-parallel")
+    try:
+        started = time.monotonic()
+
+        # Prazo de cada tarefa, contado a partir do envio ao pool
+        futures, deadlines = {}, {}
+        for key, (fn, args, kwargs) in tasks.items():
+            limit = (timeouts or {}).get(key, timeout)
+            deadline = started + limit if limit is not None else None
+            future = executor.submit(
+                run_in_site_context, site, sites_path, user, fn, *args,
+                _deadline=deadline, _task_slots=slots, **(kwargs or {})
+            )
+            futures[future] = key
+            deadlines[future] = deadline
+
+        results = {}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[f] is not None and deadlines[f] <= now]:
+                pending.discard(future)
+                future.cancel()
+                results[futures[future]] = {"status": TASK_TIMEOUT, "error": "Tempo limite excedido"}
+
+            if not pending:
+                break
+
+            next_deadline = min((deadlines[f] for f in pending if deadlines[f] is not None), default=None)
+            done, pending = wait(
+                pending,
+                timeout=max(next_deadline - now, 0) if next_deadline is not None else None,
+                return_when=FIRST_COMPLETED
+            )
+
+            for future in done:
+                key = futures[future]
+                try:
+                    results[key] = {"status": TASK_OK, "result": future.result()}
+                except _NoSlot:
+                    results[key] = {"status": TASK_TIMEOUT, "error": "Tempo limite excedido"}
+                except Exception as e:
+                    frappe.log_error(f"Erro na tarefa paralela {key}: {str(e)}", "Parallel Task Error")
+                    results[key] = {"status": TASK_ERROR, "error": str(e)}
+
+        return {key: results[key] for key in tasks}
+
+    finally:
+        # Não bloquear a resposta esperando tarefas que estouraram o tempo
+        executor.shutdown(wait=False, cancel_futures=True)
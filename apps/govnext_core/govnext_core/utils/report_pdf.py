@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Renderização de relatórios tabulares em PDF
+
+As tabelas do relatório são paginadas (PDF_ROWS_PER_PAGE linhas por
+página, com o cabeçalho da tabela repetido) e cada página é renderizada
+pelo template templates/reports/report_page.html. O ambiente Jinja é criado
+uma vez por processo e guarda os templates compilados.
+
+As páginas são convertidas pelo wkhtmltopdf em lotes de
+PDF_PAGES_PER_BATCH e anexadas ao PdfWriter, que grava o arquivo final em
+disco: só o HTML de um lote existe em memória, qualquer que seja o tamanho
+do relatório. Feito para rodar em worker (ver ReportsManager.export_to_pdf).
+"""
+
+import itertools
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+import frappe
+from frappe.utils.pdf import get_pdf
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    from PyPDF2 import PdfWriter
+
+# Linhas de tabela por página (A4 paisagem)
+PDF_ROWS_PER_PAGE = 35
+
+# Páginas convertidas por chamada ao wkhtmltopdf
+PDF_PAGES_PER_BATCH = 20
+
+PDF_OPTIONS = {
+    "orientation": "Landscape",
+    "page-size": "A4"
+}
+
+
+@lru_cache(maxsize=None)
+def get_environment():
+    """Ambiente Jinja dos templates de relatório (um por processo)"""
+    return Environment(
+        loader=FileSystemLoader(frappe.get_app_path("govnext_core", "templates", "reports")),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False
+    )
+
+
+def format_cell(value):
+    """Texto da célula e se é numérica (alinhada à direita)"""
+    if value is None:
+        return "", False
+    if isinstance(value, bool):
+        return ("Sim" if value else "Não"), False
+    if isinstance(value, int):
+        return f"{value:,}".replace(",", "."), True
+    if isinstance(value, (float, Decimal)):
+        return f"{value:,.2f}".translate(str.maketrans(",.", ".,")), True
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y %H:%M"), False
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y"), False
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str, ensure_ascii=False), False
+    return str(value), False
+
+
+def _label(column):
+    return str(column).replace("_", " ").capitalize()
+
+
+def _count_pages(tables):
+    total = 0
+    for _section, rows, _columns in tables:
+        count = sum(1 for _row in rows)
+        total += math.ceil(count / PDF_ROWS_PER_PAGE)
+    return total
+
+
+def iter_pages(tables, title, total_pages):
+    """HTML de cada página, na ordem das tabelas"""
+    template = get_environment().get_template("report_page.html")
+    generated_at = datetime.now().strftime("%d/%m/%Y %H:%M")
+    page_number = 0
+
+    for section, rows, columns in tables:
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            continue
+
+        columns = columns or list(first.keys())
+        rows = itertools.chain([first], rows)
+        continued = False
+
+        while True:
+            chunk = list(itertools.islice(rows, PDF_ROWS_PER_PAGE))
+            if not chunk:
+                break
+
+            page_number += 1
+            yield template.render(
+                title=title,
+                section=section,
+                continued=continued,
+                columns=[_label(column) for column in columns],
+                rows=[[format_cell(row.get(column)) for column in columns] for row in chunk],
+                generated_at=generated_at,
+                page_number=page_number,
+                total_pages=total_pages
+            )
+            continued = True
+
+
+def render_pdf(tables_factory, title, path):
+    """
+    Grava o PDF das tabelas em `path`
+
+    Args:
+        tables_factory: Função que devolve um novo iterável de
+            (seção, linhas, colunas); é chamada duas vezes (contagem de
+            páginas e renderização)
+        title: Título impresso em todas as páginas
+        path: Arquivo de destino
+
+    Returns:
+        Número de páginas
+    """
+    total_pages = _count_pages(tables_factory())
+    document = get_environment().get_template("report_document.html")
+    output = PdfWriter()
+
+    pages = iter_pages(tables_factory(), title, total_pages)
+    while True:
+        batch = list(itertools.islice(pages, PDF_PAGES_PER_BATCH))
+        if not batch:
+            break
+
+        html = document.render(title=title, pages=[Markup(page) for page in batch])
+        output = get_pdf(html, options=dict(PDF_OPTIONS), output=output)
+
+    with open(path, "wb") as pdf_file:
+        output.write(pdf_file)
+
+    return total_pages
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Estatísticas de busca do Portal da Transparência
+
+Cada busca registrada incrementa um count-min sketch da janela do dia e
+atualiza a lista dos termos mais frequentes (heavy hitters) da janela, em
+um único script Lua: custo constante por busca e memória limitada,
+independente do número de termos distintos. Um job periódico combina as
+janelas recentes em um snapshot, que é o que o portal lê.
+
+Como a lista de populares é pública, só são contabilizadas buscas cujos
+termos existem no índice de busca (ou nas sugestões fixas), e nunca as
+que contêm CPF, e-mail ou telefone.
+
+Estrutura das chaves (sob o prefixo do site):
+    search:cms:<AAAAMMDD>   hash "linha:coluna" -> contador do sketch
+    search:hh:<AAAAMMDD>    sorted set termo -> frequência estimada
+    search:hhd:<AAAAMMDD>   hash termo -> forma exibida da busca
+    search:popular          snapshot JSON (também salvo nos defaults do site)
+"""
+
+import frappe
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from .cache import cache_system
+from .search_index import fold_text, search_index
+from .typeahead import COMMON_TERMS
+
+# Dimensões do sketch: erro ~ e/largura, confiança 1 - e^-profundidade
+SKETCH_WIDTH = 4096
+SKETCH_DEPTH = 4
+
+# Termos mantidos por janela e janelas combinadas no snapshot
+HEAVY_HITTERS = 100
+WINDOW_DAYS = 7
+
+SNAPSHOT_DEFAULT_KEY = "govnext_search_popular_terms"
+
+# Incrementa o sketch, estima a frequência e atualiza os heavy hitters.
+# A lista é podada para HEAVY_HITTERS ao atingir o dobro (custo amortizado).
+# KEYS: sketch, heavy hitters, formas exibidas
+# ARGV: termo, forma exibida, ttl, top_k, campos do sketch...
+RECORD_SCRIPT = """
+local estimate = nil
+for i = 5, #ARGV do
+    local count = redis.call('HINCRBY', KEYS[1], ARGV[i], 1)
+    if estimate == nil or count < estimate then
+        estimate = count
+    end
+end
+redis.call('ZADD', KEYS[2], estimate, ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+local top_k = tonumber(ARGV[4])
+local size = redis.call('ZCARD', KEYS[2])
+if size >= top_k * 2 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, size - top_k - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, size - top_k - 1)
+    for _, term in ipairs(evicted) do
+        redis.call('HDEL', KEYS[3], term)
+    end
+end
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return estimate
+"""
+
+# Buscas que parecem dados pessoais (CPF, e-mail, telefone com DDD) não são
+# contabilizadas; verificadas no texto original, antes da normalização
+_PERSONAL_DATA_RE = re.compile(
+    r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}"
+    r"|[^\s@]+@[^\s@]+\.[^\s@]+"
+    r"|(?<!\d)(?:\+?55\s?)?\(?\d{2}\)?\s?9?\d{4}[-.\s]?\d{4}(?!\d)"
+)
+
+# Termos sempre aceitos na contagem (sugestões fixas do autocompletar)
+_COMMON_TERMS = frozenset(" ".join(fold_text(term).split()) for term in COMMON_TERMS)
+
+
+class SearchAnalytics:
+    """Agregador de buscas por janela diária (count-min sketch + top-k)"""
+
+    def __init__(self):
+        self._record_script = None
+
+    def _client(self):
+        return cache_system.redis_client or frappe.cache()
+
+    def _key(self, *parts) -> str:
+        return f"{cache_system.cache_prefix}search:" + ":".join(parts)
+
+    def _sketch_fields(self, term: str) -> List[str]:
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=4 * SKETCH_DEPTH).digest()
+        return [
+            f"{row}:{int.from_bytes(digest[row * 4:row * 4 + 4], 'little') % SKETCH_WIDTH}"
+            for row in range(SKETCH_DEPTH)
+        ]
+
+    @staticmethod
+    def normalize(query: str) -> Optional[str]:
+        """Forma canônica usada na contagem (None = não contabilizar)"""
+        term = " ".join(fold_text(query).split())[:100]
+        if len(term) < 3 or _PERSONAL_DATA_RE.search(str(query or "")):
+            return None
+        return term
+
+    def is_countable(self, term: str) -> bool:
+        """
+        Só entram na contagem (e, portanto, na lista pública de populares)
+        buscas cujos termos constam do índice de busca ou das sugestões
+        fixas: textos arbitrários enviados por visitantes ficam de fora
+        """
+        if term in _COMMON_TERMS:
+            return True
+        try:
+            return search_index.in_vocabulary(term)
+        except Exception as e:
+            frappe.log_error(f"Erro ao validar termo de busca: {str(e)}", "Search Analytics")
+            return False
+
+    def record(self, query: str, day: Optional[datetime] = None):
+        """Registra uma busca na janela do dia"""
+        term = self.normalize(query)
+        if not term or not self.is_countable(term):
+            return
+
+        window = (day or datetime.now()).strftime("%Y%m%d")
+        try:
+            if self._record_script is None:
+                self._record_script = self._client().register_script(RECORD_SCRIPT)
+
+            self._record_script(
+                keys=[self._key("cms", window), self._key("hh", window), self._key("hhd", window)],
+                args=[term, " ".join(query.split())[:100], (WINDOW_DAYS + 1) * 86400, HEAVY_HITTERS]
+                + self._sketch_fields(term),
+            )
+        except Exception as e:
+            frappe.log_error(f"Erro ao registrar busca: {str(e)}", "Search Analytics")
+
+    def estimate(self, query: str, day: Optional[datetime] = None) -> int:
+        """Frequência estimada de um termo na janela (nunca subestima)"""
+        term = self.normalize(query)
+        if not term:
+            return 0
+
+        window = (day or datetime.now()).strftime("%Y%m%d")
+        counts = self._client().hmget(self._key("cms", window), self._sketch_fields(term))
+        return min(int(count or 0) for count in counts)
+
+    def build_snapshot(self, limit: int = 20) -> List[Dict]:
+        """Combina os heavy hitters das últimas janelas"""
+        client = self._client()
+        today = datetime.now()
+        windows = [(today - timedelta(days=offset)).strftime("%Y%m%d") for offset in range(WINDOW_DAYS)]
+
+        pipe = client.pipeline(transaction=False)
+        for window in windows:
+            pipe.zrevrange(self._key("hh", window), 0, -1, withscores=True)
+            pipe.hgetall(self._key("hhd", window))
+        results = pipe.execute()
+
+        totals, displays = {}, {}
+        # Da janela mais antiga para a mais recente: prevalece a forma exibida atual
+        for index in reversed(range(len(windows))):
+            ranking, shown = results[index * 2], results[index * 2 + 1]
+            for term, count in ranking:
+                term = _decode(term)
+                totals[term] = totals.get(term, 0) + int(count)
+            displays.update({_decode(k): _decode(v) for k, v in shown.items()})
+
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{"termo": displays.get(term, term), "frequencia": count} for term, count in ranked]
+
+    def update_snapshot(self):
+        """Recalcula e persiste o snapshot dos termos populares"""
+        snapshot = json.dumps({
+            "termos": self.build_snapshot(),
+            "atualizado_em": datetime.now().isoformat()
+        })
+        self._client().set(self._key("popular"), snapshot)
+        # Cópia durável: o snapshot sobrevive a um flush do Redis
+        frappe.db.set_default(SNAPSHOT_DEFAULT_KEY, snapshot)
+        frappe.db.commit()
+
+    def get_snapshot(self) -> List[Dict]:
+        """Termos populares do último snapshot ([] se ainda não gerado)"""
+        try:
+            snapshot = self._client().get(self._key("popular"))
+        except Exception:
+            snapshot = None
+
+        snapshot = snapshot or frappe.db.get_default(SNAPSHOT_DEFAULT_KEY)
+        if not snapshot:
+            return []
+
+        return json.loads(_decode(snapshot)).get("termos", [])
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Instância global do agregador
+search_analytics = SearchAnalytics()
+
+
+def update_popular_terms_snapshot():
+    """Job agendado: atualiza o snapshot dos termos populares"""
+    try:
+        search_analytics.update_snapshot()
+    except Exception as e:
+        frappe.log_error(f"Erro ao atualizar termos populares: {str(e)}", "Search Analytics")
@@ -0,0 +1,658 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Índice invertido para a busca do Portal da Transparência
+
+Receitas, despesas, contratos, licitações e servidores (agregados por
+lotação, nunca individualmente) são indexados no Redis e mantidos pelos
+eventos de documento. O texto passa por remoção de acentos, stop-words e
+um radicalizador leve de português; a consulta é ranqueada por BM25 lendo
+apenas as listas de postings dos termos pesquisados, sem varrer tabelas.
+
+Estrutura das chaves (sob o prefixo do site; <g> é a geração ativa):
+    search:<g>:t:<categoria>:<termo>   hash chave_doc -> "tf:comprimento"
+    search:<g>:d:<chave>   hash com os campos exibidos e os termos do documento
+    search:<g>:stats       hash com total de documentos e soma dos comprimentos
+    search:meta:active     geração ativa (building: geração em construção)
+    search:ac*             completações do autocompletar (ver utils/typeahead.py)
+"""
+
+import frappe
+import heapq
+import json
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from .cache import cache_system
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Listas de postings maiores que isto (termos genéricos como "despesa") não
+# são lidas inteiras: contribuem só para os documentos já encontrados pelos
+# termos mais seletivos da consulta
+SEARCH_MAX_POSTINGS = 2000
+
+# Alterações de completações mantidas no log lido pelos workers
+COMPLETION_LOG_SIZE = 10000
+
+# Categoria -> (tipo do resultado, rótulo exibido)
+SEARCH_CATEGORIES = {
+    "receitas": ("receita", "Receitas"),
+    "despesas": ("despesa", "Despesas"),
+    "contratos": ("contrato", "Contratos"),
+    "licitacoes": ("licitacao", "Licitações"),
+    "servidores": ("servidor", "Gestão de Pessoas"),
+}
+
+STOP_WORDS = frozenset("""
+    a o as os ao aos um uma uns umas de da do das dos e em no na nos nas
+    para pra por pelo pela pelos pelas com sem sob sobre entre ate apos
+    que se ou mas como mais menos ja nao sim seu sua seus suas este esta
+    isto esse essa isso aquele aquela ser foi sao ha the
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos ("Licitações" -> "licitacoes")"""
+    decomposed = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def stem(word: str) -> str:
+    """
+    Radicalizador leve de português (plural e vogal temática)
+
+    Agressivo o bastante para unir singular/plural e masculino/feminino
+    ("licitações"/"licitação", "pública"/"público") sem a perda de precisão
+    de um radicalizador completo. Aplicado igualmente no índice e na consulta.
+    """
+    if len(word) < 4 or word.isdigit():
+        return word
+
+    if word.endswith(("oes", "aes")):
+        word = word[:-3] + "ao"
+    elif word.endswith("ais"):
+        word = word[:-3] + "al"
+    elif word.endswith("eis"):
+        word = word[:-3] + "el"
+    elif word.endswith("ois"):
+        word = word[:-3] + "ol"
+    elif word.endswith("ns"):
+        word = word[:-2] + "m"
+    elif word.endswith("res"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us")):
+        word = word[:-1]
+
+    if len(word) > 4 and word[-1] in "aoe":
+        word = word[:-1]
+
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Texto -> lista de termos indexáveis"""
+    return [
+        stem(token)
+        for token in _TOKEN_RE.findall(fold_text(text))
+        if token not in STOP_WORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+# ========== DOCUMENTOS INDEXADOS ==========
+
+def _gl_entries(doc) -> List[Tuple[str, Optional[Dict]]]:
+    """Lançamento contábil: receita (conta 3.*) ou despesa (conta 4.*)"""
+    if doc.get("is_cancelled") and doc.get("voucher_no"):
+        return _cancelled_voucher_entries(doc)
+
+    account = doc.get("account") or ""
+    entries = []
+
+    for category, prefix, amount_field in (("receitas", "3.", "debit"), ("despesas", "4.", "credit")):
+        key = f"{category}:GL Entry:{doc.get('name')}"
+        if not account.startswith(prefix):
+            entries.append((key, None))
+            continue
+
+        label = "Receita" if category == "receitas" else "Despesa"
+        entries.append((key, {
+            "titulo": f"{label}: {doc.get('party') or account}",
+            "descricao": doc.get("remarks") or account,
+            "valor": doc.get(amount_field) or 0,
+            "data": doc.get("posting_date"),
+            "link": f"/transparencia/{category}?id={doc.get('voucher_no')}",
+            "text": " ".join(str(v) for v in (account, doc.get("party"), doc.get("remarks"), doc.get("voucher_no")) if v),
+            "completions": [doc.get("party")],
+        }))
+
+    return entries
+
+
+def _cancelled_voucher_entries(doc) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Remoção de todos os lançamentos de um documento cancelado
+
+    O ERPNext marca os lançamentos originais com is_cancelled=1 por SQL
+    direto (set_as_cancel), sem eventos de documento; só os lançamentos de
+    estorno, já cancelados, chegam ao hook. Cada um deles remove do índice
+    todos os lançamentos do mesmo voucher_type/voucher_no.
+    """
+    names = set(frappe.get_all(
+        "GL Entry",
+        filters={"voucher_type": doc.get("voucher_type"), "voucher_no": doc.get("voucher_no")},
+        pluck="name"
+    ))
+    names.add(doc.get("name"))
+
+    return [
+        (f"{category}:GL Entry:{name}", None)
+        for name in sorted(names)
+        for category in ("receitas", "despesas")
+    ]
+
+
+def _purchase_order_entries(doc) -> List[Tuple[str, Optional[Dict]]]:
+    """Contrato (pedido de compra submetido)"""
+    key = f"contratos:Purchase Order:{doc.get('name')}"
+    if doc.get("docstatus") != 1:
+        return [(key, None)]
+
+    tax_id = doc.get("tax_id")
+    if tax_id is None and doc.get("supplier"):
+        tax_id = frappe.db.get_value("Supplier", doc.get("supplier"), "tax_id")
+
+    return [(key, {
+        "titulo": f"Contrato {doc.get('name')}: {doc.get('supplier')}",
+        "descricao": doc.get("title") or "",
+        "valor": doc.get("total_amount") or doc.get("grand_total") or 0,
+        "data": doc.get("start_date") or doc.get("transaction_date"),
+        "link": f"/transparencia/contratos?id={doc.get('name')}",
+        "text": " ".join(str(v) for v in (doc.get("name"), doc.get("title"), doc.get("supplier"), tax_id) if v),
+        "completions": [doc.get("supplier"), doc.get("name"), tax_id],
+    })]
+
+
+def _tender_entries(doc) -> List[Tuple[str, Optional[Dict]]]:
+    """Licitação"""
+    key = f"licitacoes:Public Tender:{doc.get('name')}"
+    if doc.get("docstatus") == 2:
+        return [(key, None)]
+
+    return [(key, {
+        "titulo": f"Licitação {doc.get('name')}: {doc.get('tender_type')}",
+        "descricao": doc.get("tender_title") or "",
+        "valor": doc.get("estimated_amount") or 0,
+        "data": doc.get("opening_date"),
+        "link": f"/transparencia/licitacoes?id={doc.get('name')}",
+        "text": " ".join(str(v) for v in (doc.get("name"), doc.get("tender_title"), doc.get("tender_type")) if v),
+        "completions": [doc.get("name"), doc.get("winner")],
+    })]
+
+
+def _department_entries(department: str, exclude: Optional[str] = None) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Servidores agregados por lotação (sem dados pessoais)
+
+    `exclude` deixa de fora um servidor que está sendo excluído (a linha
+    ainda existe durante o on_trash).
+    """
+    key = f"servidores:Department:{department}"
+    summary = frappe.db.sql("""
+        SELECT COUNT(*) as total,
+               GROUP_CONCAT(DISTINCT designation SEPARATOR ', ') as cargos
+        FROM `tabEmployee`
+        WHERE status = 'Active' AND department = %s AND name != %s
+    """, [department, exclude or ""], as_dict=True)
+
+    if not summary or not summary[0].total:
+        return [(key, None)]
+
+    cargos = summary[0].cargos or ""
+    return [(key, {
+        "titulo": f"Servidores: {department}",
+        "descricao": f"{summary[0].total} servidores ativos. Cargos: {cargos}",
+        "valor": "",
+        "data": "",
+        "link": "/transparencia/gestao-pessoas",
+        "text": f"servidores folha pagamento salario remuneracao {department} {cargos}",
+        "completions": [department],
+    })]
+
+
+def _employee_entries(doc, exclude: Optional[str] = None) -> List[Tuple[str, Optional[Dict]]]:
+    departments = {doc.get("department")}
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if before:
+        departments.add(before.get("department"))
+
+    entries = []
+    for department in filter(None, departments):
+        entries.extend(_department_entries(department, exclude))
+    return entries
+
+
+# Doctype -> função que gera as entradas (chave, documento ou None para remover)
+SEARCH_DOCTYPES = {
+    "GL Entry": _gl_entries,
+    "Purchase Order": _purchase_order_entries,
+    "Public Tender": _tender_entries,
+    "Employee": _employee_entries,
+}
+
+# Doctypes indexados de forma agregada: a remoção de um documento recalcula
+# a entrada (função chamada com exclude=<name>) em vez de apagá-la
+AGGREGATED_DOCTYPES = {"Employee"}
+
+# Consultas da reconstrução completa, paginadas por name
+REBUILD_QUERIES = {
+    "GL Entry": """
+        SELECT name, account, debit, credit, posting_date, voucher_no, remarks, party, is_cancelled
+        FROM `tabGL Entry`
+        WHERE (account LIKE %s OR account LIKE %s) AND is_cancelled = 0 AND name > %s
+        ORDER BY name LIMIT %s
+    """,
+    "Purchase Order": """
+        SELECT po.name, po.title, po.supplier, po.total_amount, po.start_date, po.docstatus,
+               IFNULL(s.tax_id, '') as tax_id
+        FROM `tabPurchase Order` po
+        LEFT JOIN `tabSupplier` s ON s.name = po.supplier
+        WHERE po.docstatus = 1 AND po.name > %s
+        ORDER BY po.name LIMIT %s
+    """,
+    "Public Tender": """
+        SELECT name, tender_title, tender_type, estimated_amount, opening_date, docstatus, winner
+        FROM `tabPublic Tender`
+        WHERE docstatus < 2 AND name > %s
+        ORDER BY name LIMIT %s
+    """,
+}
+
+
+class SearchIndex:
+    """Índice invertido com ranqueamento BM25 mantido no Redis"""
+
+    def __init__(self, batch_size: int = 1000, generation: Optional[str] = None):
+        self.batch_size = batch_size
+        # Geração fixa (índice em construção) ou None para a geração ativa
+        self.generation = generation
+
+    def _client(self):
+        return cache_system.redis_client or frappe.cache()
+
+    def _meta_key(self, name: str) -> str:
+        return f"{cache_system.cache_prefix}search:meta:{name}"
+
+    def _namespace(self) -> str:
+        """Prefixo das chaves da geração deste índice"""
+        generation = self.generation
+        if generation is None:
+            generation = _decode(self._client().get(self._meta_key("active"))) or "0"
+        return f"{cache_system.cache_prefix}search:{generation}:"
+
+    def _key(self, ns: str, *parts) -> str:
+        return ns + ":".join(parts)
+
+    def _completions_key(self, *parts) -> str:
+        return f"{cache_system.cache_prefix}search:ac" + "".join(f":{part}" for part in parts)
+
+    # ---------- escrita ----------
+
+    def index_doc(self, doc, removed: bool = False):
+        """Atualiza (ou remove) as entradas de um documento"""
+        if doc.doctype in AGGREGATED_DOCTYPES:
+            entries = SEARCH_DOCTYPES[doc.doctype](doc, exclude=doc.name if removed else None)
+            removed = False
+        else:
+            entries = SEARCH_DOCTYPES[doc.doctype](doc)
+
+        for key, entry in entries:
+            if removed or entry is None:
+                self.remove(key)
+            else:
+                self.add(key, entry)
+
+    def add(self, key: str, entry: Dict):
+        """Indexa um documento, substituindo a versão anterior"""
+        category = key.split(":", 1)[0]
+        tipo, label = SEARCH_CATEGORIES[category]
+        terms = Counter(analyze(f"{entry['titulo']} {entry['descricao']} {entry['text']}"))
+        length = sum(terms.values())
+
+        ns = self._namespace()
+        self.remove(key, ns)
+        if not terms:
+            return
+
+        data = entry.get("data")
+        completions = sorted({str(c).strip() for c in entry.get("completions") or () if c and str(c).strip()})
+        pipe = self._client().pipeline(transaction=True)
+        for term, tf in terms.items():
+            pipe.hset(self._key(ns, "t", category, term), key, f"{tf}:{length}")
+        pipe.hset(self._key(ns, "d", key), mapping={
+            "tipo": tipo,
+            "categoria": label,
+            "titulo": entry["titulo"],
+            "descricao": entry["descricao"],
+            "valor": str(entry.get("valor") if entry.get("valor") is not None else ""),
+            "data": data.isoformat() if hasattr(data, "isoformat") else str(data or ""),
+            "link": entry["link"],
+            "length": length,
+            "terms": json.dumps(list(terms)),
+            "completions": json.dumps(completions),
+        })
+        self._update_completions(pipe, {completion: 1 for completion in completions})
+        pipe.hincrby(self._key(ns, "stats"), "docs", 1)
+        pipe.hincrby(self._key(ns, "stats"), "length", length)
+        pipe.execute()
+
+    def remove(self, key: str, ns: Optional[str] = None):
+        """Remove um documento do índice (sem efeito se não indexado)"""
+        client = self._client()
+        ns = ns or self._namespace()
+        stored = client.hmget(self._key(ns, "d", key), ["terms", "length", "completions"])
+        if not stored[0]:
+            return
+
+        category = key.split(":", 1)[0]
+        pipe = client.pipeline(transaction=True)
+        for term in json.loads(_decode(stored[0])):
+            pipe.hdel(self._key(ns, "t", category, term), key)
+        pipe.delete(self._key(ns, "d", key))
+        self._update_completions(pipe, {completion: -1 for completion in json.loads(_decode(stored[2] or "[]"))})
+        pipe.hincrby(self._key(ns, "stats"), "docs", -1)
+        pipe.hincrby(self._key(ns, "stats"), "length", -int(stored[1] or 0))
+        pipe.execute()
+
+    def _update_completions(self, pipe, changes: Dict[str, int]):
+        """Variações de peso das completações, registradas no log versionado"""
+        if not changes:
+            return
+
+        # Índice em construção: completações em hash próprio, sem log
+        if self.generation is not None:
+            for completion, delta in changes.items():
+                pipe.hincrby(self._completions_key("build", self.generation), completion, delta)
+            return
+
+        for completion, delta in changes.items():
+            pipe.hincrby(self._completions_key(), completion, delta)
+            pipe.rpush(self._completions_key("log"), json.dumps([completion, delta]))
+        pipe.incrby(self._completions_key("v"), len(changes))
+        pipe.ltrim(self._completions_key("log"), -COMPLETION_LOG_SIZE, -1)
+
+    def building(self) -> Optional["SearchIndex"]:
+        """Índice em construção por rebuild(), se houver"""
+        generation = _decode(self._client().get(self._meta_key("building")))
+        return SearchIndex(self.batch_size, generation=generation) if generation else None
+
+    def _delete_namespace(self, pattern: str):
+        client = self._client()
+        for key in client.scan_iter(match=pattern, count=1000):
+            client.delete(key)
+
+    def rebuild(self):
+        """
+        Reconstrução completa a partir das tabelas de origem
+
+        O índice novo é construído em outra geração (prefixo de chaves)
+        enquanto a atual continua atendendo as buscas; os eventos de
+        documento durante a construção são aplicados às duas. A troca da
+        geração ativa e das completações é atômica (MULTI) e só então as
+        chaves da geração anterior são apagadas.
+        """
+        client = self._client()
+        generation = str(client.incr(self._meta_key("seq")))
+        shadow = SearchIndex(self.batch_size, generation=generation)
+        client.set(self._meta_key("building"), generation)
+
+        try:
+            for doctype, query in REBUILD_QUERIES.items():
+                last_name = ""
+                while True:
+                    params = ["3.%", "4.%"] if doctype == "GL Entry" else []
+                    rows = frappe.db.sql(query, params + [last_name, self.batch_size], as_dict=True)
+                    if not rows:
+                        break
+
+                    for row in rows:
+                        for key, entry in SEARCH_DOCTYPES[doctype](row):
+                            if entry:
+                                shadow.add(key, entry)
+
+                    last_name = rows[-1].name
+
+            for department in frappe.db.sql_list("""
+                SELECT DISTINCT department FROM `tabEmployee`
+                WHERE status = 'Active' AND IFNULL(department, '') != ''
+            """):
+                for key, entry in _department_entries(department):
+                    if entry:
+                        shadow.add(key, entry)
+
+        except Exception:
+            client.delete(self._meta_key("building"), self._completions_key("build", generation))
+            self._delete_namespace(shadow._namespace() + "*")
+            raise
+
+        previous = _decode(client.get(self._meta_key("active")))
+        completions = self._completions_key("build", generation)
+
+        # Versão do autocompletar avança além do log: workers recarregam
+        pipe = client.pipeline(transaction=True)
+        pipe.set(self._meta_key("active"), generation)
+        pipe.delete(self._meta_key("building"))
+        if client.exists(completions):
+            pipe.rename(completions, self._completions_key())
+        else:
+            pipe.delete(self._completions_key())
+        pipe.delete(self._completions_key("log"))
+        pipe.incrby(self._completions_key("v"), COMPLETION_LOG_SIZE + 1)
+        pipe.execute()
+
+        self._delete_namespace(f"{cache_system.cache_prefix}search:{previous or '0'}:*")
+
+    # ---------- consulta ----------
+
+    def is_ready(self) -> bool:
+        try:
+            return int(self._client().hget(self._key(self._namespace(), "stats"), "docs") or 0) > 0
+        except Exception:
+            return False
+
+    def in_vocabulary(self, query: str) -> bool:
+        """Todos os termos da consulta constam do índice (em alguma categoria)"""
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms:
+            return False
+
+        ns = self._namespace()
+        pipe = self._client().pipeline(transaction=False)
+        for term in terms:
+            for category in SEARCH_CATEGORIES:
+                pipe.exists(self._key(ns, "t", category, term))
+        found = pipe.execute()
+
+        per_term = len(SEARCH_CATEGORIES)
+        return all(any(found[i:i + per_term]) for i in range(0, len(found), per_term))
+
+    def _score(self, ns: str, query: str, categories: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Pontuação BM25 dos documentos que contêm algum termo
+
+        As listas de postings são separadas por categoria e só as das
+        categorias pedidas são lidas. Listas com mais de SEARCH_MAX_POSTINGS
+        entradas são consultadas apenas para os candidatos das listas
+        seletivas (HMGET); se a consulta só tem termos genéricos, a lista
+        menor é amostrada com HSCAN. O custo fica limitado pelo tamanho das
+        listas lidas, não pelo número de documentos indexados.
+        """
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms:
+            return {}
+
+        categories = [category for category in (categories or SEARCH_CATEGORIES) if category in SEARCH_CATEGORIES]
+        client = self._client()
+
+        pipe = client.pipeline(transaction=False)
+        pipe.hmget(self._key(ns, "stats"), ["docs", "length"])
+        for term in terms:
+            for category in SEARCH_CATEGORIES:
+                pipe.hlen(self._key(ns, "t", category, term))
+        stats, *sizes = pipe.execute()
+
+        total_docs = int(stats[0] or 0)
+        if not total_docs:
+            return {}
+        avg_length = int(stats[1] or 0) / total_docs or 1
+
+        # IDF com a frequência do termo em todas as categorias
+        idf = {}
+        lists = []
+        for i, term in enumerate(terms):
+            term_sizes = dict(zip(SEARCH_CATEGORIES, sizes[i * len(SEARCH_CATEGORIES):]))
+            df = sum(int(size or 0) for size in term_sizes.values())
+            idf[term] = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            lists.extend(
+                (int(term_sizes[category]), term, category)
+                for category in categories if int(term_sizes[category] or 0)
+            )
+
+        if not lists:
+            return {}
+
+        selective = [item for item in lists if item[0] <= SEARCH_MAX_POSTINGS]
+        common = [item for item in lists if item[0] > SEARCH_MAX_POSTINGS]
+        sampled = None
+        if not selective:
+            sampled = min(common)
+            common.remove(sampled)
+
+        scores = {}
+
+        def add(term, key, value):
+            tf, length = (int(v) for v in _decode(value).split(":"))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            key = _decode(key)
+            scores[key] = scores.get(key, 0.0) + idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+
+        pipe = client.pipeline(transaction=False)
+        for _size, term, category in selective:
+            pipe.hgetall(self._key(ns, "t", category, term))
+        if sampled:
+            pipe.hscan(self._key(ns, "t", sampled[2], sampled[1]), 0, count=SEARCH_MAX_POSTINGS)
+
+        results = pipe.execute()
+        if sampled:
+            results[-1] = results[-1][1]
+
+        for (_size, term, _category), postings in zip(selective + ([sampled] if sampled else []), results):
+            for key, value in postings.items():
+                add(term, key, value)
+
+        if common and scores:
+            candidates = {}
+            for key in scores:
+                candidates.setdefault(key.split(":", 1)[0], []).append(key)
+
+            pipe = client.pipeline(transaction=False)
+            lookups = [(term, category) for _size, term, category in common if category in candidates]
+            for term, category in lookups:
+                pipe.hmget(self._key(ns, "t", category, term), candidates[category])
+
+            for (term, category), values in zip(lookups, pipe.execute()):
+                for key, value in zip(candidates[category], values):
+                    if value:
+                        add(term, key, value)
+
+        return scores
+
+    def _load(self, ns: str, ranked: List[Tuple[str, float]]) -> List[Dict]:
+        if not ranked:
+            return []
+
+        pipe = self._client().pipeline(transaction=False)
+        for key, _score in ranked:
+            pipe.hgetall(self._key(ns, "d", key))
+
+        results = []
+        for (key, score), stored in zip(ranked, pipe.execute()):
+            if not stored:
+                continue
+            doc = {_decode(k): _decode(v) for k, v in stored.items() if _decode(k) not in ("terms", "completions")}
+            doc.pop("length", None)
+            doc["relevancia"] = round(score, 4)
+            results.append(doc)
+
+        return results
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Documentos mais relevantes, em ordem decrescente de pontuação"""
+        ns = self._namespace()
+        scores = self._score(ns, query, [category] if category else None)
+        return self._load(ns, heapq.nlargest(int(limit), scores.items(), key=lambda item: item[1]))
+
+    def search_grouped(self, query: str, categories: List[str], limit: int = 20) -> Dict[str, List[Dict]]:
+        """Os `limit` mais relevantes de cada categoria, em uma única leitura"""
+        ns = self._namespace()
+        by_category = {category: [] for category in categories}
+        for key, score in self._score(ns, query, categories).items():
+            by_category[key.split(":", 1)[0]].append((key, score))
+
+        return {
+            category: self._load(ns, heapq.nlargest(int(limit), items, key=lambda item: item[1]))
+            for category, items in by_category.items()
+        }
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Instância global do índice
+search_index = SearchIndex()
+
+
+def index_document_on_change(doc, method):
+    """Hook de documento: mantém o índice de busca atualizado"""
+    if doc.doctype not in SEARCH_DOCTYPES:
+        return
+
+    try:
+        removed = method in ("on_cancel", "on_trash")
+        search_index.index_doc(doc, removed=removed)
+
+        # Reconstrução em andamento: o índice novo também recebe a alteração
+        building = search_index.building()
+        if building:
+            building.index_doc(doc, removed=removed)
+    except Exception as e:
+        frappe.log_error(f"Erro ao indexar {doc.doctype} {doc.name}: {str(e)}", "Search Index")
+
+
+def rebuild_search_index_job():
+    """Job de reconstrução completa do índice (fila long)"""
+    try:
+        search_index.rebuild()
+    except Exception as e:
+        frappe.log_error(f"Erro ao reconstruir índice de busca: {str(e)}", "Search Index")
+
+
+@frappe.whitelist()
+def rebuild_search_index():
+    """Enfileira a reconstrução completa do índice de busca"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "govnext_core.utils.search_index.rebuild_search_index_job",
+        queue="long",
+        timeout=3600
+    )
+    return {"success": True}
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, GovNext Team and contributors
+# For license information, please see license.txt
+
+"""
+Autocompletar da busca do Portal da Transparência
+
+O conjunto de completações (fornecedores, números de contrato e de
+licitação, CNPJs e termos comuns) fica no Redis com um peso por entrada,
+mantido pelo índice de busca. Cada alteração é registrada em um log com
+número de versão; cada worker carrega o conjunto uma vez em um vetor
+ordenado em memória e, a cada intervalo, aplica apenas as alterações
+posteriores à sua versão. A consulta é uma busca binária pelo prefixo,
+sem acesso ao banco nem ao Redis.
+
+Estrutura das chaves (sob o prefixo do site):
+    search:ac       hash completação -> peso (documentos que a citam)
+    search:ac:log   lista de alterações [completação, variação do peso]
+    search:ac:v     total de alterações já registradas (versão)
+"""
+
+import frappe
+import heapq
+import json
+import time
+from bisect import bisect_left, insort
+from threading import Lock
+from typing import Dict, Iterable, List
+from .cache import cache_system
+from .search_index import COMPLETION_LOG_SIZE, fold_text
+
+# Termos sempre oferecidos, com peso baixo
+COMMON_TERMS = (
+    "IPTU", "ISS", "FPM", "Folha de pagamento", "Contratos", "Licitações",
+    "Receitas", "Despesas", "Obras públicas", "Convênios", "Orçamento",
+    "Prestação de contas", "Servidores", "Diárias", "Pregão eletrônico",
+)
+
+# Itens extras lidos do fim do log para cobrir alterações concorrentes
+REFRESH_LOG_SLACK = 100
+
+
+def _key(*parts) -> str:
+    return f"{cache_system.cache_prefix}search:ac" + "".join(f":{part}" for part in parts)
+
+
+def _client():
+    return cache_system.redis_client or frappe.cache()
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class TypeaheadIndex:
+    """Vetor ordenado de prefixos carregado por worker"""
+
+    def __init__(self):
+        self.refresh_interval = frappe.conf.get("typeahead_refresh_interval", 30)
+        self.max_candidates = 2000
+        self._lock = Lock()
+        self._reset()
+
+    def _reset(self):
+        # (sufixo normalizado iniciado em palavra, completação) em ordem
+        self._suffixes: List[tuple] = []
+        self._weights: Dict[str, int] = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def _entries(self, completion: str) -> Iterable[tuple]:
+        words = fold_text(completion).split()
+        return {(" ".join(words[i:]), completion) for i in range(len(words))}
+
+    def _set_weight(self, completion: str, weight: int):
+        if weight > 0 and completion not in self._weights:
+            for entry in self._entries(completion):
+                insort(self._suffixes, entry)
+        elif weight <= 0 and completion in self._weights:
+            for entry in self._entries(completion):
+                index = bisect_left(self._suffixes, entry)
+                if index < len(self._suffixes) and self._suffixes[index] == entry:
+                    del self._suffixes[index]
+
+        if weight > 0:
+            self._weights[completion] = weight
+        else:
+            self._weights.pop(completion, None)
+
+    def _load(self, client):
+        pipe = client.pipeline(transaction=True)
+        pipe.get(_key("v"))
+        pipe.hgetall(_key())
+        version, stored = pipe.execute()
+
+        weights = {_decode(k): int(v) for k, v in stored.items() if int(v) > 0}
+        for term in COMMON_TERMS:
+            weights[term] = weights.get(term, 0) + 1
+
+        suffixes = []
+        for completion in weights:
+            suffixes.extend(self._entries(completion))
+        suffixes.sort()
+
+        self._suffixes, self._weights = suffixes, weights
+        self._version = int(version or 0)
+
+    def refresh(self, force: bool = False):
+        """Aplica as alterações do Redis posteriores à versão local"""
+        now = time.monotonic()
+        if not force and self._version is not None and now - self._checked_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                client = _client()
+                if self._version is None or force:
+                    self._load(client)
+                    return
+
+                pending = int(client.get(_key("v")) or 0) - self._version
+                if pending <= 0:
+                    return
+
+                # Log já descartado (ou índice reconstruído): recarga completa
+                if pending > COMPLETION_LOG_SIZE:
+                    self._load(client)
+                    return
+
+                # Versão e fim do log lidos na mesma transação: o último item
+                # do log corresponde sempre à versão lida (os escritores
+                # alteram os dois em MULTI). A folga cobre alterações feitas
+                # entre as duas leituras.
+                pipe = client.pipeline(transaction=True)
+                pipe.get(_key("v"))
+                pipe.lrange(_key("log"), -min(pending + REFRESH_LOG_SLACK, COMPLETION_LOG_SIZE), -1)
+                version, entries = pipe.execute()
+
+                version = int(version or 0)
+                pending = version - self._version
+                if pending > len(entries):
+                    self._load(client)
+                    return
+
+                for raw in entries[len(entries) - pending:] if pending > 0 else []:
+                    completion, delta = json.loads(_decode(raw))
+                    self._set_weight(completion, self._weights.get(completion, 0) + delta)
+                self._version = max(version, self._version)
+
+            except Exception as e:
+                frappe.log_error(f"Erro ao atualizar autocompletar: {str(e)}", "Typeahead")
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """As `limit` completações de maior peso para o prefixo"""
+        self.refresh()
+
+        prefix = " ".join(fold_text(prefix).split())
+        if not prefix:
+            return []
+
+        suffixes = self._suffixes
+        candidates = {}
+        index = bisect_left(suffixes, (prefix,))
+        while index < len(suffixes) and len(candidates) < self.max_candidates:
+            suffix, completion = suffixes[index]
+            if not suffix.startswith(prefix):
+                break
+            candidates[completion] = self._weights.get(completion, 0)
+            index += 1
+
+        return [
+            {"termo": completion, "peso": weight}
+            for completion, weight in heapq.nlargest(int(limit), candidates.items(), key=lambda item: item[1])
+        ]
+
+
+# Instância por worker
+typeahead_index = TypeaheadIndex()